@@ -23,4 +23,4 @@ Here are the raw alerts:
 
 Write your summary below:
 """
-    return call_llm_model(prompt, model_name="local" if model_mode == "local" else None)
+    return call_llm_model(prompt, model_name="local" if model_mode == "local" else None, cache_endpoint="alerts")
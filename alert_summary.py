@@ -2,7 +2,7 @@
 
 import os
 from agents.llm_utils import call_llm_model  # Existing helper
-from transformers import pipeline  # Only used if model_mode = "local"
+from agents.local_runtime import get_local_runtime  # Only used if model_mode = "local"
 
 def generate_alert_summary(signals: str, df, model_mode: str = "cloud") -> str:
     """
@@ -35,11 +35,11 @@ def generate_alert_summary(signals: str, df, model_mode: str = "cloud") -> str:
 
     # Cloud or local model logic
     if model_mode == "cloud":
-        return call_llm_model(prompt)
+        return call_llm_model(prompt, cache_endpoint="alerts")
     
     elif model_mode == "local":
-        # Load local model (Phi-2 or TinyLlama)
-        local_llm = pipeline("text-generation", model="microsoft/phi-2", tokenizer="microsoft/phi-2")
+        # Shared local model (loaded once per process, not per call)
+        local_llm = get_local_runtime()
         output = local_llm(prompt, max_new_tokens=200, do_sample=True)[0]["generated_text"]
         return output.split(prompt)[-1].strip()
     
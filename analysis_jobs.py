@@ -0,0 +1,132 @@
+# agents/analysis_jobs.py
+
+"""
+Analysis stages that can run as background jobs. Every stage takes a file_id
+rather than a DataFrame so that process-pool workers only receive a short
+string and reopen the dataset from the memory-mapped store themselves.
+"""
+
+import pandas as pd
+from agents.dataset_store import dataset_store
+
+# Which pool each stage runs on: pandas/matplotlib work in processes, LLM calls in threads
+STAGE_POOLS = {
+    "eda": "process",
+    "kpis": "process",
+    "charts": "process",
+    "summary": "thread",
+    "qa": "thread",
+    "goal": "thread",
+    "alerts": "thread",
+}
+
+NATURAL_KEYWORDS = ["who", "when", "which", "show", "list", "customer", "order", "message", "chat", "complain", "comment", "email", "review"]
+
+
+def _choose_route(question: str, file_id: str = None) -> dict:
+    """
+    Row-lookup style questions go to FAISS retrieval, everything else to codegen.
+    While the dataset's index is still building, FAISS questions fall back to codegen.
+    """
+    from agents.build_faiss_index import get_index_status
+
+    question_lower = question.lower()
+    if not any(kw in question_lower for kw in NATURAL_KEYWORDS):
+        return {"mode": "codegen"}
+    index_status = get_index_status(file_id) if file_id else {"status": "ready"}
+    if index_status["status"] == "ready":
+        return {"mode": "faiss"}
+    if index_status["status"] == "failed":
+        note = f"Search index unavailable ({index_status['error']}); answered with code generation."
+    else:
+        note = f"Index building, {index_status['progress'] * 100:.0f}% done; answered with code generation."
+    return {"mode": "codegen", "index_status": index_status, "note": note}
+
+
+def route_question(df: pd.DataFrame, question: str, model_mode: str = "cloud", file_id: str = None,
+                   explain: str = "eager") -> dict:
+    """
+    Answers a question with FAISS retrieval or codegen (see _choose_route).
+    explain (eager | lazy | skip) controls the explanation / CoT follow-up calls.
+    """
+    from agents.qa_agent import run_rag_qa_agent
+    from agents.rag_faiss_agent import run_faiss_rag_agent
+
+    route = _choose_route(question, file_id)
+    if route["mode"] == "faiss":
+        answer = run_faiss_rag_agent(question, model_mode=model_mode, file_id=file_id, df=df, explain=explain)
+        return {"mode": "faiss", "answer": answer}
+
+    route["output"] = run_rag_qa_agent(df, question, model_mode=model_mode, explain=explain)
+    return route
+
+
+def stream_route_question(df: pd.DataFrame, question: str, model_mode: str = "cloud", file_id: str = None,
+                          explain: str = "lazy"):
+    """Streaming variant of route_question: a ("route", ...) event, then the chosen agent's events."""
+    from agents.qa_agent import stream_rag_qa_agent
+    from agents.rag_faiss_agent import stream_faiss_rag_agent
+
+    route = _choose_route(question, file_id)
+    yield "route", route
+    if route["mode"] == "faiss":
+        yield from stream_faiss_rag_agent(question, model_mode=model_mode, file_id=file_id, df=df, explain=explain)
+    else:
+        yield from stream_rag_qa_agent(df, question, model_mode=model_mode, explain=explain)
+
+
+def _jsonable_qa_output(output: dict) -> dict:
+    # The codegen agent returns a DataFrame and a matplotlib figure; neither is JSON
+    output = dict(output)
+    result = output.get("result")
+    if isinstance(result, pd.DataFrame):
+        output["result"] = result.astype(str).to_dict(orient="records")
+    output["chart_image"] = None
+    return output
+
+
+def run_stage(stage: str, file_id: str, model_mode: str = "cloud", question: str = None, goal: str = None):
+    """Runs one analysis stage for a stored dataset and returns a JSON-serializable result."""
+    df = dataset_store.get(file_id)
+
+    if stage == "eda":
+        from eda.perform_eda import perform_eda
+        return {"eda_result": perform_eda(df)}
+
+    elif stage == "kpis":
+        from kpi.extract_kpis import extract_kpis
+        return {"kpis": extract_kpis(df)}
+
+    elif stage == "charts":
+        from chart.generate_charts import smart_chart_agent
+        chart_paths, chart_summaries = smart_chart_agent(df)
+        return {"charts": chart_paths, "summaries": chart_summaries}
+
+    elif stage == "summary":
+        from agents.summarize_insights import generate_summary_from_df
+        return {"summary": generate_summary_from_df(df, domain="auto", model_mode=model_mode)}
+
+    elif stage == "qa":
+        if not question:
+            raise ValueError("The 'qa' stage requires a question.")
+        routed = route_question(df, question, model_mode=model_mode, file_id=file_id)
+        if "output" in routed:
+            routed["output"] = _jsonable_qa_output(routed["output"])
+        return routed
+
+    elif stage == "goal":
+        if not goal:
+            raise ValueError("The 'goal' stage requires a goal.")
+        from agents.goal_agent import run_goal_pipeline
+        return {"report": run_goal_pipeline(df, goal)}
+
+    elif stage == "alerts":
+        from agents.proactive_agent import detect_proactive_signals
+        from agents.alert_summarizer import generate_alert_summary
+        proactive_signals = detect_proactive_signals(df)
+        return {
+            "summary": generate_alert_summary(proactive_signals, model_mode=model_mode),
+            "raw_alerts": proactive_signals.strip().split("\n"),
+        }
+
+    raise ValueError(f"Unknown stage '{stage}'.")
@@ -0,0 +1,97 @@
+# benchmark_faiss_index.py
+
+"""
+Recall-vs-latency benchmark of the index types in index_factory against the
+exact Flat baseline.
+
+    python benchmark_faiss_index.py --rows 200000
+    python benchmark_faiss_index.py --csv data.csv --nprobe 8 16 32 --ef-search 32 64 128
+"""
+
+import time
+import argparse
+import numpy as np
+import faiss
+
+from agents.index_factory import (
+    INDEX_TYPES, create_index, needs_training, training_sample_ids, train_index, apply_search_params,
+)
+
+
+def load_vectors(args) -> np.ndarray:
+    if args.csv:
+        import pandas as pd
+        from agents.row_serializer import serialize_rows
+        from agents.embedding_service import encode
+        return encode(serialize_rows(pd.read_csv(args.csv)))
+    rng = np.random.default_rng(0)
+    return rng.standard_normal((args.rows, args.dim)).astype("float32")
+
+
+def time_search(index, queries: np.ndarray, top_k: int):
+    """Searches one query at a time (like /api/qa) and returns (ids, per-query latencies in ms)."""
+    all_ids, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        _, ids = index.search(query[None, :], top_k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        all_ids.append(ids[0])
+    return np.array(all_ids), np.array(latencies)
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--csv", help="Embed the rows of this CSV instead of random vectors")
+    parser.add_argument("--rows", type=int, default=100_000, help="Synthetic vector count")
+    parser.add_argument("--dim", type=int, default=384, help="Synthetic vector dimension")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--types", nargs="+", default=list(INDEX_TYPES))
+    parser.add_argument("--nprobe", nargs="+", type=int, default=[8, 16, 64])
+    parser.add_argument("--ef-search", nargs="+", type=int, default=[32, 64, 128])
+    args = parser.parse_args()
+
+    vectors = load_vectors(args)
+    n_rows, dim = vectors.shape
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(n_rows, size=min(args.queries, n_rows), replace=False)]
+    queries = queries + rng.normal(scale=0.01, size=queries.shape).astype("float32")
+
+    baseline = faiss.IndexFlatL2(dim)
+    baseline.add(vectors)
+    truth, flat_latency = time_search(baseline, queries, args.top_k)
+
+    print(f"\n📏 {n_rows} vectors × {dim} dims, {len(queries)} queries, top_k={args.top_k}")
+    print(f"{'index':<28}{'build s':>10}{'recall':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    print(f"{'flat (baseline)':<28}{'-':>10}{1.0:>10.3f}{np.percentile(flat_latency, 50):>10.2f}{np.percentile(flat_latency, 95):>10.2f}")
+
+    for index_type in args.types:
+        if index_type == "flat":
+            continue
+        start = time.perf_counter()
+        index = create_index(dim, n_rows, index_type)
+        if needs_training(index):
+            train_index(index, vectors[training_sample_ids(n_rows)])
+        index.add(vectors)
+        build_seconds = time.perf_counter() - start
+
+        if index_type.startswith("ivf"):
+            sweep = [(f"nprobe={n}", {"nprobe": n}) for n in args.nprobe]
+        else:
+            sweep = [(f"efSearch={ef}", {"ef_search": ef}) for ef in args.ef_search]
+
+        for label, params in sweep:
+            apply_search_params(index, **params)
+            found, latency = time_search(index, queries, args.top_k)
+            name = f"{index_type} {label}"
+            print(f"{name:<28}{build_seconds:>10.1f}{recall_at_k(found, truth):>10.3f}"
+                  f"{np.percentile(latency, 50):>10.2f}{np.percentile(latency, 95):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
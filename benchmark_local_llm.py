@@ -0,0 +1,88 @@
+# benchmark_local_llm.py
+
+"""
+Tokens/s benchmark of the local inference backends against the float32
+transformers pipeline baseline.
+
+    python benchmark_local_llm.py
+    python benchmark_local_llm.py --backends transformers gguf --model-path gguf=models/phi-2.Q4_K_M.gguf
+    python benchmark_local_llm.py --backends transformers onnx ctranslate2 \
+        --model-path onnx=models/phi-2-onnx-int8 ctranslate2=models/phi-2-ct2-int8 --max-new-tokens 300
+
+Output tokens are counted with the LOCAL_MODEL_NAME tokenizer for every
+backend so the numbers are comparable.
+"""
+
+import time
+import argparse
+
+from agents.local_backends import BACKENDS, LOCAL_MODEL_NAME
+from agents.local_runtime import LocalRuntime
+
+DEFAULT_PROMPT = (
+    "You are a retail business analyst. Summarize the key insights of a quarterly sales table "
+    "with columns region, product, units and revenue, then recommend three actions."
+)
+
+
+def run_backend(name: str, model_path: str, prompt: str, max_new_tokens: int, runs: int, count_tokens) -> dict:
+    runtime = LocalRuntime(backend=name, model_path=model_path)
+    start = time.perf_counter()
+    runtime.backend  # load
+    load_seconds = time.perf_counter() - start
+
+    runtime.generate(prompt, max_new_tokens=8)  # warm-up
+
+    first_token_ms, tokens_per_second = [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        first = None
+        pieces = []
+        for piece in runtime.stream(prompt, max_new_tokens=max_new_tokens):
+            if first is None:
+                first = time.perf_counter() - start
+            pieces.append(piece)
+        elapsed = time.perf_counter() - start
+        first_token_ms.append((first or elapsed) * 1000)
+        tokens_per_second.append(count_tokens("".join(pieces)) / elapsed)
+
+    return {
+        "backend": name,
+        "load_s": load_seconds,
+        "ttft_ms": sum(first_token_ms) / runs,
+        "tokens_per_s": sum(tokens_per_second) / runs,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", default=["transformers"], choices=list(BACKENDS))
+    parser.add_argument("--model-path", nargs="*", default=[], metavar="BACKEND=PATH",
+                        help="Model location per backend (defaults to LOCAL_MODEL_PATH / LOCAL_MODEL_NAME)")
+    parser.add_argument("--prompt", default=DEFAULT_PROMPT)
+    parser.add_argument("--max-new-tokens", type=int, default=128)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    from transformers import AutoTokenizer
+    tokenizer = AutoTokenizer.from_pretrained(LOCAL_MODEL_NAME)
+    count_tokens = lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+    model_paths = dict(item.split("=", 1) for item in args.model_path)
+
+    results = []
+    for name in args.backends:
+        print(f"⏱️ Benchmarking {name}...")
+        try:
+            results.append(run_backend(name, model_paths.get(name), args.prompt, args.max_new_tokens, args.runs, count_tokens))
+        except Exception as e:
+            print(f"⚠️ {name} failed: {e}")
+
+    baseline = next((r["tokens_per_s"] for r in results if r["backend"] == "transformers"), None)
+    print(f"\n{'backend':<14}{'load s':>9}{'TTFT ms':>10}{'tokens/s':>10}{'speedup':>9}")
+    for r in results:
+        speedup = f"{r['tokens_per_s'] / baseline:.2f}x" if baseline else "-"
+        print(f"{r['backend']:<14}{r['load_s']:>9.1f}{r['ttft_ms']:>10.0f}{r['tokens_per_s']:>10.1f}{speedup:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,52 +1,207 @@
 # build_faiss_index.py
 
 import os
-import json
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import faiss
 import numpy as np
 import pandas as pd
-from sentence_transformers import SentenceTransformer
+from agents.dataset_store import dataset_store
+from agents.embedding_service import encode_cached, flush_embedding_cache
+from agents.index_registry import index_registry, dataset_fingerprint
+from agents.row_store import RowStoreWriter
+from agents.lexical_index import build_lexical_index, update_lexical_index
+from agents.query_filters import get_filter_columns
+from agents.row_serializer import serialize_rows, iter_row_text_batches
+from agents.index_factory import create_index, needs_training, training_sample_ids, train_index, supports_removal
+from agents.index_manifest import hash_rows, row_keys, save_manifest, load_manifest, diff_manifest
 
-EMBED_MODEL = "all-MiniLM-L6-v2"
 INDEX_DIR = "faiss_index"
+INDEX_FILE = "index.faiss"
+INDEX_BATCH_SIZE = int(os.getenv("INDEX_BATCH_SIZE", "1024"))
+# Above this share of new rows an incremental update costs about as much as a rebuild
+REBUILD_FRACTION = float(os.getenv("INDEX_REBUILD_FRACTION", "0.5"))
+# Removed rows stay in the row store (and IDMap) until the index is rebuilt at this dead-id share
+COMPACT_FRACTION = float(os.getenv("INDEX_COMPACT_FRACTION", "0.3"))
 os.makedirs(INDEX_DIR, exist_ok=True)
 
-embedder = SentenceTransformer(EMBED_MODEL)
+# Background builds run one at a time; encoding already saturates the CPU
+_index_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="faiss-index")
+_index_status = {}
+_status_lock = threading.Lock()
 
 
 def preprocess_row(row: pd.Series) -> str:
     """
     Converts a row into a readable text format for semantic embedding.
+    Single-row helper; whole frames go through row_serializer.serialize_rows.
     """
     return "; ".join([f"{col}: {val}" for col, val in row.items()])
 
 
-def build_faiss_index(df: pd.DataFrame, index_path=INDEX_DIR):
+def build_faiss_index(df: pd.DataFrame, index_path=INDEX_DIR, batch_size=INDEX_BATCH_SIZE, progress_callback=None):
     """
     Builds and saves a FAISS index from DataFrame rows.
+    Rows are embedded in batches; progress_callback(fraction_done) is called after each batch.
     """
     print("🔍 Building FAISS index...")
 
-    # Step 1: Convert rows to text
-    row_texts = df.astype(str).apply(preprocess_row, axis=1).tolist()
+    n_rows = len(df)
+    if n_rows == 0:
+        raise ValueError("Cannot build an index for an empty dataset.")
+
+    # Steps 1-3: Serialize rows column-wise batch by batch, embed, add to the
+    # FAISS index (type chosen by index_factory) and stream texts to the row store.
+    # Row i gets FAISS id i, which is also its position in the row store.
+    index = None
+    with RowStoreWriter(index_path) as row_store:
+        for start, row_texts in iter_row_text_batches(df, batch_size):
+            embeddings = encode_cached(row_texts)
+            if index is None:
+                index = create_index(embeddings.shape[1], n_rows, with_ids=True)
+                if needs_training(index):
+                    sample_ids = training_sample_ids(n_rows)
+                    train_index(index, encode_cached(serialize_rows(df.iloc[sample_ids])))
+            index.add_with_ids(embeddings, np.arange(start, start + len(row_texts), dtype=np.int64))
+            row_store.append(row_texts)
+            if progress_callback:
+                progress_callback(min(start + batch_size, n_rows) / n_rows)
+
+    # Step 4: Save index and the row manifest used by incremental updates
+    _write_index(index, index_path)
+    save_manifest(index_path, row_keys(hash_rows(df)), np.arange(n_rows), n_rows)
+    flush_embedding_cache()
+
+    # Step 5: BM25 index over the same row ids for hybrid retrieval
+    build_lexical_index(index_path)
 
-    # Step 2: Generate embeddings
-    embeddings = embedder.encode(row_texts, convert_to_numpy=True)
+    print(f"✅ Index built and saved to '{index_path}/'")
 
-    # Step 3: Create FAISS index
-    dim = embeddings.shape[1]
-    index = faiss.IndexFlatL2(dim)
-    index.add(embeddings)
 
-    # Step 4: Save index
-    faiss.write_index(index, os.path.join(index_path, "index.faiss"))
+def update_faiss_index(df: pd.DataFrame, index_path=INDEX_DIR, batch_size=INDEX_BATCH_SIZE, progress_callback=None):
+    """
+    Brings an existing index in line with a new version of its dataset by
+    embedding only rows whose values are new and removing rows that disappeared.
+    Falls back to a full build when there is no manifest, when removals are
+    needed on an index type that cannot remove (HNSW), when most rows changed,
+    or when removed rows would make up over COMPACT_FRACTION of the row store.
+    """
+    manifest = load_manifest(index_path)
+    if manifest is None or not os.path.exists(os.path.join(index_path, INDEX_FILE)):
+        return build_faiss_index(df, index_path, batch_size, progress_callback)
 
-    # Step 5: Save metadata
-    metadata = [{"text": row_texts[i]} for i in range(len(row_texts))]
-    with open(os.path.join(index_path, "metadata.json"), "w", encoding="utf-8") as f:
-        json.dump(metadata, f, indent=2)
+    old_keys, old_ids, next_id = manifest
+    new_keys = row_keys(hash_rows(df))
+    row_ids, added_positions, removed_ids = diff_manifest(new_keys, old_keys, old_ids)
 
-    print(f"✅ Index built and saved to '{index_path}/'")
+    total_ids = next_id + len(added_positions)
+    if total_ids and (total_ids - len(df)) / total_ids > COMPACT_FRACTION:
+        print(f"🧹 {total_ids - len(df)} of {total_ids} stored rows are removed ones, rebuilding to compact.")
+        return build_faiss_index(df, index_path, batch_size, progress_callback)
+
+    index = faiss.read_index(os.path.join(index_path, INDEX_FILE))
+    if len(df) == 0 or len(added_positions) > REBUILD_FRACTION * len(df) or (
+        len(removed_ids) and not supports_removal(index)
+    ):
+        print("🔁 Too many changes for an incremental update, rebuilding.")
+        return build_faiss_index(df, index_path, batch_size, progress_callback)
+
+    print(f"🔍 Updating FAISS index: +{len(added_positions)} / -{len(removed_ids)} rows")
+    new_ids = np.arange(next_id, next_id + len(added_positions), dtype=np.int64)
+    row_ids[added_positions] = new_ids
+
+    with RowStoreWriter(index_path, append=True) as row_store:
+        for start in range(0, len(added_positions), batch_size):
+            batch_texts = serialize_rows(df.iloc[added_positions[start:start + batch_size]])
+            index.add_with_ids(encode_cached(batch_texts), new_ids[start:start + batch_size])
+            row_store.append(batch_texts)
+            if progress_callback:
+                progress_callback(min(start + batch_size, len(added_positions)) / len(added_positions))
+
+    if len(removed_ids):
+        index.remove_ids(np.ascontiguousarray(removed_ids, dtype=np.int64))
+
+    _write_index(index, index_path)
+    save_manifest(index_path, new_keys, row_ids, next_id + len(added_positions))
+    flush_embedding_cache()
+    update_lexical_index(index_path, new_ids, removed_ids)
+    print(f"✅ Index updated in '{index_path}/'")
+
+
+def _write_index(index, index_path: str):
+    path = os.path.join(index_path, INDEX_FILE)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    faiss.write_index(index, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _set_status(key: str, **fields):
+    with _status_lock:
+        _index_status.setdefault(key, {}).update(fields)
+
+
+def build_registered_index(file_id: str, df: pd.DataFrame, content_hash: str = None, progress_callback=None) -> str:
+    """
+    Builds the per-dataset index for file_id in the registry and returns its dir.
+    Datasets with identical content share one index, so re-uploads skip the build.
+    If file_id already has an index (e.g. a refreshed monitored URL), the new
+    version starts from a copy of it and is updated incrementally.
+    """
+    content_hash = content_hash or dataset_fingerprint(df)
+    index_dir = index_registry.current_dir(content_hash)
+    if index_dir is None:
+        previous_dir = index_registry.index_dir(file_id)
+        staging_dir = index_registry.staging_dir(content_hash)
+        try:
+            if previous_dir:
+                shutil.copytree(previous_dir, staging_dir, dirs_exist_ok=True)
+            update_faiss_index(df, staging_dir, progress_callback=progress_callback)
+            index_dir = index_registry.publish(content_hash, staging_dir)
+        except Exception:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+    else:
+        print(f"♻️ Reusing existing FAISS index for content {content_hash[:12]}")
+    index_registry.register(file_id, content_hash)
+    return index_dir
+
+
+def _run_index_build(file_id: str, content_hash: str):
+    _set_status(file_id, status="building")
+    try:
+        df = dataset_store.get(file_id)
+        build_registered_index(
+            file_id, df, content_hash,
+            progress_callback=lambda done: _set_status(file_id, progress=round(done, 4)),
+        )
+        get_filter_columns(df)  # warm the question pre-filter metadata while we hold the frame
+        _set_status(file_id, status="ready", progress=1.0)
+    except Exception as e:
+        print(f"❌ FAISS index build failed for {file_id}: {e}")
+        _set_status(file_id, status="failed", error=str(e))
+
+
+def start_index_build(file_id: str, content_hash: str = None) -> dict:
+    """
+    Queues a background index build for a stored dataset and returns its
+    initial status. The dataset is loaded from the store by the build thread.
+    """
+    _set_status(file_id, status="queued", progress=0.0, error=None)
+    _index_executor.submit(_run_index_build, file_id, content_hash)
+    return get_index_status(file_id)
+
+
+def get_index_status(file_id: str) -> dict:
+    """Returns {"status": queued|building|ready|failed|missing, "progress": 0..1, "error": ...}."""
+    with _status_lock:
+        status = _index_status.get(file_id)
+    if status is not None:
+        return dict(status)
+    # Built by another worker process (or before a restart)
+    if index_registry.index_dir(file_id):
+        return {"status": "ready", "progress": 1.0, "error": None}
+    return {"status": "missing", "progress": 0.0, "error": None}
 
 
 # Optional CLI trigger
@@ -0,0 +1,118 @@
+# agents/dataset_profile.py
+
+"""
+Column profile of a dataset, computed once and shared by EDA, KPI
+extraction, proactive alerts, the summary prompt and the chart agent.
+
+get_profile(df) computes the per-column statistics in one set of vectorized
+calls (null counts, unique counts, describe, skew, correlation, top values)
+and memoizes them by dataset version: the upload content hash that
+dataset_store registers for the exact frame it hands out, or a hash of the
+values for any other frame (including copies and frames derived from a
+stored one), together with the shape, column names and dtypes.
+"""
+
+import os
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "32"))
+TOP_VALUES = 10  # most frequent values kept per categorical column
+
+
+class DatasetProfile:
+    def __init__(self, df: pd.DataFrame):
+        self.n_rows, self.n_cols = df.shape
+        self.columns = list(df.columns)
+        self.dtypes = df.dtypes
+
+        self.numeric_columns = list(df.select_dtypes(include='number').columns)
+        self.object_columns = list(df.select_dtypes(include='object').columns)
+        self.categorical_columns = list(df.select_dtypes(include=['object', 'category']).columns)
+        self.discrete_columns = list(df.select_dtypes(include=['object', 'category', 'bool']).columns)
+
+        self.null_counts = df.isna().sum()
+        self.null_ratio = self.null_counts / self.n_rows if self.n_rows else self.null_counts.astype(float)
+        self.nunique = _nunique(df)
+
+        numeric = df[self.numeric_columns]
+        self.describe = numeric.describe() if self.numeric_columns else pd.DataFrame()
+        self.skew = numeric.skew() if self.numeric_columns else pd.Series(dtype=float)
+        # Biased (population) skewness, as scipy.stats.skew reports it
+        counts = numeric.count()
+        self.population_skew = self.skew * (counts - 2) / np.sqrt(counts * (counts - 1))
+        self.corr = numeric.corr() if self.numeric_columns else pd.DataFrame()
+
+        self.value_counts = {col: df[col].value_counts().head(TOP_VALUES) for col in self.discrete_columns}
+
+    def top_values(self, col: str, n: int = 5) -> pd.Series:
+        return self.value_counts[col].head(n)
+
+
+def _nunique(df: pd.DataFrame) -> pd.Series:
+    try:
+        return df.nunique()
+    except TypeError:
+        # Unhashable cells (lists, dicts): count their string forms instead
+        return pd.Series({col: df[col].astype(str).nunique() for col in df.columns})
+
+
+# id(df) -> (weakref to df, upload content hash). Keyed on the object itself
+# rather than df.attrs, which pandas copies onto every derived frame.
+_content_hashes = {}
+
+
+def set_content_hash(df: pd.DataFrame, content_hash: str):
+    """Lets version_key trust content_hash for this frame object (and no other)."""
+    key = id(df)
+
+    def _forget(ref):
+        if _content_hashes.get(key, (None,))[0] is ref:
+            _content_hashes.pop(key, None)
+
+    _content_hashes[key] = (weakref.ref(df, _forget), content_hash)
+
+
+def _registered_hash(df: pd.DataFrame):
+    entry = _content_hashes.get(id(df))
+    if entry is not None and entry[0]() is df:
+        return entry[1]
+    return None
+
+
+def version_key(df: pd.DataFrame):
+    """Memo key of a dataset version, or None if its values can't be hashed."""
+    content_hash = _registered_hash(df)
+    if content_hash is None:
+        try:
+            content_hash = hashlib.sha256(pd.util.hash_pandas_object(df, index=False).values.tobytes()).hexdigest()
+        except TypeError:
+            return None
+    return content_hash, df.shape, tuple(map(str, df.columns)), tuple(map(str, df.dtypes))
+
+
+_profiles = OrderedDict()
+_profiles_lock = threading.Lock()
+
+
+def get_profile(df: pd.DataFrame) -> DatasetProfile:
+    """Returns the memoized profile of this dataset version, computing it on first use."""
+    key = version_key(df)
+    if key is not None:
+        with _profiles_lock:
+            profile = _profiles.get(key)
+            if profile is not None:
+                _profiles.move_to_end(key)
+                return profile
+
+    profile = DatasetProfile(df)
+    if key is not None:
+        with _profiles_lock:
+            _profiles[key] = profile
+            while len(_profiles) > PROFILE_CACHE_SIZE:
+                _profiles.popitem(last=False)
+    return profile
@@ -0,0 +1,351 @@
+# agents/dataset_store.py
+
+"""
+Dataset Store for DecisionIQ
+----------------------------
+Parses each upload once and persists it as an uncompressed Feather (Arrow IPC)
+file under DATASET_DIR, keyed by file_id. Files are reopened through a memory
+map, so datasets survive restarts and every uvicorn worker can serve any
+file_id. Decoded DataFrames are kept in an in-process LRU bounded by bytes and
+handed out as shallow copies that share the cached column buffers.
+
+A dataset is decoded whole on first get(), so resident memory is bounded by
+DATASET_MEMORY_BUDGET_MB, not by the rows a request touches; only previews
+and references read straight from the memory-mapped table.
+"""
+
+import os
+import re
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.feather as feather
+
+from agents.dataset_profile import set_content_hash
+
+# --- Configuration ---
+DATASET_DIR = os.getenv("DATASET_DIR", "data_store")
+MEMORY_BUDGET_BYTES = int(os.getenv("DATASET_MEMORY_BUDGET_MB", "2048")) * 1024 * 1024
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_KB", "1024")) * 1024
+CSV_BLOCK_BYTES = int(os.getenv("CSV_BLOCK_MB", "16")) * 1024 * 1024
+PREVIEW_ROWS = 5
+REFERENCE_SAMPLE_ROWS = int(os.getenv("DATASET_REF_SAMPLE_ROWS", "20"))
+FILENAME_META_KEY = b"decisioniq.filename"
+CONTENT_HASH_META_KEY = b"decisioniq.content_hash"
+os.makedirs(DATASET_DIR, exist_ok=True)
+
+_FILE_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+def optimize_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Shrinks a DataFrame by storing 64-bit integer columns as int32 when their
+    values fit. Integers are never narrowed below int32, so arithmetic such as
+    units * price does not silently overflow. Floats stay float64 (float32
+    loses precision on money-like values) and strings stay object, so
+    select_dtypes('object') checks keep seeing them.
+
+    Works on a shallow copy and replaces columns one at a time, so peak
+    memory is the frame plus one narrowed column, not two full frames.
+    """
+    df = df.copy(deep=False)
+    int32 = np.iinfo(np.int32)
+    for col in df.columns:
+        series = df[col]
+        if not isinstance(series.dtype, np.dtype) or series.dtype.kind not in "iu":
+            continue
+        if series.dtype.itemsize > 4 and len(series) and int32.min <= series.min() and series.max() <= int32.max:
+            df[col] = series.astype(np.int32)
+    return df
+
+
+def stringify_mixed_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Casts object columns holding anything but plain strings to str, keeping missing values."""
+    df = df.copy(deep=False)
+    for col in df.columns:
+        series = df[col]
+        if series.dtype == object and pd.api.types.infer_dtype(series, skipna=True) not in ("string", "empty"):
+            df[col] = series.where(series.isna(), series.astype(str))
+    return df
+
+
+def schema_fingerprint(schema: pa.Schema) -> str:
+    """Hash of the column names and Arrow types (metadata ignored)."""
+    fields = [(field.name, str(field.type)) for field in schema]
+    return hashlib.sha256(json.dumps(fields).encode("utf-8")).hexdigest()[:16]
+
+
+def frame_nbytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def write_feather_atomic(table: pa.Table, path: str):
+    """Writes an uncompressed Feather file via a temp file so readers never see partial data."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    feather.write_feather(table, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, path)
+
+
+class DatasetStore:
+    """
+    Thread-safe dataset store. Feather files on disk are the source of truth;
+    decoded DataFrames are cached in an LRU bounded by total bytes.
+    """
+
+    def __init__(self, data_dir: str = DATASET_DIR, budget_bytes: int = MEMORY_BUDGET_BYTES):
+        self.data_dir = data_dir
+        self.budget_bytes = budget_bytes
+        self._entries = OrderedDict()  # file_id -> {"df", "filename", "content_hash", "nbytes"}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.data_dir, exist_ok=True)
+
+    def path(self, file_id: str) -> str:
+        """Returns the on-disk Feather path for a file_id (rejects path-like ids)."""
+        if not _FILE_ID_PATTERN.match(file_id or ""):
+            raise KeyError(file_id)
+        return os.path.join(self.data_dir, f"{file_id}.feather")
+
+    def spool_path(self, file_id: str, filename: str) -> str:
+        """Returns the path where the raw upload bytes are spooled before ingestion."""
+        ext = os.path.splitext(filename or "")[1].lower()
+        return os.path.join(self.data_dir, f"{file_id}.upload{ext}")
+
+    def put(self, file_id: str, df: pd.DataFrame, filename: str, content_hash: str = None) -> dict:
+        """Persists a parsed dataset to disk, caches it and returns its entry metadata."""
+        df = df.reset_index(drop=True)
+        df.columns = [str(col) for col in df.columns]
+
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowTypeError, pa.ArrowInvalid):
+            # Mixed-type object columns (e.g. an Excel column holding 1, "N/A", 3)
+            df = stringify_mixed_columns(df)
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata(self._schema_metadata(table.schema, filename, content_hash))
+        write_feather_atomic(table, self.path(file_id))
+
+        entry = self._cache(file_id, df, filename, content_hash)
+        print(f"📦 Stored dataset {file_id} ({entry['nbytes'] / 1e6:.1f} MB in memory)")
+        return {"filename": filename, "nbytes": entry["nbytes"]}
+
+    def ingest_file(self, file_id: str, raw_path: str, filename: str, content_hash: str = None) -> dict:
+        """
+        Converts a spooled upload into the on-disk Feather file.
+
+        CSVs are streamed block by block through Arrow's CSV reader (schema is
+        inferred from the first block) straight into the Feather writer, so peak
+        memory stays at a few blocks. Returns the upload summary
+        (columns, shape, preview) computed along the way.
+        """
+        try:
+            if filename.endswith(".csv"):
+                try:
+                    return self._stream_csv(file_id, raw_path, filename, content_hash)
+                except pa.ArrowInvalid as e:
+                    # A later block contradicted the inferred types; fall back to pandas
+                    print(f"⚠️ Streaming CSV ingest failed ({e}), falling back to pandas.")
+                    df = pd.read_csv(raw_path)
+            elif filename.endswith((".xlsx", ".xls")):
+                df = pd.read_excel(raw_path)
+            elif filename.endswith(".json"):
+                df = pd.read_json(raw_path)
+            else:
+                raise ValueError("Unsupported file type.")
+
+            self.put(file_id, df, filename, content_hash=content_hash)
+            return {
+                "columns": [str(col) for col in df.columns],
+                "shape": list(df.shape),
+                "preview": df.head(PREVIEW_ROWS).to_dict(orient="records"),
+            }
+        finally:
+            if os.path.exists(raw_path):
+                os.remove(raw_path)
+
+    def get(self, file_id: str) -> pd.DataFrame:
+        """
+        Returns a shallow copy of the stored DataFrame, reloading it from disk
+        if it is not cached in this process. The copy shares the cached column
+        buffers: assigning columns is safe, mutating values in place is not.
+        Raises KeyError if the dataset is unknown.
+        """
+        with self._lock:
+            entry = self._entries.get(file_id)
+            if entry:
+                self._entries.move_to_end(file_id)
+        if entry is None:
+            table = self.load_table(file_id)
+            filename, content_hash = self._filename_from_schema(table), self._content_hash_from_schema(table)
+            # split_blocks skips consolidating columns into 2-D blocks (a second
+            # copy) and self_destruct releases each Arrow column once converted
+            df = table.to_pandas(split_blocks=True, self_destruct=True)
+            del table
+            entry = self._cache(file_id, df, filename, content_hash)
+        return self._view(entry["df"], entry["content_hash"])
+
+    def load_table(self, file_id: str) -> pa.Table:
+        """Opens the stored dataset as a memory-mapped Arrow table (no copy into RAM)."""
+        path = self.path(file_id)
+        if not os.path.exists(path):
+            raise KeyError(file_id)
+        return feather.read_table(path, memory_map=True)
+
+    def reference(self, file_id: str, sample_rows: int = REFERENCE_SAMPLE_ROWS) -> dict:
+        """
+        A small, JSON-safe pointer to a stored dataset (file_id, content hash,
+        schema fingerprint, shape, column types and a few sample rows) for
+        records that should not embed the data itself.
+        """
+        table = self.load_table(file_id)
+        sample = table.slice(0, sample_rows).to_pandas()
+        return {
+            "file_id": file_id,
+            "filename": self._filename_from_schema(table),
+            "content_hash": self._content_hash_from_schema(table),
+            "schema_fingerprint": schema_fingerprint(table.schema),
+            "shape": [table.num_rows, table.num_columns],
+            "columns": {field.name: str(field.type) for field in table.schema},
+            "sample": json.loads(sample.to_json(orient="records", date_format="iso")),
+        }
+
+    def resolve_reference(self, reference: dict, n_rows: int = REFERENCE_SAMPLE_ROWS) -> pd.DataFrame:
+        """
+        Rehydrates the sample rows of a dataset reference. Reads them from the
+        stored dataset while it still exists with the same schema, otherwise
+        falls back to the sample embedded in the reference.
+        """
+        try:
+            table = self.load_table(reference["file_id"])
+            if schema_fingerprint(table.schema) == reference.get("schema_fingerprint"):
+                return table.slice(0, n_rows).to_pandas()
+        except KeyError:
+            pass
+        return pd.DataFrame(reference.get("sample") or [])
+
+    def delete(self, file_id: str):
+        """Drops a dataset from memory and disk. Raises KeyError if it is unknown."""
+        path = self.path(file_id)
+        with self._lock:
+            cached = self._discard(file_id)
+        if not os.path.exists(path) and not cached:
+            raise KeyError(file_id)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def __contains__(self, file_id: str) -> bool:
+        with self._lock:
+            if file_id in self._entries:
+                return True
+        try:
+            return os.path.exists(self.path(file_id))
+        except KeyError:
+            return False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "datasets_in_memory": len(self._entries),
+                "bytes": self._total_bytes,
+                "budget_bytes": self.budget_bytes,
+                "data_dir": os.path.abspath(self.data_dir),
+            }
+
+    # --- Internals ---
+    def _cache(self, file_id: str, df: pd.DataFrame, filename: str, content_hash: str = None) -> dict:
+        # Every frame is compacted here, whether it came from pandas (put) or
+        # from a Feather file written by the streaming CSV ingest (get)
+        df = optimize_dtypes(df)
+        entry = {"df": df, "filename": filename, "content_hash": content_hash, "nbytes": frame_nbytes(df)}
+        with self._lock:
+            self._discard(file_id)
+            self._entries[file_id] = entry
+            self._total_bytes += entry["nbytes"]
+            self._evict()
+        return entry
+
+    def _stream_csv(self, file_id: str, raw_path: str, filename: str, content_hash: str) -> dict:
+        read_options = pa_csv.ReadOptions(block_size=CSV_BLOCK_BYTES)
+        reader = pa_csv.open_csv(raw_path, read_options=read_options)
+        temporal = [field.name for field in reader.schema if pa.types.is_temporal(field.type)]
+        if temporal:
+            # Keep dates as text like pd.read_csv does; Arrow would decode them
+            # to datetime.date objects, which JSON responses cannot serialize
+            reader.close()
+            convert_options = pa_csv.ConvertOptions(column_types={name: pa.string() for name in temporal})
+            reader = pa_csv.open_csv(raw_path, read_options=read_options, convert_options=convert_options)
+        schema = reader.schema.with_metadata(self._schema_metadata(reader.schema, filename, content_hash))
+        path = self.path(file_id)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+
+        n_rows = 0
+        preview = []
+        try:
+            with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+                for batch in reader:
+                    if len(preview) < PREVIEW_ROWS:
+                        head = batch.slice(0, PREVIEW_ROWS - len(preview))
+                        preview.extend(head.to_pandas().to_dict(orient="records"))
+                    writer.write_batch(batch)
+                    n_rows += batch.num_rows
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        print(f"📦 Streamed dataset {file_id} to disk ({n_rows} rows)")
+        return {
+            "columns": schema.names,
+            "shape": [n_rows, len(schema.names)],
+            "preview": preview,
+        }
+
+    @staticmethod
+    def _schema_metadata(schema: pa.Schema, filename: str, content_hash: str) -> dict:
+        metadata = dict(schema.metadata or {})
+        metadata[FILENAME_META_KEY] = filename.encode("utf-8")
+        if content_hash:
+            metadata[CONTENT_HASH_META_KEY] = content_hash.encode("utf-8")
+        return metadata
+
+    @staticmethod
+    def _filename_from_schema(table: pa.Table) -> str:
+        metadata = table.schema.metadata or {}
+        return metadata.get(FILENAME_META_KEY, b"").decode("utf-8")
+
+    @staticmethod
+    def _content_hash_from_schema(table: pa.Table) -> str:
+        metadata = table.schema.metadata or {}
+        return metadata.get(CONTENT_HASH_META_KEY, b"").decode("utf-8") or None
+
+    @staticmethod
+    def _view(df: pd.DataFrame, content_hash: str = None) -> pd.DataFrame:
+        # A shallow copy shares the column buffers but not the column index, so
+        # callers that assign columns (e.g. the chart agent parsing dates) never
+        # touch the cached frame. Callers that mutate values must copy first.
+        view = df.copy(deep=False)
+        if content_hash:
+            set_content_hash(view, content_hash)  # lets dataset_profile skip hashing the values
+        return view
+
+    def _discard(self, file_id: str) -> bool:
+        entry = self._entries.pop(file_id, None)
+        if entry:
+            self._total_bytes -= entry["nbytes"]
+        return entry is not None
+
+    def _evict(self):
+        # Always keep the most recent entry even if it alone exceeds the budget
+        while self._total_bytes > self.budget_bytes and len(self._entries) > 1:
+            evicted_id, entry = self._entries.popitem(last=False)
+            self._total_bytes -= entry["nbytes"]
+            print(f"♻️ Evicted dataset {evicted_id} from memory (still on disk)")
+
+
+dataset_store = DatasetStore()
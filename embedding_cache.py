@@ -0,0 +1,204 @@
+# agents/embedding_cache.py
+
+"""
+Embedding Cache for DecisionIQ
+------------------------------
+Disk-backed cache of row embeddings keyed by a hash of the row text, so
+re-uploading the same or overlapping data only encodes rows never seen before.
+
+    <EMBED_CACHE_DIR>/<model>/vectors.npy  memory-mapped (capacity, dim) float16/float32 array
+    <EMBED_CACHE_DIR>/<model>/slots.npz    key, occupancy and last-use tick per slot
+    <EMBED_CACHE_DIR>/<model>/meta.json    dim, dtype, capacity
+
+When full, the least recently used slots are evicted in bulk. Before an
+evicted slot is overwritten, the slot table is persisted with it marked free,
+so a crash never pairs a stored key with another text's vector. One process
+owns a cache dir at a time (file lock); other processes run without the cache.
+"""
+
+import os
+import json
+import fcntl
+import atexit
+import threading
+import numpy as np
+
+EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+EMBED_CACHE_DIR = os.getenv("EMBED_CACHE_DIR", "embedding_cache")
+EMBED_CACHE_MAX_ENTRIES = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "500000"))
+EMBED_CACHE_DTYPE = os.getenv("EMBED_CACHE_DTYPE", "float16")
+EVICT_EXTRA_FRACTION = 0.05  # evict a little more than needed so eviction isn't run on every insert
+
+
+class EmbeddingCache:
+    def __init__(self, cache_dir: str, max_entries: int = EMBED_CACHE_MAX_ENTRIES, dtype: str = EMBED_CACHE_DTYPE):
+        self.cache_dir = cache_dir
+        self.capacity = max_entries
+        self.dtype = np.dtype(dtype)
+        self._lock = threading.Lock()
+        self._vectors = None
+        self._keys = np.zeros(self.capacity, dtype=np.uint64)
+        self._occupied = np.zeros(self.capacity, dtype=bool)
+        self._persisted_occupied = np.zeros(self.capacity, dtype=bool)  # occupancy as slots.npz has it
+        self._last_used = np.zeros(self.capacity, dtype=np.int64)
+        self._tick = 0
+        self._dirty_index = True
+        self._dirty_state = False
+        self.hits = self.misses = self.evictions = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock_file = open(os.path.join(cache_dir, ".lock"), "w")
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)  # raises if another process owns it
+        self._load()
+
+    # --- Public API ---
+    def get_many(self, keys: np.ndarray):
+        """
+        Looks up uint64 keys. Returns (vectors, missing_positions) where vectors is a
+        float32 (n, dim) array filled for hits, or None if the cache is still empty.
+        """
+        keys = np.asarray(keys, dtype=np.uint64)
+        with self._lock:
+            if self._vectors is None:
+                self.misses += len(keys)
+                return None, np.arange(len(keys))
+            hit, slots = self._find(keys)
+            out = np.empty((len(keys), self._vectors.shape[1]), dtype=np.float32)
+            out[hit] = self._vectors[slots]
+            self._tick += 1
+            self._last_used[slots] = self._tick
+            self._dirty_state = True
+            self.hits += int(hit.sum())
+            self.misses += int((~hit).sum())
+            return out, np.flatnonzero(~hit)
+
+    def put_many(self, keys: np.ndarray, vectors: np.ndarray):
+        keys, first = np.unique(np.asarray(keys, dtype=np.uint64), return_index=True)
+        vectors = np.asarray(vectors)[first]
+        with self._lock:
+            if self._vectors is None:
+                self._create(vectors.shape[1])
+            hit, _ = self._find(keys)
+            keys, vectors = keys[~hit][-self.capacity:], vectors[~hit][-self.capacity:]
+            if not len(keys):
+                return
+
+            free = np.flatnonzero(~self._occupied)
+            if len(free) < len(keys):
+                self._evict(len(keys) - len(free) + int(self.capacity * EVICT_EXTRA_FRACTION))
+                free = np.flatnonzero(~self._occupied)
+            slots = free[:len(keys)]
+            if self._persisted_occupied[slots].any():
+                self._persist()  # the evictions must reach disk before their slots are overwritten
+
+            self._tick += 1
+            self._vectors[slots] = vectors.astype(self.dtype)
+            self._keys[slots] = keys
+            self._occupied[slots] = True
+            self._last_used[slots] = self._tick
+            self._dirty_index = self._dirty_state = True
+
+    def flush(self):
+        """Persists the vectors and slot table."""
+        with self._lock:
+            if self._vectors is None or not self._dirty_state:
+                return
+            self._persist()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": int(self._occupied.sum()),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+    # --- Internals ---
+    def _persist(self):
+        # Vectors first, so the slot table never points at data that isn't on disk
+        self._vectors.flush()
+        path = os.path.join(self.cache_dir, "slots.npz")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, keys=self._keys, occupied=self._occupied, last_used=self._last_used, tick=np.int64(self._tick))
+        os.replace(tmp_path, path)
+        self._persisted_occupied = self._occupied.copy()
+        self._dirty_state = False
+
+    def _find(self, keys: np.ndarray):
+        if self._dirty_index:
+            occupied_slots = np.flatnonzero(self._occupied)
+            order = np.argsort(self._keys[occupied_slots])
+            self._sorted_keys = self._keys[occupied_slots][order]
+            self._sorted_slots = occupied_slots[order]
+            self._dirty_index = False
+        if not len(self._sorted_keys):
+            return np.zeros(len(keys), dtype=bool), np.empty(0, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self._sorted_keys, keys), len(self._sorted_keys) - 1)
+        hit = self._sorted_keys[positions] == keys
+        return hit, self._sorted_slots[positions[hit]]
+
+    def _evict(self, count: int):
+        count = min(count, int(self._occupied.sum()))
+        ages = np.where(self._occupied, self._last_used, np.iinfo(np.int64).max)
+        victims = np.argpartition(ages, count - 1)[:count] if count else np.empty(0, dtype=np.int64)
+        self._occupied[victims] = False
+        self.evictions += len(victims)
+        self._dirty_index = True
+
+    def _create(self, dim: int):
+        # A slot table left by other cache settings must not describe the new vectors
+        stale_slots = os.path.join(self.cache_dir, "slots.npz")
+        if os.path.exists(stale_slots):
+            os.remove(stale_slots)
+        self._vectors = np.lib.format.open_memmap(
+            os.path.join(self.cache_dir, "vectors.npy"), mode="w+", dtype=self.dtype, shape=(self.capacity, dim)
+        )
+        with open(os.path.join(self.cache_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"dim": dim, "dtype": self.dtype.name, "capacity": self.capacity}, f)
+
+    def _load(self):
+        meta_path = os.path.join(self.cache_dir, "meta.json")
+        slots_path = os.path.join(self.cache_dir, "slots.npz")
+        if not (os.path.exists(meta_path) and os.path.exists(slots_path)):
+            return
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("dtype") != self.dtype.name or meta.get("capacity") != self.capacity:
+            print("⚠️ Embedding cache settings changed, starting with an empty cache.")
+            return
+        self._vectors = np.load(os.path.join(self.cache_dir, "vectors.npy"), mmap_mode="r+")
+        with np.load(slots_path) as state:
+            self._keys = state["keys"].copy()
+            self._occupied = state["occupied"].copy()
+            self._persisted_occupied = self._occupied.copy()
+            self._last_used = state["last_used"].copy()
+            self._tick = int(state["tick"])
+        print(f"📂 Loaded embedding cache with {int(self._occupied.sum())} vectors")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+_cache_unavailable = False
+
+
+def get_embedding_cache(model_name: str):
+    """Returns the process-wide cache for a model, or None if disabled or owned by another process."""
+    global _cache, _cache_unavailable
+    if not EMBED_CACHE_ENABLED or _cache_unavailable:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            cache_dir = os.path.join(EMBED_CACHE_DIR, model_name.replace("/", "__"))
+            try:
+                _cache = EmbeddingCache(cache_dir)
+                atexit.register(_cache.flush)
+            except BlockingIOError:
+                print("⚠️ Embedding cache is in use by another process; encoding without it.")
+                _cache_unavailable = True
+                return None
+        return _cache
@@ -3,16 +3,15 @@
 import os
 import faiss
 import pandas as pd
-from sentence_transformers import SentenceTransformer
 import numpy as np
-import json
-
-# Load embedder
-EMBED_MODEL = "all-MiniLM-L6-v2"
-embedder = SentenceTransformer(EMBED_MODEL)
+from agents.row_store import write_row_store, open_row_store
+from agents.index_factory import create_index, needs_training, training_sample_ids, train_index, apply_search_params
+from agents.embedding_service import encode_cached, flush_embedding_cache
+from agents.row_serializer import serialize_rows
+from agents.lexical_index import build_lexical_index
 
 def embed_row(row: pd.Series) -> str:
-    """Convert a row into a single string representation."""
+    """Convert a row into a single string representation (single-row helper, see serialize_rows)."""
     return " | ".join([f"{col}: {row[col]}" for col in row.index if pd.notna(row[col])])
 
 def build_faiss_index(df: pd.DataFrame, index_save_path="faiss_index"):
@@ -25,26 +24,27 @@ def build_faiss_index(df: pd.DataFrame, index_save_path="faiss_index"):
     """
     os.makedirs(index_save_path, exist_ok=True)
 
-    texts = df.apply(embed_row, axis=1).tolist()
-    embeddings = embedder.encode(texts, show_progress_bar=True, convert_to_numpy=True)
+    texts = serialize_rows(df, sep=" | ", skip_na=True)
+    embeddings = encode_cached(texts, show_progress_bar=True)
+    flush_embedding_cache()
 
     dim = embeddings.shape[1]
-    index = faiss.IndexFlatL2(dim)
+    index = create_index(dim, len(texts))
+    if needs_training(index):
+        train_index(index, embeddings[training_sample_ids(len(texts))])
     index.add(embeddings)
 
     # Save index
     faiss.write_index(index, os.path.join(index_save_path, "index.faiss"))
 
-    # Save metadata
-    metadata = [{"row": i, "text": texts[i]} for i in range(len(texts))]
-    with open(os.path.join(index_save_path, "metadata.json"), "w", encoding="utf-8") as f:
-        json.dump(metadata, f, indent=2)
+    # Save row texts; the FAISS id of each vector is its row number in the store
+    write_row_store(index_save_path, texts)
+    build_lexical_index(index_save_path)
 
     print(f"✅ FAISS index built with {len(texts)} rows.")
 
 
 def load_faiss_index(index_path="faiss_index"):
-    index = faiss.read_index(os.path.join(index_path, "index.faiss"))
-    with open(os.path.join(index_path, "metadata.json"), "r", encoding="utf-8") as f:
-        metadata = json.load(f)
-    return index, metadata
+    """Returns (index, rows) where rows[i] is the text of FAISS id i."""
+    index = apply_search_params(faiss.read_index(os.path.join(index_path, "index.faiss")))
+    return index, open_row_store(index_path)
@@ -0,0 +1,131 @@
+# agents/embedding_service.py
+
+"""
+Shared sentence-embedding service. The SentenceTransformer model is loaded
+lazily, once per process, and used by index building and retrieval alike.
+Concurrent single-question encodes are coalesced by a micro-batching queue
+so that simultaneous Q&A requests share one forward pass. Row encodes for
+index builds go through the persistent embedding cache.
+"""
+
+import os
+import queue
+import threading
+from concurrent.futures import Future
+import numpy as np
+from agents.embedding_cache import get_embedding_cache
+from agents.index_manifest import hash_texts
+
+EMBED_MODEL = os.getenv("EMBED_MODEL", "all-MiniLM-L6-v2")
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+EMBED_THREADS = int(os.getenv("EMBED_THREADS", "0"))  # 0 keeps torch's default
+MICROBATCH_WINDOW_MS = float(os.getenv("EMBED_MICROBATCH_MS", "5"))  # 0 disables micro-batching
+MICROBATCH_MAX_SIZE = 64
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_embedder():
+    """Returns the process-wide SentenceTransformer, loading it on first use."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                from sentence_transformers import SentenceTransformer
+                if EMBED_THREADS > 0:
+                    import torch
+                    torch.set_num_threads(EMBED_THREADS)
+                _model = SentenceTransformer(EMBED_MODEL)
+                print(f"✅ Loaded embedding model {EMBED_MODEL}")
+    return _model
+
+
+def encode(texts, batch_size: int = EMBED_BATCH_SIZE, show_progress_bar: bool = False) -> np.ndarray:
+    """Encodes a list of texts into a float32 (n, dim) array."""
+    embeddings = get_embedder().encode(
+        list(texts), batch_size=batch_size, convert_to_numpy=True, show_progress_bar=show_progress_bar
+    )
+    return np.asarray(embeddings, dtype="float32")
+
+
+def encode_cached(texts, batch_size: int = EMBED_BATCH_SIZE, show_progress_bar: bool = False) -> np.ndarray:
+    """Like encode(), but reuses cached vectors for texts embedded before and caches the rest."""
+    texts = list(texts)
+    cache = get_embedding_cache(EMBED_MODEL)
+    if cache is None or not texts:
+        return encode(texts, batch_size, show_progress_bar)
+
+    keys = hash_texts(texts)
+    vectors, missing = cache.get_many(keys)
+    if len(missing):
+        fresh = encode([texts[i] for i in missing], batch_size, show_progress_bar)
+        cache.put_many(keys[missing], fresh)
+        if vectors is None:
+            return fresh
+        vectors[missing] = fresh
+    return vectors
+
+
+def flush_embedding_cache():
+    cache = get_embedding_cache(EMBED_MODEL)
+    if cache is not None:
+        cache.flush()
+
+
+def embedding_cache_stats() -> dict:
+    cache = get_embedding_cache(EMBED_MODEL)
+    return cache.stats() if cache is not None else {"enabled": False}
+
+
+class QueryBatcher:
+    """
+    Collects single-text encode requests for up to window_ms and encodes
+    them together, returning each caller its own row.
+    """
+
+    def __init__(self, window_ms: float = MICROBATCH_WINDOW_MS, max_size: int = MICROBATCH_MAX_SIZE):
+        self.window = window_ms / 1000
+        self.max_size = max_size
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def encode(self, text: str) -> np.ndarray:
+        future = Future()
+        self._queue.put((text, future))
+        self._ensure_worker()
+        return future.result()
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="embed-batcher", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            try:
+                while len(batch) < self.max_size:
+                    batch.append(self._queue.get(timeout=self.window))
+            except queue.Empty:
+                pass
+            texts = [text for text, _ in batch]
+            try:
+                vectors = encode(texts)
+                for i, (_, future) in enumerate(batch):
+                    future.set_result(vectors[i:i + 1])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+
+
+_query_batcher = QueryBatcher()
+
+
+def encode_query(text: str) -> np.ndarray:
+    """Encodes one query into a (1, dim) array, sharing a forward pass with concurrent queries."""
+    if MICROBATCH_WINDOW_MS <= 0:
+        return encode([text])
+    return _query_batcher.encode(text)
@@ -1,4 +1,5 @@
 import pandas as pd
+from agents.dataset_profile import get_profile
 
 def _is_financial_metric(name):
     keywords = ['sales', 'revenue', 'price', 'amount', 'cost', 'value', 'profit', 'income', 'budget', 'spend', 'transaction', 'order', 'purchase', 'total', 'net', 'gross']
@@ -18,8 +19,7 @@ def extract_kpis(df):
         return {"error": "DataFrame is empty."}
 
     try:
-        num_df = df.select_dtypes(include='number')
-        stats = num_df.describe()
+        stats = get_profile(df).describe
         kpis_output = {}
 
         for col in stats.columns:
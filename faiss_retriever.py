@@ -0,0 +1,138 @@
+# agents/faiss_retriever.py
+
+"""
+Long-lived FAISS retriever. Loads an index and opens its row store once, keeps
+them resident and only reloads when the files on disk change, so a question
+costs one vector search plus k row lookups. When the index dir also holds a
+BM25 lexical index, searches given the question text fuse both rankings.
+A row mask (from query_filters) restricts a search to the matching rows.
+"""
+
+import os
+import time
+import threading
+import faiss
+import numpy as np
+from agents.row_store import open_row_store, row_store_file
+from agents.index_factory import apply_search_params, selector_search_params
+from agents.index_manifest import load_manifest
+from agents.lexical_index import LexicalIndex, LEXICAL_FILE, has_lexical_index, reciprocal_rank_fusion
+
+RELOAD_CHECK_SECONDS = float(os.getenv("FAISS_RELOAD_CHECK_SECONDS", "2"))
+USE_MMAP = os.getenv("FAISS_MMAP", "false").lower() in ("1", "true", "yes")
+HYBRID_SEARCH = os.getenv("RAG_HYBRID_SEARCH", "true").lower() in ("1", "true", "yes")
+# Each retriever contributes this many candidates (at least) to rank fusion
+HYBRID_CANDIDATES = int(os.getenv("RAG_HYBRID_CANDIDATES", "20"))
+
+INDEX_FILE = "index.faiss"
+
+
+class FaissRetriever:
+    def __init__(self, index_dir: str, mmap: bool = USE_MMAP):
+        self.index_dir = index_dir
+        self.mmap = mmap
+        self.index = None
+        self.rows = None
+        self.lexical = None
+        self.row_ids = None
+        self._version = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self, force: bool = False):
+        """Reloads the index if its files changed. Stats the files at most every RELOAD_CHECK_SECONDS."""
+        now = time.monotonic()
+        if not force and self.index is not None and now - self._last_check < RELOAD_CHECK_SECONDS:
+            return
+        with self._lock:
+            self._last_check = now
+            version = self._file_version()
+            if version == self._version:
+                return
+            index = self._read_index()
+            rows = open_row_store(self.index_dir)
+            lexical = LexicalIndex(self.index_dir) if has_lexical_index(self.index_dir) else None
+            manifest = load_manifest(self.index_dir)
+            row_ids = manifest[1] if manifest else None
+            # Swap all together so concurrent searches never mix versions
+            self.index, self.rows, self.lexical, self.row_ids, self._version = index, rows, lexical, row_ids, version
+        print(f"📂 Loaded FAISS index from '{self.index_dir}' ({index.ntotal} vectors)")
+
+    def search(self, query_vectors, top_k: int = 5, query_text: str = None, row_mask=None) -> list:
+        """
+        Returns the row texts of the top_k best rows for the first query vector.
+        With query_text and a lexical index, vector and BM25 candidates are merged
+        by reciprocal rank fusion so exact IDs, SKUs and dates are not missed.
+        row_mask (one bool per dataset row) limits the search to matching rows;
+        if the mask can't be mapped to ids or filtering finds too little, the
+        whole index is searched instead.
+        """
+        self.refresh()
+        index, rows, lexical = self.index, self.rows, self.lexical
+        allowed_ids = self._ids_for_rows(row_mask) if row_mask is not None else None
+        if allowed_ids is not None:
+            if len(allowed_ids) <= top_k:
+                return rows.get_many(allowed_ids)  # every match fits, nothing to rank
+            try:
+                found = self._ranked_ids(index, lexical, query_vectors, top_k, query_text, allowed_ids)
+                if len(found) >= top_k:
+                    return rows.get_many(found)
+            except (RuntimeError, AttributeError, TypeError) as e:
+                print(f"⚠️ Filtered FAISS search unavailable ({e}), searching all rows.")
+        return rows.get_many(self._ranked_ids(index, lexical, query_vectors, top_k, query_text))
+
+    def _ranked_ids(self, index, lexical, query_vectors, top_k, query_text=None, allowed_ids=None) -> list:
+        hybrid = query_text and lexical is not None and HYBRID_SEARCH
+        n_candidates = max(top_k, HYBRID_CANDIDATES) if hybrid else top_k
+        if allowed_ids is None:
+            _, ids = index.search(query_vectors, n_candidates)
+        else:
+            params = selector_search_params(index, allowed_ids)
+            _, ids = index.search(query_vectors, n_candidates, params=params)
+        vector_ids = [int(i) for i in ids[0] if i >= 0]
+        if not hybrid:
+            return vector_ids
+        lexical_ids = lexical.search(query_text, n_candidates, allowed_ids=allowed_ids)
+        return reciprocal_rank_fusion(vector_ids, lexical_ids, top_k=top_k)
+
+    def _ids_for_rows(self, row_mask):
+        """FAISS ids of the masked rows, or None if the mask doesn't line up with this index."""
+        row_mask = np.asarray(row_mask, dtype=bool)
+        if not row_mask.any():
+            return None
+        if self.row_ids is not None:
+            return self.row_ids[row_mask] if len(self.row_ids) == len(row_mask) else None
+        # Indexes without a manifest use the row position as id
+        return np.flatnonzero(row_mask) if len(self.rows) == len(row_mask) else None
+
+    def _file_version(self):
+        names = [INDEX_FILE, row_store_file(self.index_dir)]
+        if has_lexical_index(self.index_dir):
+            names.append(LEXICAL_FILE)
+        return tuple(os.stat(os.path.join(self.index_dir, name)).st_mtime_ns for name in names)
+
+    def _read_index(self):
+        path = os.path.join(self.index_dir, INDEX_FILE)
+        index = None
+        if self.mmap:
+            try:
+                index = faiss.read_index(path, faiss.IO_FLAG_MMAP)
+            except RuntimeError as e:
+                print(f"⚠️ Memory-mapped load not supported for this index ({e}), reading into RAM.")
+        if index is None:
+            index = faiss.read_index(path)
+        # nprobe / efSearch are not persisted with the index
+        return apply_search_params(index)
+
+
+_retrievers = {}
+_retrievers_lock = threading.Lock()
+
+
+def get_retriever(index_dir: str) -> FaissRetriever:
+    """Returns the shared retriever for an index directory, creating it on first use."""
+    key = os.path.abspath(index_dir)
+    with _retrievers_lock:
+        if key not in _retrievers:
+            _retrievers[key] = FaissRetriever(index_dir)
+        return _retrievers[key]
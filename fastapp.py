@@ -4,13 +4,15 @@ import json
 import pandas as pd
 import uvicorn
 from fastapi import FastAPI, UploadFile, File, HTTPException, Query, BackgroundTasks
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from io import BytesIO
+from starlette.concurrency import run_in_threadpool
 from typing import Optional, List
 import threading
 import uuid
+import asyncio
+import hashlib
 import datetime
 from motor.motor_asyncio import AsyncIOMotorClient
 from bson import ObjectId
@@ -30,19 +32,26 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from eda.perform_eda import perform_eda
 from kpi.extract_kpis import extract_kpis
 from chart.generate_charts import smart_chart_agent
-from agents.summarize_insights import generate_summary_from_df
-from agents.feedback_regeneration import regenerate_summary_from_feedback
-from agents.qa_agent import run_rag_qa_agent
+from agents.summarize_insights import generate_summary_from_df, stream_summary_from_df
+from agents.feedback_regeneration import regenerate_summary_from_feedback, stream_regenerated_summary
 from agents.goal_agent import run_goal_pipeline
 from agents.proactive_agent import detect_proactive_signals
 from agents.alert_summarizer import generate_alert_summary
-from agents.build_faiss_index import build_faiss_index
-from agents.rag_faiss_agent import run_faiss_rag_agent
+from agents.build_faiss_index import start_index_build, get_index_status
+from agents.embedding_service import embedding_cache_stats
 from agents.memory_logger import log_feedback, load_recent_sessions
 from agents.slack_utils import send_summary_to_slack
 from monitor.continuous_monitor import watch_for_new_files
 from logic.auto_pipeline import run_auto_pipeline
 from agents.url_monitor_agent import start_url_monitoring
+from agents.dataset_store import dataset_store, UPLOAD_CHUNK_BYTES
+from agents.job_queue import job_manager, QueueFullError, TERMINAL_STATES
+from agents.analysis_jobs import run_stage, route_question, stream_route_question, STAGE_POOLS
+from agents.llm_stream import sse_stream
+from agents.llm_cache import llm_cache_stats
+from agents.local_runtime import get_local_runtime
+from agents.prompt_budget import prompt_stats
+from agents.qa_explanations import EXPLAIN_MODES, get_deferred_explanations
 from agents.analysis_modes import (
     generate_swot_analysis,
     generate_financial_analysis,
@@ -68,68 +77,107 @@ app.add_middleware(
 # Mount the outputs directory to serve charts as static files
 app.mount("/outputs", StaticFiles(directory="outputs"), name="outputs")
 
-# --- GLOBAL STATE FOR BACKGROUND TASKS AND IN-MEMORY DATA ---
+# --- GLOBAL STATE FOR BACKGROUND TASKS ---
 monitor_thread: Optional[threading.Thread] = None
-in_memory_data: dict = {}
 
 # --- UTILITY FUNCTIONS ---
 def read_uploaded_file(file_id: str):
-    """Loads a DataFrame from a temporary location using a file_id."""
-    if file_id not in in_memory_data:
-        raise HTTPException(status_code=404, detail="File ID not found.")
-
-    file_content = in_memory_data[file_id]['content']
-    filename = in_memory_data[file_id]['filename']
-
+    """Returns the parsed dataset for a file_id (a shallow copy of the cached frame)."""
     try:
-        if filename.endswith(".csv"):
-            return pd.read_csv(BytesIO(file_content))
-        elif filename.endswith((".xlsx", ".xls")):
-            return pd.read_excel(BytesIO(file_content))
-        else:
-            raise ValueError("Unsupported file type.")
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Error reading file: {e}")
+        return dataset_store.get(file_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="File ID not found.")
 
 # --- API ENDPOINTS ---
 
 @app.post("/api/upload")
 async def upload_dataset(file: UploadFile = File(...)):
-    """Uploads a dataset, stores it, and returns a unique file_id."""
+    """Streams a dataset to disk in chunks, stores it, and returns a unique file_id."""
     file_id = str(uuid.uuid4())
-    file_content = await file.read()
+    raw_path = dataset_store.spool_path(file_id, file.filename)
 
-    in_memory_data[file_id] = {
-        "content": file_content,
-        "filename": file.filename,
-    }
+    # Spool the body to disk chunk by chunk, hashing as we go; file I/O stays off the event loop
+    hasher = hashlib.sha256()
 
-    df = read_uploaded_file(file_id)
-    build_faiss_index(df)
+    def spool(out, chunk):
+        hasher.update(chunk)
+        out.write(chunk)
+
+    try:
+        out = await run_in_threadpool(open, raw_path, "wb")
+        try:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                await run_in_threadpool(spool, out, chunk)
+        finally:
+            await run_in_threadpool(out.close)
+
+        try:
+            info = await run_in_threadpool(
+                dataset_store.ingest_file, file_id, raw_path, file.filename, hasher.hexdigest()
+            )
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Error reading file: {e}")
+    finally:
+        # ingest_file removes the spool file itself; this covers disconnects and failures before it
+        if os.path.exists(raw_path):
+            os.remove(raw_path)
+
+    # Embedding every row can take minutes, so the index is built in the background,
+    # which also loads the dataset (decoding a large file here would block the event loop)
+    index_status = start_index_build(file_id, content_hash=hasher.hexdigest())
 
     return {
         "file_id": file_id,
         "filename": file.filename,
-        "columns": df.columns.tolist(),
-        "shape": df.shape,
-        "preview": df.head().to_dict(orient="records")
+        "columns": info["columns"],
+        "shape": info["shape"],
+        "preview": info["preview"],
+        "index_status": index_status["status"]
     }
 
+@app.get("/api/index_status")
+def index_status(file_id: str = Query(...)):
+    """Reports the background FAISS index build status for a dataset."""
+    return {"file_id": file_id, **get_index_status(file_id)}
+
+@app.get("/api/embedding_cache/stats")
+def get_embedding_cache_stats():
+    """Hit/miss counters of the persistent row-embedding cache."""
+    return embedding_cache_stats()
+
+@app.get("/api/llm_cache/stats")
+def get_llm_cache_stats():
+    """Entry count and per-endpoint hit/miss counters of the LLM response cache."""
+    return llm_cache_stats()
+
+@app.get("/api/local_llm/stats")
+def get_local_llm_stats():
+    """Local model scheduler metrics: batch sizes, queue wait vs generation time, tokens/s."""
+    return get_local_runtime().stats()
+
+@app.get("/api/prompt_budget/stats")
+def get_prompt_budget_stats():
+    """Prompt token counts per call site and how often the context had to be trimmed."""
+    return prompt_stats()
+
 @app.post("/api/eda")
-async def run_eda(file_id: str = Query(...)):
+def run_eda(file_id: str = Query(...)):
     """Performs Exploratory Data Analysis on the uploaded dataset."""
     df = read_uploaded_file(file_id)
     eda_result = perform_eda(df)
     return JSONResponse(content={"eda_result": eda_result})
 
 @app.post("/api/kpis")
-async def get_kpis(file_id: str = Query(...)):
+def get_kpis(file_id: str = Query(...)):
     df = read_uploaded_file(file_id)
     kpis = extract_kpis(df)
     return JSONResponse(content={"kpis": kpis})
 
 @app.post("/api/charts")
-async def generate_charts(file_id: str = Query(...)):
+def generate_charts(file_id: str = Query(...)):
     df = read_uploaded_file(file_id)
     chart_paths, chart_summaries = smart_chart_agent(df)
     return JSONResponse(content={
@@ -138,13 +186,25 @@ async def generate_charts(file_id: str = Query(...)):
     })
 
 @app.post("/api/summary")
-async def generate_summary(file_id: str = Query(...), model_mode: str = "cloud"):
+def generate_summary(file_id: str = Query(...), model_mode: str = "cloud"):
     df = read_uploaded_file(file_id)
     summary = generate_summary_from_df(df, domain="auto", model_mode=model_mode)
     return JSONResponse(content={"summary": summary})
 
+# Sync generators: Starlette iterates them in its threadpool, so LLM calls never block the event loop
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def sse_response(events):
+    return StreamingResponse(sse_stream(events), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@app.post("/api/summary/stream")
+def stream_summary(file_id: str = Query(...), model_mode: str = "cloud"):
+    """Server-Sent Events: "token" events as the summary is generated, then "done" with the full summary."""
+    df = read_uploaded_file(file_id)
+    return sse_response(stream_summary_from_df(df, domain="auto", model_mode=model_mode))
+
 @app.post("/api/regenerate_summary")
-async def regenerate_summary_endpoint(
+def regenerate_summary_endpoint(
     file_id: str = Query(...),
     summary: str = Query(...),
     feedback: str = Query(...),
@@ -154,24 +214,51 @@ async def regenerate_summary_endpoint(
     improved_summary = regenerate_summary_from_feedback(df, summary, feedback, model_mode)
     return JSONResponse(content={"improved_summary": improved_summary})
 
+@app.post("/api/regenerate_summary/stream")
+def stream_regenerate_summary(
+    file_id: str = Query(...),
+    summary: str = Query(...),
+    feedback: str = Query(...),
+    model_mode: str = "cloud"
+):
+    df = read_uploaded_file(file_id)
+    return sse_response(stream_regenerated_summary(df, summary, feedback, model_mode))
+
 @app.post("/api/qa")
-async def ask_question(
+def ask_question(
     file_id: str = Query(...),
     question: str = Query(...),
-    model_mode: str = "cloud"
+    model_mode: str = "cloud",
+    explain: str = "eager"
+):
+    """explain=eager|lazy|skip; lazy answers return an explain_id for /api/qa/explain/{explain_id}."""
+    if explain not in EXPLAIN_MODES:
+        raise HTTPException(status_code=400, detail=f"explain must be one of: {', '.join(EXPLAIN_MODES)}")
+    df = read_uploaded_file(file_id)
+    return JSONResponse(content=route_question(df, question, model_mode=model_mode, file_id=file_id, explain=explain))
+
+@app.post("/api/qa/stream")
+def stream_question(
+    file_id: str = Query(...),
+    question: str = Query(...),
+    model_mode: str = "cloud",
+    explain: str = "lazy"
 ):
+    """Server-Sent Events: "route", "code"/"result" or "context", answer "token"s, then "done"."""
+    if explain not in EXPLAIN_MODES:
+        raise HTTPException(status_code=400, detail=f"explain must be one of: {', '.join(EXPLAIN_MODES)}")
     df = read_uploaded_file(file_id)
-    natural_keywords = ["who", "when", "which", "show", "list", "customer", "order", "message", "chat", "complain", "comment", "email", "review"]
-    question_lower = question.lower()
-    if any(kw in question_lower for kw in natural_keywords):
-        answer = run_faiss_rag_agent(question, model_mode=model_mode)
-        return JSONResponse(content={"mode": "faiss", "answer": answer})
-    else:
-        output = run_rag_qa_agent(df, question, model_mode=model_mode)
-        return JSONResponse(content={"mode": "codegen", "output": output})
+    return sse_response(stream_route_question(df, question, model_mode=model_mode, file_id=file_id, explain=explain))
+
+@app.get("/api/qa/explain/{explain_id}")
+def get_qa_explanation(explain_id: str):
+    try:
+        return JSONResponse(content=get_deferred_explanations(explain_id))
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Unknown or expired explain_id.")
 
 @app.post("/api/goal")
-async def run_goal_agent(
+def run_goal_agent(
     file_id: str = Query(...),
     goal: str = Query(...)
 ):
@@ -180,7 +267,7 @@ async def run_goal_agent(
     return JSONResponse(content={"report": report})
 
 @app.post("/api/alerts")
-async def get_proactive_alerts(file_id: str = Query(...), model_mode: str = "cloud"):
+def get_proactive_alerts(file_id: str = Query(...), model_mode: str = "cloud"):
     df = read_uploaded_file(file_id)
     proactive_signals = detect_proactive_signals(df)
     alert_summary = generate_alert_summary(proactive_signals, model_mode=model_mode)
@@ -189,17 +276,91 @@ async def get_proactive_alerts(file_id: str = Query(...), model_mode: str = "clo
         "raw_alerts": proactive_signals.strip().split("\n")
     })
 
+# --- BACKGROUND JOBS ---
+
+@app.post("/api/jobs")
+def submit_job(
+    stage: str = Query(...),
+    file_id: str = Query(...),
+    model_mode: str = "cloud",
+    question: Optional[str] = None,
+    goal: Optional[str] = None
+):
+    """Queues an analysis stage and returns a job_id to poll."""
+    if stage not in STAGE_POOLS:
+        raise HTTPException(status_code=400, detail=f"Unknown stage '{stage}'. Choose from: {', '.join(STAGE_POOLS)}")
+    if file_id not in dataset_store:
+        raise HTTPException(status_code=404, detail="File ID not found.")
+    try:
+        job_id = job_manager.submit(
+            stage, run_stage, stage, file_id,
+            pool=STAGE_POOLS[stage], model_mode=model_mode, question=question, goal=goal
+        )
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    return {"job_id": job_id, "status": "queued"}
+
+@app.get("/api/jobs/metrics")
+def get_job_metrics():
+    return job_manager.metrics()
+
+@app.get("/api/jobs/{job_id}")
+def get_job_status(job_id: str):
+    try:
+        return job_manager.status(job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Job not found.")
+
+@app.get("/api/jobs/{job_id}/result")
+def get_job_result(job_id: str):
+    try:
+        status, result = job_manager.result(job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    if status != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job is {status}.")
+    return JSONResponse(content=result)
+
+@app.get("/api/jobs/{job_id}/events")
+async def stream_job_status(job_id: str):
+    """Server-Sent Events stream of job status updates until the job finishes."""
+    try:
+        job_manager.status(job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Job not found.")
+
+    async def event_stream():
+        last_status = None
+        while True:
+            status = job_manager.status(job_id)
+            if status["status"] != last_status:
+                last_status = status["status"]
+                yield f"data: {json.dumps(status)}\n\n"
+            if last_status in TERMINAL_STATES:
+                break
+            await asyncio.sleep(0.5)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+@app.delete("/api/jobs/{job_id}")
+def cancel_job(job_id: str):
+    try:
+        cancelled = job_manager.cancel(job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return {"job_id": job_id, "cancelled": cancelled}
+
 @app.get("/api/sessions")
 def get_recent_sessions():
     return JSONResponse(content={"sessions": load_recent_sessions(limit=5)})
 
 @app.post("/api/log_feedback")
-async def log_user_feedback(feedback_entry: dict):
+def log_user_feedback(feedback_entry: dict):
     log_feedback(feedback_entry["session_id"], feedback_entry["feedback"])
     return {"status": "success"}
 
 @app.post("/api/slack/send_summary")
-async def send_to_slack(summary: str, webhook_url: str):
+def send_to_slack(summary: str, webhook_url: str):
     send_summary_to_slack(summary, webhook_url)
     return {"status": "success"}
 
@@ -237,6 +398,21 @@ def get_auto_analysis_status():
 def health_check():
     return {"status": "ok"}
 
+def run_analysis(df, analysis_type: str, model_mode: str):
+    if analysis_type == "summary":
+        return generate_summary_from_df(df, model_mode=model_mode)
+    elif analysis_type == "kpi":
+        return extract_kpis(df)
+    elif analysis_type == "swot":
+        return generate_swot_analysis(df, model_mode=model_mode)
+    elif analysis_type == "financial":
+        return generate_financial_analysis(df, model_mode=model_mode)
+    elif analysis_type == "market":
+        return generate_market_research(df, model_mode=model_mode)
+    elif analysis_type == "optimization":
+        return generate_process_optimization(df, model_mode=model_mode)
+    return "❌ Unsupported analysis type"
+
 @app.post("/api/analyze")
 async def analyze_text_or_file(
     text: Optional[str] = Query(None),
@@ -245,46 +421,29 @@ async def analyze_text_or_file(
     model_mode: str = Query("cloud")
 ):
     try:
-        if file_id:
-            df = read_uploaded_file(file_id)
-            content = df.to_csv(index=False)
-        elif text:
-            df = pd.DataFrame({"text": [text]})
-            content = text
-        else:
+        if not file_id and not text:
             raise HTTPException(status_code=400, detail="Provide either 'text' or 'file_id'.")
 
-        if analysis_type == "summary":
-            result = generate_summary_from_df(df, model_mode=model_mode)
-
-        elif analysis_type == "kpi":
-            result = extract_kpis(df)
-
-        elif analysis_type == "swot":
-            result = generate_swot_analysis(df, model_mode=model_mode)
-
-        elif analysis_type == "financial":
-            result = generate_financial_analysis(df, model_mode=model_mode)
-
-        elif analysis_type == "market":
-            result = generate_market_research(df, model_mode=model_mode)
+        def load_and_analyze():
+            # Loading decodes the whole dataset on a cache miss, so it runs here too
+            df = read_uploaded_file(file_id) if file_id else pd.DataFrame({"text": [text]})
+            return run_analysis(df, analysis_type, model_mode)
 
-        elif analysis_type == "optimization":
-            result = generate_process_optimization(df, model_mode=model_mode)
+        # Loading and the analysis itself are blocking, keep them off the event loop
+        result = await run_in_threadpool(load_and_analyze)
 
-        else:
-            result = "❌ Unsupported analysis type"
-
-
-        # Save to MongoDB
+        # Save to MongoDB; file inputs are stored as a reference, not the data itself
         analysis_doc = {
             "input_type": "file" if file_id else "text",
-            "input_text": content,
             "analysis_type": analysis_type,
             "model_mode": model_mode,
             "result": result,
-            "timestamp": datetime.utcnow()
+            "timestamp": datetime.datetime.now(datetime.timezone.utc)
         }
+        if file_id:
+            analysis_doc["dataset_ref"] = await run_in_threadpool(dataset_store.reference, file_id)
+        else:
+            analysis_doc["input_text"] = text
         inserted = await mongo_collection.insert_one(analysis_doc)
 
         return JSONResponse(content={
@@ -328,6 +487,20 @@ async def get_analysis(analysis_id: str):
 REPORTS_DIR = "reports"
 os.makedirs(REPORTS_DIR, exist_ok=True)
 
+def describe_dataset_ref(ref: dict, sample_rows: int = 10) -> str:
+    """Report text for a file-based analysis: dataset shape, column types and a few rows."""
+    rows, cols = ref.get("shape", ["?", "?"])
+    columns = ", ".join(f"{name} ({dtype})" for name, dtype in ref.get("columns", {}).items())
+    sample = dataset_store.resolve_reference(ref, sample_rows)
+    lines = [
+        f"Dataset: {ref.get('filename') or ref.get('file_id')} ({rows} rows x {cols} columns)",
+        f"Columns: {columns}",
+        "",
+        f"First {len(sample)} rows:",
+        sample.head(sample_rows).to_string(index=False),
+    ]
+    return "\n".join(lines)[:3000]
+
 @app.post("/api/generate-report")
 async def generate_report(analysis_id: str = Query(...)):
     try:
@@ -338,7 +511,10 @@ async def generate_report(analysis_id: str = Query(...)):
 
         # Extract details
         analysis_type = doc.get("analysis_type", "N/A")
-        input_text = doc.get("input_text", "")[:3000]  # Truncate if too long
+        if "dataset_ref" in doc:
+            input_text = await run_in_threadpool(describe_dataset_ref, doc["dataset_ref"])
+        else:
+            input_text = doc.get("input_text", "")[:3000]  # Truncate if too long
         result = doc.get("result", "")
         timestamp = doc.get("timestamp", "").isoformat() if "timestamp" in doc else ""
 
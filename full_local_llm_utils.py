@@ -10,6 +10,7 @@ from transformers import (
     AutoModelForCausalLM,
     BitsAndBytesConfig,
 )
+from agents.prompt_budget import fit_prompt
 
 # -----------------------------------------------------------------
 # 1️⃣  OFFLINE / TELEMETRY SETTINGS  (set once, globally)
@@ -33,6 +34,9 @@ LOCAL_MODEL_DIR = Path(
         "~/local-llms/mistral-7b"
     )
 ).expanduser()
+# Prompt tokens fed to the model; longer prompts are cut in the middle so
+# the leading instructions and the final question both survive.
+LOCAL_PROMPT_MAX_TOKENS = int(os.getenv("LOCAL_PROMPT_MAX_TOKENS", "1024"))
 
 # -----------------------------------------------------------------
 # 3️⃣  QUANTISATION SETTINGS (4‑bit is the sweet spot for 16 GB GPUs)
@@ -75,12 +79,13 @@ def _generate_local(prompt: str, max_new: int = 200, temperature: float = 0.7) -
     if not _LOCAL_MODEL_READY:
         return "❌ Local model is not available."
 
-    inputs = tokenizer(
+    prompt = fit_prompt(
         prompt,
-        return_tensors="pt",
-        truncation=True,
-        max_length=1024,
+        LOCAL_PROMPT_MAX_TOKENS,
+        label="offline_local",
+        count=lambda text: len(tokenizer.encode(text, add_special_tokens=False)),
     )
+    inputs = tokenizer(prompt, return_tensors="pt")
     # The pipeline will automatically move the tensors to the right device.
     output_ids = model.generate(
         **inputs,
@@ -5,7 +5,7 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import os
 from colorama import Fore, Style, init
-from scipy.stats import skew
+from agents.dataset_profile import get_profile
 
 init(autoreset=True)
 
@@ -19,8 +19,9 @@ def smart_chart_agent(df, output_dir="charts_output"):
     os.makedirs(output_dir, exist_ok=True)
     print(f"Saving charts to: {os.path.abspath(output_dir)}")
 
-    numerical_cols = df.select_dtypes(include=['number']).columns
-    categorical_cols = df.select_dtypes(include=['object', 'category', 'bool']).columns
+    profile = get_profile(df)
+    numerical_cols = profile.numeric_columns
+    categorical_cols = profile.discrete_columns
     charts_count = 0
     chart_paths = []
     chart_summaries = []
@@ -29,7 +30,7 @@ def smart_chart_agent(df, output_dir="charts_output"):
     print(Fore.YELLOW + "\nGenerating Histograms and Boxplots..." + Style.RESET_ALL)
     for col in numerical_cols:
         try:
-            col_skew = skew(df[col].dropna())
+            col_skew = profile.population_skew[col]
 
             # Histogram
             hist_path = os.path.join(output_dir, f'{col}_histogram.png')
@@ -67,11 +68,11 @@ def smart_chart_agent(df, output_dir="charts_output"):
     print(Fore.YELLOW + "\nGenerating Bar Charts for categorical columns..." + Style.RESET_ALL)
     for col in categorical_cols:
         try:
-            unique_vals = df[col].nunique()
+            unique_vals = profile.nunique[col]
             if 1 < unique_vals < 50:
                 bar_path = os.path.join(output_dir, f'{col}_bar_chart.png')
                 plt.figure(figsize=(10, 6))
-                top_vals = df[col].value_counts().head(10)
+                top_vals = profile.top_values(col, 10)
                 sns.barplot(x=top_vals.index, y=top_vals.values, palette='viridis')
                 plt.title(f'Top Categories in {col}')
                 plt.xlabel(col)
@@ -90,7 +91,7 @@ def smart_chart_agent(df, output_dir="charts_output"):
     # 3️⃣ Scatter Plots for Correlated Pairs
     print(Fore.YELLOW + "\nGenerating Scatter Plots for correlated pairs..." + Style.RESET_ALL)
     try:
-        corr_matrix = df[numerical_cols].corr().abs()
+        corr_matrix = profile.corr.abs()
         correlated_pairs = [(c1, c2) for c1 in corr_matrix.columns for c2 in corr_matrix.columns
                             if c1 != c2 and corr_matrix.loc[c1, c2] > 0.7]
 
@@ -45,7 +45,8 @@ def run_goal_pipeline(df, goal: str, output_dir="outputs", user_feedback: str =
                 completed.append("summary")
 
             elif step == "qa":
-                answer = run_rag_qa_agent(df, question=goal)
+                # The report only shows answer, code and result, so skip the follow-up LLM calls
+                answer = run_rag_qa_agent(df, question=goal, explain="skip")
                 results.append("💬 **Q&A Answer:**")
                 results.append(f"- **Answer:** {answer.get('answer', '')}")
                 results.append(f"- **Code:**\n```python\n{answer.get('code', '')}\n```")
@@ -0,0 +1,146 @@
+# agents/index_factory.py
+
+"""
+Chooses and configures the FAISS index type for a dataset.
+
+    flat      exact brute force, best for small datasets
+    hnsw      graph index, fast and accurate, no training needed
+    ivf_flat  inverted lists over exact vectors, needs training
+    ivf_pq    inverted lists over product-quantized codes, smallest RAM, needs training
+
+FAISS_INDEX_TYPE=auto picks one from the row count. Search-time knobs
+(nprobe for IVF, efSearch for HNSW) are applied whenever an index is loaded.
+"""
+
+import os
+import math
+import numpy as np
+import faiss
+
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "auto")
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", "16"))
+FAISS_EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", "64"))
+TRAIN_SAMPLE_SIZE = int(os.getenv("FAISS_TRAIN_SAMPLE", "100000"))
+# Filtered IVF searches over at most this many ids probe every list, so matches aren't missed
+FULL_PROBE_MAX_IDS = int(os.getenv("FAISS_FULL_PROBE_MAX_IDS", "20000"))
+
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+FLAT_MAX_ROWS = 50_000
+HNSW_MAX_ROWS = 500_000
+IVF_FLAT_MAX_ROWS = 5_000_000
+HNSW_M = 32
+PQ_BITS = 8
+
+
+def choose_index_type(n_rows: int, index_type: str = FAISS_INDEX_TYPE) -> str:
+    """Resolves 'auto' to a concrete index type for n_rows vectors."""
+    if index_type != "auto":
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown FAISS index type '{index_type}'. Choose from: auto, {', '.join(INDEX_TYPES)}")
+        return index_type
+    if n_rows <= FLAT_MAX_ROWS:
+        return "flat"
+    if n_rows <= HNSW_MAX_ROWS:
+        return "hnsw"
+    if n_rows <= IVF_FLAT_MAX_ROWS:
+        return "ivf_flat"
+    return "ivf_pq"
+
+
+def _nlist_for(n_rows: int) -> int:
+    # ~4*sqrt(n) lists, while keeping at least ~39 training points per centroid
+    nlist = int(4 * math.sqrt(max(n_rows, 1)))
+    return max(1, min(nlist, 65536, max(1, min(n_rows, TRAIN_SAMPLE_SIZE) // 39)))
+
+
+def _pq_subquantizers(dim: int) -> int:
+    # Largest divisor of dim that keeps sub-vectors at >= 8 dims (48 for MiniLM's 384)
+    for m in range(min(64, dim // 8), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def factory_string(dim: int, n_rows: int, index_type: str = FAISS_INDEX_TYPE) -> str:
+    """Returns the faiss.index_factory description for the chosen index type."""
+    index_type = choose_index_type(n_rows, index_type)
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "hnsw":
+        return f"HNSW{HNSW_M}"
+    if index_type == "ivf_flat":
+        return f"IVF{_nlist_for(n_rows)},Flat"
+    return f"IVF{_nlist_for(n_rows)},PQ{_pq_subquantizers(dim)}x{PQ_BITS}"
+
+
+def create_index(dim: int, n_rows: int, index_type: str = FAISS_INDEX_TYPE, with_ids: bool = False):
+    """
+    Creates an empty (possibly untrained) L2 index sized for n_rows vectors.
+    with_ids=True makes it accept add_with_ids (IVF does natively, others get an IDMap2).
+    """
+    description = factory_string(dim, n_rows, index_type)
+    if with_ids and not description.startswith("IVF"):
+        description = f"IDMap2,{description}"
+    print(f"🧱 Creating FAISS index '{description}' for {n_rows} rows")
+    return faiss.index_factory(dim, description, faiss.METRIC_L2)
+
+
+def needs_training(index) -> bool:
+    return not index.is_trained
+
+
+def training_sample_ids(n_rows: int, sample_size: int = TRAIN_SAMPLE_SIZE, seed: int = 42) -> np.ndarray:
+    """Row positions to encode for training (a random sample, sorted for sequential access)."""
+    if n_rows <= sample_size:
+        return np.arange(n_rows)
+    rng = np.random.default_rng(seed)
+    return np.sort(rng.choice(n_rows, size=sample_size, replace=False))
+
+
+def train_index(index, sample_vectors: np.ndarray):
+    if needs_training(index):
+        print(f"🎓 Training FAISS index on {len(sample_vectors)} sample vectors")
+        index.train(np.ascontiguousarray(sample_vectors, dtype="float32"))
+
+
+def _base_index(index):
+    base = faiss.downcast_index(index)
+    if hasattr(base, "id_map"):
+        base = faiss.downcast_index(base.index)
+    return base
+
+
+def supports_removal(index) -> bool:
+    """HNSW graphs cannot drop vectors; Flat (via IDMap2) and IVF can."""
+    return not hasattr(_base_index(index), "hnsw")
+
+
+def apply_search_params(index, nprobe: int = FAISS_NPROBE, ef_search: int = FAISS_EF_SEARCH):
+    """Sets nprobe on IVF indexes and efSearch on HNSW indexes; other types are left as-is."""
+    try:
+        faiss.extract_index_ivf(index).nprobe = nprobe
+        return index
+    except RuntimeError:
+        pass  # not an IVF index
+    base = _base_index(index)
+    if hasattr(base, "hnsw"):
+        base.hnsw.efSearch = ef_search
+    return index
+
+
+def selector_search_params(index, allowed_ids: np.ndarray):
+    """
+    Returns SearchParameters that restrict a search to allowed_ids, carrying
+    over nprobe / efSearch. IDMap2 wrappers translate the selector themselves.
+    """
+    selector = faiss.IDSelectorBatch(np.ascontiguousarray(allowed_ids, dtype=np.int64))
+    try:
+        ivf = faiss.extract_index_ivf(index)
+        nprobe = ivf.nlist if len(allowed_ids) <= FULL_PROBE_MAX_IDS else ivf.nprobe
+        return faiss.SearchParametersIVF(sel=selector, nprobe=nprobe)
+    except RuntimeError:
+        pass  # not an IVF index
+    base = _base_index(index)
+    if hasattr(base, "hnsw"):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=base.hnsw.efSearch)
+    return faiss.SearchParameters(sel=selector)
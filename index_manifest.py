@@ -0,0 +1,85 @@
+# agents/index_manifest.py
+
+"""
+Row manifest stored next to a FAISS index (manifest.npz):
+
+    keys     uint64 key per dataset row (hash of its values + occurrence number)
+    ids      int64 FAISS id per dataset row, in row order
+    next_id  next unused FAISS id (== number of texts in the row store)
+
+Comparing the keys of a new dataset version against the manifest tells an
+update which rows are new (embed + add) and which are gone (remove).
+"""
+
+import os
+import numpy as np
+import pandas as pd
+from agents.row_serializer import serialize_rows
+
+MANIFEST_FILE = "manifest.npz"
+_OCCURRENCE_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+def hash_texts(texts) -> np.ndarray:
+    """Deterministic uint64 hash per text (vectorized, stable across processes)."""
+    return pd.util.hash_array(np.asarray(texts, dtype=object))
+
+
+def hash_rows(df: pd.DataFrame) -> np.ndarray:
+    """
+    Deterministic uint64 hash per row of its values and the column names, so
+    diffing a dataset version doesn't need every row serialized to text.
+    Frames with cells pandas can't hash (lists, dicts) hash their row texts.
+    """
+    columns_hash = hash_texts(["\x1f".join(map(str, df.columns))])[0]
+    try:
+        values_hash = pd.util.hash_pandas_object(df, index=False).to_numpy(dtype=np.uint64)
+    except TypeError:
+        values_hash = hash_texts(serialize_rows(df))
+    return values_hash ^ columns_hash
+
+
+def row_keys(text_hashes: np.ndarray) -> np.ndarray:
+    """Makes duplicate rows distinct by mixing in how often the same text appeared before."""
+    text_hashes = np.asarray(text_hashes, dtype=np.uint64)
+    occurrence = pd.Series(text_hashes).groupby(text_hashes).cumcount().to_numpy(dtype=np.uint64)
+    return text_hashes + occurrence * _OCCURRENCE_MIX  # uint64 arithmetic wraps around
+
+
+def save_manifest(index_dir: str, keys: np.ndarray, ids: np.ndarray, next_id: int):
+    path = os.path.join(index_dir, MANIFEST_FILE)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, keys=keys.astype(np.uint64), ids=ids.astype(np.int64), next_id=np.int64(next_id))
+    os.replace(tmp_path, path)
+
+
+def load_manifest(index_dir: str):
+    """Returns (keys, ids, next_id), or None if the index has no manifest."""
+    path = os.path.join(index_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        return data["keys"], data["ids"], int(data["next_id"])
+
+
+def diff_manifest(new_keys: np.ndarray, old_keys: np.ndarray, old_ids: np.ndarray):
+    """
+    Returns (row_ids, added_positions, removed_ids): the FAISS id of every new
+    row (-1 where it still has to be added), the positions of rows to embed,
+    and the ids of rows that no longer exist.
+    """
+    order = np.argsort(old_keys)
+    sorted_keys, sorted_ids = old_keys[order], old_ids[order]
+
+    if len(sorted_keys):
+        positions = np.minimum(np.searchsorted(sorted_keys, new_keys), len(sorted_keys) - 1)
+        known = sorted_keys[positions] == new_keys
+    else:
+        positions = np.zeros(len(new_keys), dtype=np.int64)
+        known = np.zeros(len(new_keys), dtype=bool)
+
+    row_ids = np.full(len(new_keys), -1, dtype=np.int64)
+    row_ids[known] = sorted_ids[positions[known]]
+    removed_ids = old_ids[~np.isin(old_keys, new_keys)]
+    return row_ids, np.flatnonzero(~known), removed_ids
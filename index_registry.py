@@ -0,0 +1,142 @@
+# agents/index_registry.py
+
+"""
+FAISS Index Registry for DecisionIQ
+-----------------------------------
+Keeps one FAISS index per dataset instead of a single shared faiss_index/ dir.
+
+Layout under FAISS_DIR:
+    by_hash/<content_hash>/CURRENT        -> name of the live version dir
+    by_hash/<content_hash>/v<timestamp>/  -> index.faiss + row metadata
+    by_file/<file_id>                     -> content_hash of that upload
+
+Indexes are keyed by content hash, so re-uploading identical data reuses the
+existing index. New versions are built in a private staging dir and published
+by atomically swapping the CURRENT pointer, so readers never see a partial
+index. Loaded indexes are kept in a small in-process LRU.
+"""
+
+import os
+import re
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+from agents.faiss_retriever import FaissRetriever
+
+# --- Configuration ---
+INDEX_ROOT = os.getenv("FAISS_DIR", "faiss_index")
+MAX_LOADED_INDEXES = int(os.getenv("MAX_LOADED_INDEXES", "8"))
+KEEP_VERSIONS = 2
+
+_KEY_PATTERN = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+def dataset_fingerprint(df: pd.DataFrame) -> str:
+    """Content hash of a DataFrame, used when the upload bytes were not hashed."""
+    hasher = hashlib.sha256()
+    hasher.update("|".join(map(str, df.columns)).encode("utf-8"))
+    hasher.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return hasher.hexdigest()
+
+
+def _check_key(key: str) -> str:
+    if not _KEY_PATTERN.match(key or ""):
+        raise KeyError(key)
+    return key
+
+
+def _write_atomic(path: str, text: str):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+class IndexRegistry:
+    def __init__(self, root: str = INDEX_ROOT, max_loaded: int = MAX_LOADED_INDEXES):
+        self.root = root
+        self.max_loaded = max_loaded
+        self._loaded = OrderedDict()  # version dir -> FaissRetriever
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(root, "by_hash"), exist_ok=True)
+        os.makedirs(os.path.join(root, "by_file"), exist_ok=True)
+
+    # --- file_id <-> content hash ---
+    def register(self, file_id: str, content_hash: str):
+        """Points a file_id at the index for its content hash."""
+        _write_atomic(os.path.join(self.root, "by_file", _check_key(file_id)), _check_key(content_hash))
+
+    def content_hash_for(self, file_id: str):
+        try:
+            with open(os.path.join(self.root, "by_file", _check_key(file_id)), "r", encoding="utf-8") as f:
+                return f.read().strip() or None
+        except (KeyError, FileNotFoundError):
+            return None
+
+    # --- Versioned storage ---
+    def staging_dir(self, content_hash: str) -> str:
+        """Creates a private directory to build a new index version into."""
+        hash_dir = os.path.join(self.root, "by_hash", _check_key(content_hash))
+        os.makedirs(hash_dir, exist_ok=True)
+        return tempfile.mkdtemp(prefix=".staging-", dir=hash_dir)
+
+    def publish(self, content_hash: str, staging_dir: str) -> str:
+        """Turns a staging dir into the live version for a content hash."""
+        hash_dir = os.path.join(self.root, "by_hash", _check_key(content_hash))
+        version = f"v{time.time_ns()}"
+        os.rename(staging_dir, os.path.join(hash_dir, version))
+        _write_atomic(os.path.join(hash_dir, "CURRENT"), version)
+        self._cleanup_versions(hash_dir, keep=version)
+        return os.path.join(hash_dir, version)
+
+    def current_dir(self, content_hash: str):
+        """Returns the live version dir for a content hash, or None if none was published."""
+        hash_dir = os.path.join(self.root, "by_hash", _check_key(content_hash))
+        try:
+            with open(os.path.join(hash_dir, "CURRENT"), "r", encoding="utf-8") as f:
+                version = f.read().strip()
+        except FileNotFoundError:
+            return None
+        path = os.path.join(hash_dir, version)
+        return path if os.path.isdir(path) else None
+
+    def index_dir(self, file_id: str):
+        """Returns the live index dir for a file_id, or None if it has no index yet."""
+        content_hash = self.content_hash_for(file_id)
+        return self.current_dir(content_hash) if content_hash else None
+
+    # --- Loaded index cache ---
+    def retriever(self, file_id: str) -> FaissRetriever:
+        """Returns the resident retriever for a file_id's live index version."""
+        path = self.index_dir(file_id)
+        if path is None:
+            raise KeyError(file_id)
+        with self._lock:
+            retriever = self._loaded.get(path)
+            if retriever is None:
+                retriever = FaissRetriever(path)
+                self._loaded[path] = retriever
+                while len(self._loaded) > self.max_loaded:
+                    self._loaded.popitem(last=False)
+            else:
+                self._loaded.move_to_end(path)
+        retriever.refresh()
+        return retriever
+
+    def _cleanup_versions(self, hash_dir: str, keep: str):
+        # Keep a couple of recent versions so in-flight readers of the old one can finish
+        versions = sorted(
+            (name for name in os.listdir(hash_dir) if name.startswith("v")),
+            key=lambda name: int(name[1:]),
+        )
+        for name in versions[:-KEEP_VERSIONS]:
+            if name != keep:
+                shutil.rmtree(os.path.join(hash_dir, name), ignore_errors=True)
+
+
+index_registry = IndexRegistry()
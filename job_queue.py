@@ -0,0 +1,196 @@
+# agents/job_queue.py
+
+"""
+Job Queue for DecisionIQ
+------------------------
+Runs long analysis stages off the event loop on bounded worker pools:
+a thread pool for I/O-bound work (LLM calls) and a process pool for
+CPU-bound pandas/matplotlib work. Jobs can be polled, cancelled and
+counted; submissions are rejected once too many jobs are in flight.
+"""
+
+import os
+import time
+import uuid
+import threading
+import traceback
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+# --- Configuration ---
+THREAD_WORKERS = int(os.getenv("JOB_THREAD_WORKERS", "8"))
+PROCESS_WORKERS = int(os.getenv("JOB_PROCESS_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+MAX_PENDING_JOBS = int(os.getenv("JOB_MAX_PENDING", "32"))
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", "3600"))
+# Each spawned worker has its own dataset LRU; 0 = split DATASET_MEMORY_BUDGET_MB across the workers
+WORKER_DATASET_BUDGET_MB = int(os.getenv("JOB_WORKER_DATASET_BUDGET_MB", "0"))
+
+TERMINAL_STATES = ("succeeded", "failed", "cancelled")
+
+
+class QueueFullError(Exception):
+    """Raised when the number of queued + running jobs hits the limit."""
+
+
+def _init_process_worker(dataset_budget_bytes: int):
+    from agents.dataset_store import dataset_store
+    dataset_store.budget_bytes = dataset_budget_bytes
+
+
+class JobManager:
+    def __init__(self, thread_workers=THREAD_WORKERS, process_workers=PROCESS_WORKERS,
+                 max_pending=MAX_PENDING_JOBS):
+        self.max_pending = max_pending
+        self._thread_pool = ThreadPoolExecutor(max_workers=thread_workers, thread_name_prefix="job")
+        self._thread_workers = thread_workers
+        self._process_workers = process_workers
+        self._process_pool = None  # created lazily, spawning workers is expensive
+        self._jobs = {}
+        self._lock = threading.RLock()  # future callbacks can fire while it is held
+
+    # --- Public API ---
+    def submit(self, stage: str, fn, *args, pool: str = "thread", **kwargs) -> str:
+        """
+        Schedules fn(*args, **kwargs) and returns a job_id.
+        Process-pool functions and their arguments must be picklable.
+        """
+        with self._lock:
+            self._prune()
+            if self._active_count() >= self.max_pending:
+                raise QueueFullError(f"Job queue is full ({self.max_pending} jobs in flight).")
+            job_id = str(uuid.uuid4())
+            job = {
+                "job_id": job_id,
+                "stage": stage,
+                "pool": pool,
+                "status": "queued",
+                "created_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "result": None,
+                "error": None,
+                "future": None,
+            }
+            self._jobs[job_id] = job
+
+        if pool == "process":
+            future = self._get_process_pool().submit(fn, *args, **kwargs)
+        else:
+            future = self._thread_pool.submit(self._run_in_thread, job, fn, args, kwargs)
+        job["future"] = future
+        future.add_done_callback(lambda f, job=job: self._finish(job, f))
+        return job_id
+
+    def status(self, job_id: str) -> dict:
+        """Returns the public view of a job. Raises KeyError if unknown."""
+        with self._lock:
+            job = self._jobs[job_id]
+            self._refresh(job)
+            return {
+                key: job[key]
+                for key in ("job_id", "stage", "status", "created_at", "started_at", "finished_at", "error")
+            }
+
+    def result(self, job_id: str):
+        """Returns (status, result) for a job. Raises KeyError if unknown."""
+        with self._lock:
+            job = self._jobs[job_id]
+            self._refresh(job)
+            return job["status"], job["result"]
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancels a job. Queued jobs never start; running jobs are marked
+        cancelled and their result is discarded when they finish. Until
+        then they still count towards max_pending.
+        """
+        with self._lock:
+            job = self._jobs[job_id]
+            if job["status"] in TERMINAL_STATES:
+                return False
+            if job["future"] is not None:
+                job["future"].cancel()
+            job["status"] = "cancelled"
+            job["finished_at"] = time.time()
+            return True
+
+    def metrics(self) -> dict:
+        with self._lock:
+            for job in self._jobs.values():
+                self._refresh(job)
+            counts = {state: 0 for state in ("queued", "running") + TERMINAL_STATES}
+            for job in self._jobs.values():
+                counts[job["status"]] += 1
+            return {
+                **counts,
+                "queue_depth": counts["queued"],
+                "in_flight": self._active_count(),
+                "max_pending": self.max_pending,
+                "thread_workers": self._thread_workers,
+                "process_workers": self._process_workers,
+            }
+
+    # --- Internals ---
+    def _get_process_pool(self):
+        with self._lock:
+            if self._process_pool is None:
+                from agents.dataset_store import MEMORY_BUDGET_BYTES
+                if WORKER_DATASET_BUDGET_MB:
+                    budget_bytes = WORKER_DATASET_BUDGET_MB * 1024 * 1024
+                else:
+                    budget_bytes = MEMORY_BUDGET_BYTES // self._process_workers
+                # spawn avoids forking a process that already runs uvicorn/motor threads
+                self._process_pool = ProcessPoolExecutor(
+                    max_workers=self._process_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_process_worker,
+                    initargs=(budget_bytes,),
+                )
+            return self._process_pool
+
+    def _run_in_thread(self, job, fn, args, kwargs):
+        with self._lock:
+            if job["status"] == "cancelled":
+                return None
+            job["status"] = "running"
+            job["started_at"] = time.time()
+        return fn(*args, **kwargs)
+
+    def _refresh(self, job):
+        # Process-pool futures don't call back when they start, so poll them
+        if job["status"] == "queued" and job["future"] is not None and job["future"].running():
+            job["status"] = "running"
+            job["started_at"] = time.time()
+
+    def _finish(self, job, future):
+        with self._lock:
+            if job["status"] == "cancelled" or future.cancelled():
+                job["status"] = "cancelled"
+                job["finished_at"] = job["finished_at"] or time.time()
+                return
+            error = future.exception()
+            if error is not None:
+                job["status"] = "failed"
+                job["error"] = "".join(traceback.format_exception_only(type(error), error)).strip()
+            else:
+                job["status"] = "succeeded"
+                job["result"] = future.result()
+            job["started_at"] = job["started_at"] or job["created_at"]
+            job["finished_at"] = time.time()
+
+    def _active_count(self) -> int:
+        # A cancelled job that already started keeps its worker busy until it
+        # returns, so count jobs by their future rather than their status
+        return sum(1 for job in self._jobs.values() if job["future"] is None or not job["future"].done())
+
+    def _prune(self):
+        cutoff = time.time() - JOB_TTL_SECONDS
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["status"] in TERMINAL_STATES and (job["finished_at"] or 0) < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+job_manager = JobManager()
@@ -0,0 +1,194 @@
+# agents/lexical_index.py
+
+"""
+BM25 inverted index over the row texts of a FAISS index. Dense MiniLM
+embeddings are weak at exact tokens (IDs, SKUs, names, dates); this index
+catches those, and reciprocal rank fusion merges both result lists.
+
+Stored next to the FAISS index in one file, replaced atomically so readers
+never pair postings with another version's vocabulary:
+    lexical.npz  CSR postings (indptr, doc_ids, tfs), doc lengths and the
+                 token list (UTF-8 bytes + offsets); token i owns postings
+                 indptr[i]:indptr[i + 1]
+Doc ids are FAISS ids, so both retrievers point into the same row store.
+Incremental index updates only tokenize the rows they add.
+"""
+
+import os
+import re
+from collections import Counter
+import numpy as np
+
+from agents.row_store import open_row_store
+from agents.index_manifest import load_manifest
+
+LEXICAL_FILE = "lexical.npz"
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60
+
+# Keeps compound tokens like "sku-1042", "2024-03-01" or "54.6" whole
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_/.:][a-z0-9]+)*")
+_SPLIT_PATTERN = re.compile(r"[-_/.:]")
+
+
+def tokenize(text: str) -> list:
+    """Lowercased tokens; compound tokens are emitted whole and as their parts."""
+    tokens = []
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(token)
+        parts = _SPLIT_PATTERN.split(token)
+        if len(parts) > 1:
+            tokens.extend(part for part in parts if part)
+    return tokens
+
+
+def _tokenize_rows(rows, doc_ids, vocab: dict):
+    """
+    Returns (term_ids, doc_ids, tfs, doc_lengths) postings for the given rows,
+    adding tokens not seen before to vocab.
+    """
+    terms, docs, tfs = [], [], []
+    lengths = np.zeros(len(doc_ids), dtype=np.int32)
+    for i, doc_id in enumerate(doc_ids):
+        counts = Counter(tokenize(rows[int(doc_id)]))
+        lengths[i] = sum(counts.values())
+        for token, tf in counts.items():
+            terms.append(vocab.setdefault(token, len(vocab)))
+            docs.append(doc_id)
+            tfs.append(tf)
+    return (np.array(terms, dtype=np.int64), np.array(docs, dtype=np.int64),
+            np.array(tfs, dtype=np.float32), lengths)
+
+
+def _save(index_dir: str, vocab: list, terms, docs, tfs, doc_len, n_docs: int):
+    # Group the postings by term; the stable sort keeps each term's docs in order
+    order = np.argsort(terms, kind="stable")
+    indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum(np.bincount(terms, minlength=len(vocab)))
+    encoded = [token.encode("utf-8") for token in vocab]
+    vocab_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    vocab_offsets[1:] = np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)))
+
+    path = os.path.join(index_dir, LEXICAL_FILE)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(
+            f,
+            indptr=indptr,
+            doc_ids=docs[order],
+            tfs=tfs[order],
+            doc_len=doc_len,
+            n_docs=np.int64(n_docs),
+            vocab_data=np.frombuffer(b"".join(encoded), dtype=np.uint8),
+            vocab_offsets=vocab_offsets,
+        )
+    os.replace(tmp_path, path)
+
+
+def _load(index_dir: str):
+    """Returns (vocab token list, dict of the postings arrays)."""
+    with np.load(os.path.join(index_dir, LEXICAL_FILE)) as data:
+        arrays = {name: data[name] for name in data.files}
+    blob = arrays.pop("vocab_data").tobytes()
+    offsets = arrays.pop("vocab_offsets").tolist()
+    vocab = [blob[start:end].decode("utf-8") for start, end in zip(offsets, offsets[1:])]
+    return vocab, arrays
+
+
+def build_lexical_index(index_dir: str):
+    """Builds the BM25 index for the live rows of index_dir (manifest ids, or all rows)."""
+    rows = open_row_store(index_dir)
+    manifest = load_manifest(index_dir)
+    doc_ids = np.unique(manifest[1]) if manifest else np.arange(len(rows))
+    doc_ids = doc_ids[doc_ids < len(rows)]  # ignore a manifest left behind by another builder
+
+    vocab = {}
+    terms, docs, tfs, lengths = _tokenize_rows(rows, doc_ids, vocab)
+    doc_len = np.zeros(len(rows), dtype=np.int32)
+    doc_len[doc_ids] = lengths
+    _save(index_dir, list(vocab), terms, docs, tfs, doc_len, len(doc_ids))
+    print(f"🔤 Lexical index built: {len(vocab)} terms over {len(doc_ids)} rows")
+
+
+def update_lexical_index(index_dir: str, added_ids, removed_ids):
+    """
+    Applies an incremental index update to the BM25 index: postings of
+    removed_ids are dropped and only the rows of added_ids (already appended to
+    the row store) are tokenized. Builds from scratch if there is no index yet.
+    """
+    if not has_lexical_index(index_dir):
+        return build_lexical_index(index_dir)
+
+    vocab_list, data = _load(index_dir)
+    rows = open_row_store(index_dir)
+    added_ids = np.asarray(added_ids, dtype=np.int64)
+    removed_ids = np.asarray(removed_ids, dtype=np.int64)
+
+    terms = np.repeat(np.arange(len(vocab_list), dtype=np.int64), np.diff(data["indptr"]))
+    docs, tfs = data["doc_ids"], data["tfs"]
+    doc_len = np.zeros(max(len(data["doc_len"]), len(rows)), dtype=np.int32)
+    doc_len[:len(data["doc_len"])] = data["doc_len"]
+    if len(removed_ids):
+        keep = ~np.isin(docs, removed_ids)
+        terms, docs, tfs = terms[keep], docs[keep], tfs[keep]
+        doc_len[removed_ids[removed_ids < len(doc_len)]] = 0
+
+    vocab = {token: i for i, token in enumerate(vocab_list)}
+    new_terms, new_docs, new_tfs, lengths = _tokenize_rows(rows, added_ids, vocab)
+    doc_len[added_ids] = lengths
+    n_docs = int(data["n_docs"]) - len(removed_ids) + len(added_ids)
+    _save(index_dir, list(vocab), np.concatenate([terms, new_terms]), np.concatenate([docs, new_docs]),
+          np.concatenate([tfs, new_tfs]), doc_len, n_docs)
+    print(f"🔤 Lexical index updated: +{len(added_ids)} / -{len(removed_ids)} rows, {len(vocab)} terms")
+
+
+class LexicalIndex:
+    def __init__(self, index_dir: str):
+        vocab, data = _load(index_dir)
+        self.vocab = {token: i for i, token in enumerate(vocab)}
+        self.indptr = data["indptr"]
+        self.doc_ids = data["doc_ids"]
+        self.tfs = data["tfs"]
+        self.doc_len = data["doc_len"]
+        self.n_docs = int(data["n_docs"])
+        live_lengths = self.doc_len[self.doc_len > 0]
+        self.avg_len = float(live_lengths.mean()) if len(live_lengths) else 1.0
+
+    def search(self, query: str, top_k: int = 5, allowed_ids=None) -> list:
+        """Returns up to top_k doc ids ranked by BM25 score, optionally only among allowed_ids."""
+        scores = np.zeros(len(self.doc_len), dtype=np.float32)
+        for token in set(tokenize(query)):
+            term_id = self.vocab.get(token)
+            if term_id is None:
+                continue
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            docs, tfs = self.doc_ids[start:end], self.tfs[start:end]
+            idf = np.log(1 + (self.n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len[docs] / self.avg_len)
+            scores[docs] += idf * tfs * (BM25_K1 + 1) / (tfs + norm)
+
+        if allowed_ids is not None:
+            allowed = np.zeros(len(scores), dtype=bool)
+            allowed[allowed_ids[allowed_ids < len(scores)]] = True
+            scores[~allowed] = 0.0
+
+        matched = np.flatnonzero(scores)
+        if not len(matched):
+            return []
+        if len(matched) > top_k:
+            matched = matched[np.argpartition(-scores[matched], top_k - 1)[:top_k]]
+        return matched[np.argsort(-scores[matched])].tolist()
+
+
+def has_lexical_index(index_dir: str) -> bool:
+    return os.path.exists(os.path.join(index_dir, LEXICAL_FILE))
+
+
+def reciprocal_rank_fusion(*ranked_lists, k: int = RRF_K, top_k: int = 5) -> list:
+    """Merges ranked id lists: score(id) = sum of 1 / (k + rank) over the lists it appears in."""
+    scores = {}
+    for ranked in ranked_lists:
+        for rank, doc_id in enumerate(ranked):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)[:top_k]
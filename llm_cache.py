@@ -0,0 +1,239 @@
+# agents/llm_cache.py
+
+"""
+Response cache for LLM calls, persisted in SQLite.
+
+Entries are keyed by (model, normalized prompt, generation params). They
+expire after LLM_CACHE_TTL_SECONDS and the least recently used ones are
+evicted beyond LLM_CACHE_MAX_ENTRIES.
+
+With LLM_CACHE_SEMANTIC=true, callers can also pass the free-text part of a
+prompt (e.g. the user's question). A miss then compares its embedding with
+cached entries whose prompt is otherwise identical and whose question names
+the same entities (numbers, dates, months, capitalized names), so "top
+customers by revenue?" can reuse the answer to "Who are the top customers by
+revenue" while "sales in March" never reuses "sales in May". Only prompts
+that already carry the data the question selected (answers, not generated
+code) should pass semantic_text.
+
+Hit / semantic-hit / miss counters are kept per endpoint label.
+"""
+
+import os
+import re
+import json
+import time
+import calendar
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join("llm_cache", "responses.sqlite"))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+LLM_CACHE_SEMANTIC = os.getenv("LLM_CACHE_SEMANTIC", "false").lower() in ("1", "true", "yes")
+LLM_CACHE_SEMANTIC_THRESHOLD = float(os.getenv("LLM_CACHE_SEMANTIC_THRESHOLD", "0.95"))
+SEMANTIC_SCAN_LIMIT = 500  # most recent candidates compared per lookup
+
+_WHITESPACE = re.compile(r"\s+")
+_NUMBER = re.compile(r"\d(?:[\d,.:/-]*\d)?")
+_CAPITALIZED = re.compile(r"\b[A-Z][\w-]*")
+_SENTENCE_START = re.compile(r"(?:^|[.!?])\s*$")
+_CALENDAR_WORDS = {name.lower() for name in [*calendar.month_name, *calendar.month_abbr, *calendar.day_name] if name}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    scope TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    response TEXT NOT NULL,
+    embedding BLOB,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_scope ON responses (scope, created);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+"""
+
+
+def normalize_prompt(prompt: str) -> str:
+    return _WHITESPACE.sub(" ", prompt).strip()
+
+
+def question_entities(text: str) -> list:
+    """
+    The parts of a question that change its answer even when the wording is
+    nearly the same: numbers and dates, month/day names and capitalized words
+    that don't just start a sentence.
+    """
+    entities = set(_NUMBER.findall(text))
+    entities.update(m.group(0).lower() for m in _CAPITALIZED.finditer(text)
+                    if not _SENTENCE_START.search(text[:m.start()]))
+    entities.update(word for word in re.findall(r"[a-z]+", text.lower()) if word in _CALENDAR_WORDS)
+    return sorted(entities)
+
+
+def _digest(*parts) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl: float = LLM_CACHE_TTL_SECONDS,
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._counters = {}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    # --- Public API ---
+    def get_or_generate(self, generate, prompt: str, model: str, params: dict = None,
+                        endpoint: str = "default", semantic_text: str = None) -> str:
+        """
+        Returns the cached response for this prompt, or calls generate() and
+        caches what it returns. semantic_text enables the near-duplicate lookup.
+        """
+        normalized = normalize_prompt(prompt)
+        key = _digest(model, normalized, params or {})
+        response = self._lookup(key)
+        if response is not None:
+            self._count(endpoint, "hits")
+            return response
+
+        # Scope: everything but the semantic text plus its entities, so only prompts that differ
+        # in the wording of the question are compared
+        embedding = scope = None
+        if semantic_text and LLM_CACHE_SEMANTIC:
+            scope = _digest(model, normalized.replace(normalize_prompt(semantic_text), ""), params or {},
+                            question_entities(semantic_text))
+            embedding = _embed(semantic_text)
+            response = self._semantic_lookup(scope, embedding)
+            if response is not None:
+                self._count(endpoint, "semantic_hits")
+                return response
+
+        self._count(endpoint, "misses")
+        response = generate()
+        if isinstance(response, str) and response.strip():
+            self._store(key, scope or key, endpoint, response, embedding)
+        return response
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            endpoints = {}
+            for endpoint, counts in self._counters.items():
+                lookups = sum(counts.values())
+                hits = counts["hits"] + counts["semantic_hits"]
+                endpoints[endpoint] = dict(counts, hit_rate=round(hits / lookups, 4) if lookups else 0.0)
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "semantic": LLM_CACHE_SEMANTIC,
+            "endpoints": endpoints,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+    # --- Internals ---
+    def _count(self, endpoint: str, field: str):
+        with self._lock:
+            counts = self._counters.setdefault(endpoint, {"hits": 0, "semantic_hits": 0, "misses": 0})
+            counts[field] += 1
+
+    def _lookup(self, key: str):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT response FROM responses WHERE key = ? AND created > ?", (key, now - self.ttl)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self._db.commit()
+        return row[0]
+
+    def _semantic_lookup(self, scope: str, embedding: np.ndarray):
+        now = time.time()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT key, response, embedding FROM responses "
+                "WHERE scope = ? AND embedding IS NOT NULL AND created > ? ORDER BY created DESC LIMIT ?",
+                (scope, now - self.ttl, SEMANTIC_SCAN_LIMIT),
+            ).fetchall()
+        if not rows:
+            return None
+        rows = [row for row in rows if len(row[2]) == embedding.nbytes]  # skip vectors from another embedder
+        if not rows:
+            return None
+        candidates = np.stack([np.frombuffer(blob, dtype=np.float32) for _, _, blob in rows])
+        similarities = candidates @ embedding
+        best = int(np.argmax(similarities))
+        if similarities[best] < LLM_CACHE_SEMANTIC_THRESHOLD:
+            return None
+        with self._lock:
+            self._db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, rows[best][0]))
+            self._db.commit()
+        return rows[best][1]
+
+    def _store(self, key: str, scope: str, endpoint: str, response: str, embedding=None):
+        now = time.time()
+        blob = embedding.astype(np.float32).tobytes() if embedding is not None else None
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, scope, endpoint, response, embedding, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, scope, endpoint, response, blob, now, now),
+            )
+            self._db.execute("DELETE FROM responses WHERE created <= ?", (now - self.ttl,))
+            # LRU eviction
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._db.commit()
+
+
+def _embed(text: str) -> np.ndarray:
+    from agents.embedding_service import encode_query
+    vector = np.asarray(encode_query(text), dtype=np.float32)[0]
+    return vector / (np.linalg.norm(vector) or 1.0)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """Returns the process-wide response cache, or None when LLM_CACHE_ENABLED=false."""
+    global _cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMResponseCache()
+        return _cache
+
+
+def cached_llm_call(generate, prompt: str, model: str, params: dict = None,
+                    endpoint: str = "default", semantic_text: str = None) -> str:
+    """Runs generate() through the response cache (or directly when caching is disabled)."""
+    cache = get_llm_cache()
+    if cache is None:
+        return generate()
+    return cache.get_or_generate(generate, prompt, model, params, endpoint, semantic_text)
+
+
+def llm_cache_stats() -> dict:
+    cache = get_llm_cache()
+    return cache.stats() if cache else {"enabled": False}
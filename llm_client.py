@@ -0,0 +1,110 @@
+# agents/llm_client.py
+
+"""
+Shared HTTP client for cloud LLM calls (Hugging Face router, OpenAI-style
+chat completions).
+
+One pooled keep-alive session per process instead of a bare requests.post
+per call, so calls reuse TLS connections. Every call has connect/read
+timeouts, retries 429/5xx with exponential backoff (honouring Retry-After)
+and waits on a semaphore that caps concurrent requests to the router.
+
+    chat_completion(prompt)         requests.Session
+    stream_chat_completion(prompt)  generator of content deltas (stream=true)
+
+Async endpoints call these from the threadpool.
+"""
+
+import os
+import json
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+HF_TOKEN = os.getenv("HF_TOKEN")  # From .env or terminal
+API_URL = os.getenv("LLM_API_URL", "https://router.huggingface.co/v1/chat/completions")
+CLOUD_MODEL_NAME = os.getenv("CLOUD_MODEL_NAME", "meta-llama/Llama-3.2-3B-Instruct:together")
+
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_SECONDS = float(os.getenv("LLM_BACKOFF_SECONDS", "0.5"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "16"))
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def _payload(prompt: str, model: str, **params) -> dict:
+    payload = {"model": model, "messages": [{"role": "user", "content": prompt}]}
+    payload.update({k: v for k, v in params.items() if v is not None})
+    return payload
+
+
+def _message_content(data: dict) -> str:
+    return data["choices"][0]["message"]["content"].strip()
+
+
+_session = None
+_session_lock = threading.Lock()
+_sync_slots = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+
+
+def get_session() -> requests.Session:
+    """Returns the process-wide pooled session, creating it on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=LLM_MAX_RETRIES,
+                backoff_factor=LLM_BACKOFF_SECONDS,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=frozenset(["POST"]),  # chat completions are safe to resend
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=LLM_POOL_SIZE, max_retries=retry)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({
+                "Authorization": f"Bearer {HF_TOKEN}",
+                "Content-Type": "application/json"
+            })
+            _session = session
+        return _session
+
+
+def post_chat(payload: dict, stream: bool = False) -> requests.Response:
+    """POSTs a chat-completions payload; raises requests.HTTPError on a final non-2xx status."""
+    if not HF_TOKEN:
+        raise RuntimeError("HF_TOKEN is not set; export it (or add it to .env) to use the cloud model.")
+    with _sync_slots:
+        response = get_session().post(
+            API_URL, json=payload, stream=stream, timeout=(LLM_CONNECT_TIMEOUT, LLM_READ_TIMEOUT)
+        )
+    response.raise_for_status()
+    return response
+
+
+def chat_completion(prompt: str, model: str = CLOUD_MODEL_NAME, **params) -> str:
+    """Sends one user prompt and returns the reply text. Extra params (max_tokens, temperature, ...) are passed through."""
+    return _message_content(post_chat(_payload(prompt, model, **params)).json())
+
+
+def stream_chat_completion(prompt: str, model: str = CLOUD_MODEL_NAME, **params):
+    """Yields reply text pieces as the router streams them (OpenAI-style SSE chunks)."""
+    response = post_chat(_payload(prompt, model, stream=True, **params), stream=True)
+    response.encoding = "utf-8"  # text/event-stream without a charset would decode as latin-1
+    with response:
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            choices = json.loads(data).get("choices") or [{}]
+            delta = (choices[0].get("delta") or {}).get("content")
+            if delta:
+                yield delta
@@ -0,0 +1,41 @@
+# agents/llm_stream.py
+
+"""
+Token streaming for cloud and local generations, plus Server-Sent Events
+formatting for the /stream endpoints.
+
+Cloud tokens come from the router with stream=true (llm_client); local
+tokens come from the shared local runtime's TextIteratorStreamer. Both are
+plain generators of text pieces.
+"""
+
+import json
+from agents.llm_client import stream_chat_completion, CLOUD_MODEL_NAME
+from agents.local_runtime import get_local_runtime
+
+
+def stream_llm(prompt: str, model_mode: str = "cloud", max_new_tokens: int = 300,
+               cloud_model: str = CLOUD_MODEL_NAME, **generate_kwargs):
+    """Yields text pieces from the cloud router, or from the shared local runtime when model_mode == "local"."""
+    if model_mode == "local":
+        yield from get_local_runtime().stream(prompt, max_new_tokens=max_new_tokens, **generate_kwargs)
+    else:
+        yield from stream_chat_completion(prompt, model=cloud_model)
+
+
+def sse_event(event: str, data) -> str:
+    """Formats one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def sse_stream(events):
+    """
+    Turns (event, data) pairs into SSE text. Exceptions become a final
+    "error" event instead of silently cutting the connection.
+    """
+    try:
+        for event, data in events:
+            yield sse_event(event, data)
+    except Exception as e:
+        print(f"❌ Stream failed: {e}")
+        yield sse_event("error", {"error": str(e)})
@@ -0,0 +1,265 @@
+# agents/local_backends.py
+
+"""
+Inference backends for the local LLM runtime, selected with LOCAL_BACKEND:
+
+    transformers  PyTorch model through a transformers pipeline (default)
+    onnx          ONNX Runtime via optimum; point LOCAL_MODEL_PATH at an int8-quantized
+                  export (optimum-cli onnxruntime quantize ...) or let it export on load
+    ctranslate2   CTranslate2 Generator; LOCAL_MODEL_PATH is a ct2-transformers-converter
+                  output dir, LOCAL_COMPUTE_TYPE=int8 by default
+    gguf          llama.cpp via llama-cpp-python; LOCAL_MODEL_PATH is a .gguf file (Q4_K_M, Q8_0, ...)
+
+Every backend implements load(), generate(prompt, max_new_tokens, **kw) -> str
+(continuation only), generate_batch(prompts, max_new_tokens_list, **kw) ->
+[(text, n_tokens)] and stream(prompt, max_new_tokens, **kw) -> iterator of str.
+Their packages are imported only when that backend is selected.
+"""
+
+import os
+import threading
+
+LOCAL_MODEL_NAME = os.getenv("LOCAL_MODEL_NAME", "microsoft/phi-2")
+LOCAL_MODEL_PATH = os.getenv("LOCAL_MODEL_PATH", "")               # converted/quantized model for onnx, ctranslate2, gguf
+LOCAL_MODEL_DTYPE = os.getenv("LOCAL_MODEL_DTYPE", "float32")       # transformers: float32 | bfloat16 | float16 | auto
+LOCAL_MODEL_DEVICE = os.getenv("LOCAL_MODEL_DEVICE", "cpu")         # transformers: cpu | cuda | auto
+LOCAL_COMPUTE_TYPE = os.getenv("LOCAL_COMPUTE_TYPE", "int8")        # ctranslate2: int8 | int8_float32 | float32 ...
+LOCAL_MODEL_THREADS = int(os.getenv("LOCAL_MODEL_THREADS", "0"))    # 0 = library default
+LOCAL_CONTEXT_TOKENS = int(os.getenv("LOCAL_CONTEXT_TOKENS", "2048"))
+LOCAL_MODEL_TRUST_REMOTE_CODE = os.getenv("LOCAL_MODEL_TRUST_REMOTE_CODE", "false").lower() in ("1", "true", "yes")
+LOCAL_STREAM_TIMEOUT = float(os.getenv("LOCAL_STREAM_TIMEOUT", "300"))  # max seconds between two streamed tokens
+
+
+def _sampling(kwargs: dict):
+    """Maps transformers-style kwargs to (temperature, top_p); temperature 0 means greedy."""
+    if not kwargs.get("do_sample", False):
+        return 0.0, 1.0
+    return float(kwargs.get("temperature", 1.0)), float(kwargs.get("top_p", 1.0))
+
+
+class TransformersBackend:
+    """PyTorch (or, via ORTModelForCausalLM, ONNX Runtime) model behind a text-generation pipeline."""
+
+    name = "transformers"
+
+    def __init__(self, model_path: str = None):
+        self.model_path = model_path or LOCAL_MODEL_NAME
+        self.pipeline = None
+
+    def _load_model(self):
+        import torch
+        from transformers import AutoModelForCausalLM
+
+        torch_dtype = "auto" if LOCAL_MODEL_DTYPE == "auto" else getattr(torch, LOCAL_MODEL_DTYPE)
+        model_kwargs = {"torch_dtype": torch_dtype, "trust_remote_code": LOCAL_MODEL_TRUST_REMOTE_CODE}
+        if LOCAL_MODEL_DEVICE == "auto":
+            model_kwargs["device_map"] = "auto"
+        return AutoModelForCausalLM.from_pretrained(self.model_path, **model_kwargs)
+
+    def _pipeline_kwargs(self) -> dict:
+        if LOCAL_MODEL_DEVICE == "auto":
+            return {}
+        return {"device": -1 if LOCAL_MODEL_DEVICE == "cpu" else LOCAL_MODEL_DEVICE}
+
+    def load(self):
+        import torch
+        from transformers import pipeline, AutoTokenizer
+
+        if LOCAL_MODEL_THREADS > 0:
+            torch.set_num_threads(LOCAL_MODEL_THREADS)
+        tokenizer = AutoTokenizer.from_pretrained(self.model_path, trust_remote_code=LOCAL_MODEL_TRUST_REMOTE_CODE)
+        # Batched prompts must be left-padded for decoder-only models
+        tokenizer.padding_side = "left"
+        if tokenizer.pad_token is None:
+            tokenizer.pad_token = tokenizer.eos_token
+        model = self._load_model()
+        self.pipeline = pipeline("text-generation", model=model, tokenizer=tokenizer, **self._pipeline_kwargs())
+
+    def generate(self, prompt: str, max_new_tokens: int = 200, **kwargs) -> str:
+        kwargs.setdefault("pad_token_id", self.pipeline.tokenizer.eos_token_id)
+        output = self.pipeline(prompt, max_new_tokens=max_new_tokens, return_full_text=False, **kwargs)
+        return output[0]["generated_text"]
+
+    def generate_batch(self, prompts: list, max_new_tokens: list, **kwargs) -> list:
+        """One padded forward pass for several prompts; each output is cut at its own token limit."""
+        import torch
+
+        tokenizer, model = self.pipeline.tokenizer, self.pipeline.model
+        inputs = tokenizer(prompts, return_tensors="pt", padding=True).to(model.device)
+        kwargs.setdefault("pad_token_id", tokenizer.pad_token_id)
+        with torch.no_grad():
+            output_ids = model.generate(**inputs, max_new_tokens=max(max_new_tokens), **kwargs)
+
+        stop_ids = {tokenizer.pad_token_id, tokenizer.eos_token_id}
+        results = []
+        for row, limit in zip(output_ids[:, inputs["input_ids"].shape[1]:].tolist(), max_new_tokens):
+            row = row[:limit]
+            n_tokens = next((i for i, token in enumerate(row) if token in stop_ids), len(row))
+            results.append((tokenizer.decode(row[:n_tokens], skip_special_tokens=True), n_tokens))
+        return results
+
+    def stream(self, prompt: str, max_new_tokens: int = 200, **kwargs):
+        from transformers import TextIteratorStreamer
+
+        tokenizer, model = self.pipeline.tokenizer, self.pipeline.model
+        inputs = tokenizer(prompt, return_tensors="pt").to(model.device)
+        streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True, timeout=LOCAL_STREAM_TIMEOUT)
+        kwargs.setdefault("pad_token_id", tokenizer.eos_token_id)
+        thread = threading.Thread(
+            target=model.generate,
+            kwargs=dict(**inputs, streamer=streamer, max_new_tokens=max_new_tokens, **kwargs),
+            daemon=True,
+        )
+        thread.start()
+        for text in streamer:
+            if text:
+                yield text
+        thread.join()
+
+
+class OnnxBackend(TransformersBackend):
+    """ONNX Runtime on CPU; generation and streaming are inherited from the transformers pipeline."""
+
+    name = "onnx"
+
+    def __init__(self, model_path: str = None):
+        super().__init__(model_path or LOCAL_MODEL_PATH or LOCAL_MODEL_NAME)
+
+    def _load_model(self):
+        import onnxruntime
+        from optimum.onnxruntime import ORTModelForCausalLM
+
+        options = onnxruntime.SessionOptions()
+        if LOCAL_MODEL_THREADS > 0:
+            options.intra_op_num_threads = LOCAL_MODEL_THREADS
+        already_exported = os.path.isdir(self.model_path) and any(
+            name.endswith(".onnx") for name in os.listdir(self.model_path)
+        )
+        return ORTModelForCausalLM.from_pretrained(
+            self.model_path,
+            export=not already_exported,
+            provider="CPUExecutionProvider",
+            session_options=options,
+            trust_remote_code=LOCAL_MODEL_TRUST_REMOTE_CODE,
+        )
+
+    def _pipeline_kwargs(self) -> dict:
+        return {}
+
+
+class CTranslate2Backend:
+    name = "ctranslate2"
+
+    def __init__(self, model_path: str = None):
+        self.model_path = model_path or LOCAL_MODEL_PATH
+        self.generator = None
+        self.tokenizer = None
+
+    def load(self):
+        import ctranslate2
+        from transformers import AutoTokenizer
+
+        if not self.model_path:
+            raise ValueError("LOCAL_MODEL_PATH must point to a CTranslate2 model dir for LOCAL_BACKEND=ctranslate2.")
+        self.generator = ctranslate2.Generator(
+            self.model_path, device="cpu", compute_type=LOCAL_COMPUTE_TYPE, intra_threads=LOCAL_MODEL_THREADS,
+        )
+        self.tokenizer = AutoTokenizer.from_pretrained(LOCAL_MODEL_NAME)
+
+    def _prompt_tokens(self, prompt: str) -> list:
+        return self.tokenizer.convert_ids_to_tokens(self.tokenizer.encode(prompt))
+
+    def _sampling_kwargs(self, kwargs: dict) -> dict:
+        temperature, top_p = _sampling(kwargs)
+        if temperature == 0.0:
+            return {"sampling_topk": 1}
+        return {"sampling_topk": 0, "sampling_temperature": temperature, "sampling_topp": top_p}
+
+    def generate(self, prompt: str, max_new_tokens: int = 200, **kwargs) -> str:
+        results = self.generator.generate_batch(
+            [self._prompt_tokens(prompt)],
+            max_length=max_new_tokens,
+            include_prompt_in_result=False,
+            **self._sampling_kwargs(kwargs),
+        )
+        return self.tokenizer.decode(results[0].sequences_ids[0], skip_special_tokens=True)
+
+    def generate_batch(self, prompts: list, max_new_tokens: list, **kwargs) -> list:
+        results = self.generator.generate_batch(
+            [self._prompt_tokens(prompt) for prompt in prompts],
+            max_length=max(max_new_tokens),
+            include_prompt_in_result=False,
+            **self._sampling_kwargs(kwargs),
+        )
+        outputs = []
+        for result, limit in zip(results, max_new_tokens):
+            ids = result.sequences_ids[0][:limit]
+            outputs.append((self.tokenizer.decode(ids, skip_special_tokens=True), len(ids)))
+        return outputs
+
+    def stream(self, prompt: str, max_new_tokens: int = 200, **kwargs):
+        # Decode the growing id list and yield only the new suffix, so multi-token characters come out whole
+        ids, emitted = [], ""
+        for step in self.generator.generate_tokens(
+            self._prompt_tokens(prompt), max_length=max_new_tokens, **self._sampling_kwargs(kwargs)
+        ):
+            ids.append(step.token_id)
+            text = self.tokenizer.decode(ids, skip_special_tokens=True)
+            if len(text) > len(emitted) and not text.endswith("�"):
+                yield text[len(emitted):]
+                emitted = text
+
+
+class GGUFBackend:
+    name = "gguf"
+
+    def __init__(self, model_path: str = None):
+        self.model_path = model_path or LOCAL_MODEL_PATH
+        self.llm = None
+
+    def load(self):
+        from llama_cpp import Llama
+
+        if not self.model_path:
+            raise ValueError("LOCAL_MODEL_PATH must point to a .gguf file for LOCAL_BACKEND=gguf.")
+        self.llm = Llama(
+            model_path=self.model_path,
+            n_ctx=LOCAL_CONTEXT_TOKENS,
+            n_threads=LOCAL_MODEL_THREADS or None,
+            verbose=False,
+        )
+
+    def _completion(self, prompt: str, max_new_tokens: int, stream: bool, kwargs: dict):
+        temperature, top_p = _sampling(kwargs)
+        return self.llm(prompt, max_tokens=max_new_tokens, temperature=temperature, top_p=top_p, stream=stream)
+
+    def generate(self, prompt: str, max_new_tokens: int = 200, **kwargs) -> str:
+        return self._completion(prompt, max_new_tokens, False, kwargs)["choices"][0]["text"]
+
+    def generate_batch(self, prompts: list, max_new_tokens: list, **kwargs) -> list:
+        # llama-cpp-python has no batched completion API; run the group back to back
+        outputs = []
+        for prompt, limit in zip(prompts, max_new_tokens):
+            completion = self._completion(prompt, limit, False, kwargs)
+            outputs.append((completion["choices"][0]["text"], completion["usage"]["completion_tokens"]))
+        return outputs
+
+    def stream(self, prompt: str, max_new_tokens: int = 200, **kwargs):
+        for chunk in self._completion(prompt, max_new_tokens, True, kwargs):
+            text = chunk["choices"][0]["text"]
+            if text:
+                yield text
+
+
+BACKENDS = {
+    "transformers": TransformersBackend,
+    "onnx": OnnxBackend,
+    "ctranslate2": CTranslate2Backend,
+    "gguf": GGUFBackend,
+}
+
+
+def create_backend(name: str, model_path: str = None):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown LOCAL_BACKEND '{name}'. Choose from: {', '.join(BACKENDS)}")
+    return BACKENDS[name](model_path)
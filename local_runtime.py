@@ -0,0 +1,116 @@
+# agents/local_runtime.py
+
+"""
+Process-wide runtime for the local (offline) LLM.
+
+Every local-mode call goes through get_local_runtime(), so the model is
+loaded once, lazily on first use, instead of once per module (or per call).
+The runtime is call-compatible with a transformers text-generation pipeline:
+
+    get_local_runtime()(prompt, max_new_tokens=200)[0]["generated_text"]
+
+and also streams tokens via runtime.stream(prompt). The inference backend
+(transformers, onnx, ctranslate2, gguf) comes from LOCAL_BACKEND, see
+local_backends. Non-streaming generations go through the batch scheduler
+(local_scheduler), which groups concurrent prompts into padded batches.
+Concurrent generations are capped by LOCAL_MODEL_MAX_CONCURRENCY; extra
+callers wait their turn.
+"""
+
+import os
+import threading
+from agents.local_backends import create_backend, LOCAL_MODEL_NAME, LOCAL_MODEL_PATH
+from agents.local_scheduler import LocalBatchScheduler
+
+LOCAL_BACKEND = os.getenv("LOCAL_BACKEND", "transformers")
+LOCAL_MODEL_MAX_CONCURRENCY = int(os.getenv("LOCAL_MODEL_MAX_CONCURRENCY", "1"))
+LOCAL_BATCHING = os.getenv("LOCAL_BATCHING", "true").lower() in ("1", "true", "yes")
+# Response-cache key of the local model: outputs differ between backends / quantizations
+LOCAL_MODEL_KEY = f"local:{LOCAL_BACKEND}:{LOCAL_MODEL_PATH or LOCAL_MODEL_NAME}"
+
+
+class LocalModelUnavailable(RuntimeError):
+    pass
+
+
+class LocalRuntime:
+    def __init__(self, backend: str = LOCAL_BACKEND, model_path: str = None,
+                 max_concurrency: int = LOCAL_MODEL_MAX_CONCURRENCY, batching: bool = LOCAL_BATCHING):
+        self.backend_name = backend
+        self.model_path = model_path
+        self._backend = None
+        self._load_error = None
+        self._load_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max(1, max_concurrency))
+        self._scheduler = LocalBatchScheduler(lambda: self.backend, self._slots) if batching else None
+
+    # --- Loading ---
+    @property
+    def backend(self):
+        """The loaded inference backend; loads it on first access."""
+        if self._backend is None:
+            with self._load_lock:
+                if self._backend is None:
+                    if self._load_error is not None:
+                        raise LocalModelUnavailable(self._load_error)
+                    try:
+                        backend = create_backend(self.backend_name, self.model_path)
+                        backend.load()
+                        self._backend = backend
+                        print(f"✅ Loaded local model with the {self.backend_name} backend.")
+                    except Exception as e:
+                        self._load_error = str(e)
+                        print(f"⚠️ Failed to load local model ({self.backend_name}): {e}")
+                        raise LocalModelUnavailable(self._load_error) from e
+        return self._backend
+
+    def is_available(self) -> bool:
+        try:
+            self.backend
+            return True
+        except LocalModelUnavailable:
+            return False
+
+    @property
+    def batching(self) -> bool:
+        """True when concurrent generate() calls are grouped into shared batches."""
+        return self._scheduler is not None
+
+    # --- Generation ---
+    def generate(self, prompt: str, max_new_tokens: int = 200, **generate_kwargs) -> str:
+        """Returns only the generated continuation (batched with concurrent callers when batching is on)."""
+        backend = self.backend
+        if self._scheduler is not None:
+            return self._scheduler.submit(prompt, max_new_tokens, **generate_kwargs).result()
+        with self._slots:
+            return backend.generate(prompt, max_new_tokens=max_new_tokens, **generate_kwargs)
+
+    def __call__(self, prompt: str, max_new_tokens: int = 200, return_full_text: bool = True, **generate_kwargs):
+        """Same contract as the transformers pipeline: [{"generated_text": prompt + continuation}]."""
+        continuation = self.generate(prompt, max_new_tokens=max_new_tokens, **generate_kwargs)
+        return [{"generated_text": prompt + continuation if return_full_text else continuation}]
+
+    def stream(self, prompt: str, max_new_tokens: int = 300, **generate_kwargs):
+        """Yields the newly generated text (prompt excluded) piece by piece."""
+        backend = self.backend
+        with self._slots:
+            yield from backend.stream(prompt, max_new_tokens=max_new_tokens, **generate_kwargs)
+
+    def stats(self) -> dict:
+        stats = {"backend": self.backend_name, "loaded": self._backend is not None, "batching": self.batching}
+        if self._scheduler is not None:
+            stats.update(self._scheduler.stats())
+        return stats
+
+
+_runtime = None
+_runtime_lock = threading.Lock()
+
+
+def get_local_runtime() -> LocalRuntime:
+    """Returns the shared local runtime (the model itself loads on first generation)."""
+    global _runtime
+    with _runtime_lock:
+        if _runtime is None:
+            _runtime = LocalRuntime()
+        return _runtime
@@ -0,0 +1,141 @@
+# agents/local_scheduler.py
+
+"""
+Request scheduler in front of the local model. Instead of every caller
+running its own generate() on the shared model (serializing, or thrashing
+the CPU), prompts are queued and a single worker thread runs them as padded
+batches:
+
+    - the first queued request opens a batch window of LOCAL_BATCH_WINDOW_MS;
+      the batch runs when the window closes or LOCAL_BATCH_MAX_SIZE requests are queued
+    - only requests with the same sampling settings share a batch
+    - the group of the oldest waiting request always goes next, so no caller starves
+
+Each request records how long it waited in the queue and how long its batch
+took to generate; stats() aggregates both along with tokens/s.
+"""
+
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import Future
+import numpy as np
+
+LOCAL_BATCH_MAX_SIZE = int(os.getenv("LOCAL_BATCH_MAX_SIZE", "4"))
+LOCAL_BATCH_WINDOW_MS = float(os.getenv("LOCAL_BATCH_WINDOW_MS", "25"))
+STATS_WINDOW = 1000  # recent requests kept for latency percentiles
+
+
+class _Request:
+    __slots__ = ("prompt", "max_new_tokens", "kwargs", "key", "future", "enqueued")
+
+    def __init__(self, prompt: str, max_new_tokens: int, kwargs: dict):
+        self.prompt = prompt
+        self.max_new_tokens = max_new_tokens
+        self.kwargs = kwargs
+        self.key = repr(sorted(kwargs.items()))
+        self.future = Future()
+        self.enqueued = time.monotonic()
+
+
+class LocalBatchScheduler:
+    def __init__(self, get_backend, slots: threading.Semaphore,
+                 max_batch_size: int = LOCAL_BATCH_MAX_SIZE, window_ms: float = LOCAL_BATCH_WINDOW_MS):
+        self._get_backend = get_backend
+        self._slots = slots
+        self.max_batch_size = max(1, max_batch_size)
+        self.window = window_ms / 1000
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._stats_lock = threading.Lock()
+        self._waits_ms = deque(maxlen=STATS_WINDOW)
+        self._generation_ms = deque(maxlen=STATS_WINDOW)
+        self._batch_sizes = deque(maxlen=STATS_WINDOW)
+        self._requests = self._batches = self._tokens = 0
+        self._busy_seconds = 0.0
+        threading.Thread(target=self._run, name="local-llm-scheduler", daemon=True).start()
+
+    def submit(self, prompt: str, max_new_tokens: int = 200, **generate_kwargs) -> Future:
+        """Queues a prompt; the future resolves to the generated continuation."""
+        request = _Request(prompt, max_new_tokens, generate_kwargs)
+        with self._cond:
+            self._queue.append(request)
+            self._cond.notify()
+        return request.future
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            waits, gens = np.array(self._waits_ms), np.array(self._generation_ms)
+            return {
+                "queued": len(self._queue),
+                "requests": self._requests,
+                "batches": self._batches,
+                "avg_batch_size": round(float(np.mean(self._batch_sizes)), 2) if self._batch_sizes else 0.0,
+                "queue_wait_ms": _percentiles(waits),
+                "generation_ms": _percentiles(gens),
+                "tokens_generated": self._tokens,
+                "tokens_per_second": round(self._tokens / self._busy_seconds, 2) if self._busy_seconds else 0.0,
+                "max_batch_size": self.max_batch_size,
+                "window_ms": self.window * 1000,
+            }
+
+    # --- Worker ---
+    def _next_batch(self) -> list:
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+            # Give concurrent callers a moment to join, unless the batch is already full
+            deadline = self._queue[0].enqueued + self.window
+            while len(self._queue) < self.max_batch_size and (remaining := deadline - time.monotonic()) > 0:
+                self._cond.wait(remaining)
+
+            key = self._queue[0].key
+            batch = [r for r in self._queue if r.key == key][:self.max_batch_size]
+            for request in batch:
+                self._queue.remove(request)
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            batch = [r for r in batch if r.future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                backend = self._get_backend()
+                with self._slots:
+                    started = time.monotonic()
+                    outputs = backend.generate_batch(
+                        [r.prompt for r in batch], [r.max_new_tokens for r in batch], **batch[0].kwargs
+                    )
+                    finished = time.monotonic()
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+
+            self._record(batch, started, finished, sum(n for _, n in outputs))
+            for request, (text, _) in zip(batch, outputs):
+                request.future.set_result(text)
+
+    def _record(self, batch: list, started: float, finished: float, tokens: int):
+        with self._stats_lock:
+            self._requests += len(batch)
+            self._batches += 1
+            self._tokens += tokens
+            self._busy_seconds += finished - started
+            self._batch_sizes.append(len(batch))
+            for request in batch:
+                self._waits_ms.append((started - request.enqueued) * 1000)
+                self._generation_ms.append((finished - started) * 1000)
+
+
+def _percentiles(values: np.ndarray) -> dict:
+    if not len(values):
+        return {"avg": 0.0, "p50": 0.0, "p95": 0.0}
+    return {
+        "avg": round(float(values.mean()), 1),
+        "p50": round(float(np.percentile(values, 50)), 1),
+        "p95": round(float(np.percentile(values, 95)), 1),
+    }
@@ -1,4 +1,5 @@
 import pandas as pd
+from agents.dataset_profile import get_profile
 
 def perform_eda(df):
     """
@@ -9,14 +10,15 @@ def perform_eda(df):
 
     try:
         observations.append("--- 🔍 Performing EDA ---")
+        profile = get_profile(df)
 
         # --- Dataset Shape ---
-        num_rows, num_cols = df.shape
+        num_rows, num_cols = profile.n_rows, profile.n_cols
         eda_results["shape"] = {"rows": num_rows, "columns": num_cols}
         observations.append(f"📊 Rows: {num_rows}, Columns: {num_cols}")
 
         # --- Missing Values ---
-        missing = df.isnull().sum()
+        missing = profile.null_counts
         missing_filtered = missing[missing > 0]
         eda_results["missing_values"] = missing_filtered.to_dict()
         total_cells = num_rows * num_cols
@@ -33,14 +35,14 @@ def perform_eda(df):
 
         # --- Categorical Value Counts ---
         eda_results["categorical_value_counts"] = {}
-        categorical_columns = df.select_dtypes(include='object')
+        categorical_columns = profile.object_columns
 
-        if not categorical_columns.empty:
+        if categorical_columns:
             observations.append("\n--- 🏷️ Categorical Column Value Counts (Top 5) ---")
-            for col in categorical_columns.columns:
-                unique_count = df[col].nunique()
-                total_rows = df.shape[0]
-                top_values = df[col].value_counts().head(5).to_dict()
+            for col in categorical_columns:
+                unique_count = profile.nunique[col]
+                total_rows = num_rows
+                top_values = profile.top_values(col, 5).to_dict()
                 eda_results["categorical_value_counts"][col] = top_values
 
                 observations.append(f"\n  Column: {col} – Top 5 Values:")
@@ -61,28 +63,27 @@ def perform_eda(df):
 
         # ========== SMART AGENT LAYER ==========
         observations.append("\n--- 🧠 Smart Agent Observations ---")
-        numeric_df = df.select_dtypes(include='number')
 
         # 1. High Cardinality Identifier-like Columns
-        high_unique_cols = [col for col in df.columns if df[col].nunique() > 0.8 * len(df)]
+        high_unique_cols = [col for col in profile.columns if profile.nunique[col] > 0.8 * num_rows]
         for col in high_unique_cols:
-            observations.append(f"💡 '{col}' has {df[col].nunique()} unique values — likely an identifier or free-text column.")
+            observations.append(f"💡 '{col}' has {profile.nunique[col]} unique values — likely an identifier or free-text column.")
 
         # 2. High Variability Columns
-        for col in numeric_df.columns:
-            mean = numeric_df[col].mean()
-            std = numeric_df[col].std()
+        for col in profile.numeric_columns:
+            mean = profile.describe.loc["mean", col]
+            std = profile.describe.loc["std", col]
             if mean != 0 and std / mean > 1.0:
                 observations.append(f"💡 '{col}' shows high variability (std > mean). A histogram or boxplot might help.")
 
         # 3. Skewed Distributions
-        skew_vals = numeric_df.skew()
+        skew_vals = profile.skew
         for col, skew in skew_vals.items():
             if abs(skew) > 1:
                 observations.append(f"💡 '{col}' is highly skewed (skew = {skew:.2f}). Consider a boxplot or transformation.")
 
         # 4. Strong Correlations
-        corr_matrix = numeric_df.corr().abs()
+        corr_matrix = profile.corr.abs()
         checked_pairs = set()
         for col1 in corr_matrix.columns:
             for col2 in corr_matrix.columns:
@@ -1,25 +1,27 @@
 import pandas as pd
+from agents.dataset_profile import get_profile
 
 def detect_proactive_signals(df: pd.DataFrame) -> str:
     signals = []
+    profile = get_profile(df)
 
     # 1. Detect Potential ID Columns
-    id_cols = [col for col in df.columns if df[col].nunique() == len(df)]
+    id_cols = [col for col in profile.columns if profile.nunique[col] == profile.n_rows]
     if id_cols:
         signals.append(f"🔑 Possible ID columns: {', '.join(id_cols)}")
 
     # 2. High Cardinality Columns
-    high_card_cols = [col for col in df.columns if df[col].nunique() > 50 and df[col].dtype == 'object']
+    high_card_cols = [col for col in profile.object_columns if profile.nunique[col] > 50]
     if high_card_cols:
         signals.append(f"📛 High-cardinality categorical columns: {', '.join(high_card_cols)}")
 
     # 3. Low Variance Numeric Columns
-    low_var_cols = [col for col in df.select_dtypes(include='number').columns if df[col].std() < 1e-3]
+    low_var_cols = [col for col in profile.numeric_columns if profile.describe.loc["std", col] < 1e-3]
     if low_var_cols:
         signals.append(f"📉 Low-variance numeric columns: {', '.join(low_var_cols)}")
 
     # 4. Highly Correlated Features
-    corr = df.select_dtypes(include='number').corr()
+    corr = profile.corr
     correlated_pairs = []
     for i in range(len(corr.columns)):
         for j in range(i):
@@ -31,7 +33,7 @@ def detect_proactive_signals(df: pd.DataFrame) -> str:
         signals.append(f"🔗 Highly correlated pairs: {formatted}")
 
     # 5. Null-heavy columns
-    null_cols = [col for col in df.columns if df[col].isna().mean() > 0.5]
+    null_cols = [col for col in profile.columns if profile.null_ratio[col] > 0.5]
     if null_cols:
         signals.append(f"⚠️ Columns with >50% missing values: {', '.join(null_cols)}")
 
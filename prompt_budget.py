@@ -0,0 +1,230 @@
+# agents/prompt_budget.py
+
+"""
+Token budgets for LLM prompts built from dataset context.
+
+A prompt is assembled from named sections. Required sections (instructions,
+the final ask) are always kept in full; the others are filled in priority
+order (1 = most important) until the budget is spent, each trimmed line by
+line to its own max_tokens cap. Sections that no longer fit are dropped, and
+the output keeps the order in which sections were added:
+
+    builder = PromptBuilder(budget_for(model_mode), label="summary", count=counter_for(model_mode))
+    builder.add("instructions", instructions, required=True)
+    builder.add("stats", stats_text, priority=1, max_tokens=800)
+    prompt = builder.build()          # builder.report has the per-section token counts
+
+Local prompts are counted with the local model's tokenizer (PROMPT_TOKENIZER,
+defaults to LOCAL_MODEL_NAME), loaded on the first local count. Cloud prompts,
+and local ones when the tokenizer cannot be loaded, are estimated at ~4
+characters per token. Every built prompt is logged, and prompt_stats()
+aggregates the token counts per label.
+"""
+
+import os
+import threading
+from collections import deque
+from agents.local_backends import LOCAL_MODEL_NAME, LOCAL_CONTEXT_TOKENS
+
+PROMPT_TOKENIZER = os.getenv("PROMPT_TOKENIZER", LOCAL_MODEL_NAME)
+# Local prompts leave room for the generated tokens inside the model's context window
+PROMPT_TOKEN_BUDGET_LOCAL = int(os.getenv("PROMPT_TOKEN_BUDGET_LOCAL", str(max(256, LOCAL_CONTEXT_TOKENS - 512))))
+PROMPT_TOKEN_BUDGET_CLOUD = int(os.getenv("PROMPT_TOKEN_BUDGET_CLOUD", "6000"))
+CHARS_PER_TOKEN = 4
+MIN_SECTION_TOKENS = 24  # smaller leftovers are dropped rather than filled with a stub
+STATS_WINDOW = 1000
+
+TRIM_MARKER = "… (trimmed to fit the prompt budget)"
+
+_tokenizer = None
+_tokenizer_failed = False
+_tokenizer_lock = threading.Lock()
+
+
+def _get_tokenizer():
+    global _tokenizer, _tokenizer_failed
+    if _tokenizer is None and not _tokenizer_failed:
+        with _tokenizer_lock:
+            if _tokenizer is None and not _tokenizer_failed:
+                try:
+                    from transformers import AutoTokenizer
+                    _tokenizer = AutoTokenizer.from_pretrained(PROMPT_TOKENIZER)
+                except Exception as e:
+                    _tokenizer_failed = True
+                    print(f"⚠️ Prompt tokenizer unavailable ({PROMPT_TOKENIZER}), estimating tokens from length: {e}")
+    return _tokenizer
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap length-based count; the cloud model's budget leaves room for the difference."""
+    return -(-len(text or "") // CHARS_PER_TOKEN)
+
+
+def count_tokens(text: str) -> int:
+    """Exact count with the local model's tokenizer (loaded on first use)."""
+    if not text:
+        return 0
+    tokenizer = _get_tokenizer()
+    if tokenizer is None:
+        return estimate_tokens(text)
+    return len(tokenizer.encode(text, add_special_tokens=False))
+
+
+def budget_for(model_mode: str) -> int:
+    return PROMPT_TOKEN_BUDGET_LOCAL if model_mode == "local" else PROMPT_TOKEN_BUDGET_CLOUD
+
+
+def counter_for(model_mode: str):
+    """Token counter for a model mode: the local tokenizer only for local prompts."""
+    return count_tokens if model_mode == "local" else estimate_tokens
+
+
+def _largest_fit(n: int, fits) -> int:
+    """Largest k in [0, n] with fits(k), assuming fits is monotonic."""
+    lo, hi = 0, n
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if fits(mid):
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def trim_to_tokens(text: str, max_tokens: int, count=estimate_tokens) -> str:
+    """Keeps the leading lines of text that fit in max_tokens; returns "" if none do."""
+    if count(text) <= max_tokens:
+        return text
+    lines = text.splitlines()
+    keep = _largest_fit(len(lines), lambda k: count("\n".join(lines[:k] + [TRIM_MARKER])) <= max_tokens)
+    return "\n".join(lines[:keep] + [TRIM_MARKER]) if keep else ""
+
+
+def trim_middle(text: str, max_tokens: int, count=estimate_tokens) -> str:
+    """
+    Fits an unstructured prompt into max_tokens by cutting lines out of the
+    middle, so the leading instructions and the final ask both survive.
+    """
+    if count(text) <= max_tokens:
+        return text
+    lines = text.splitlines()
+
+    def kept(k):
+        head = (k + 1) // 2
+        return lines[:head] + [TRIM_MARKER] + (lines[len(lines) - (k - head):] if k > head else [])
+
+    keep = _largest_fit(len(lines), lambda k: count("\n".join(kept(k))) <= max_tokens)
+    if keep:
+        return "\n".join(kept(keep))
+    # A single oversized line: fall back to keeping both ends by characters
+    chars = max(0, (max_tokens - count(TRIM_MARKER)) * CHARS_PER_TOKEN // 2)
+    return text[:chars] + TRIM_MARKER + (text[-chars:] if chars else "")
+
+
+class PromptBuilder:
+    def __init__(self, budget: int, label: str = "prompt", count=estimate_tokens):
+        self.budget = budget
+        self.label = label
+        self.count = count
+        self.sections = []
+        self.report = None
+
+    def add(self, name: str, text: str, priority: int = 1, max_tokens: int = None, required: bool = False):
+        self.sections.append({"name": name, "text": text or "", "priority": priority,
+                              "max_tokens": max_tokens, "required": required})
+        return self
+
+    def build(self) -> str:
+        fitted, report = {}, {}
+        remaining = self.budget
+        for section in self.sections:
+            if section["required"]:
+                tokens = self.count(section["text"])
+                fitted[section["name"]] = section["text"]
+                report[section["name"]] = {"tokens": tokens, "original_tokens": tokens}
+                remaining -= tokens
+
+        optional = [s for s in self.sections if not s["required"]]
+        for section in sorted(optional, key=lambda s: s["priority"]):
+            original = self.count(section["text"])
+            cap = min(remaining, section["max_tokens"] or remaining)
+            text = trim_to_tokens(section["text"], cap, self.count) if cap >= MIN_SECTION_TOKENS else ""
+            tokens = self.count(text)
+            fitted[section["name"]] = text
+            report[section["name"]] = {"tokens": tokens, "original_tokens": original}
+            remaining -= tokens
+
+        parts = []
+        for section in self.sections:
+            text = fitted[section["name"]]
+            if text:
+                parts.append(text)
+            elif section["text"]:
+                report[section["name"]]["dropped"] = True
+        prompt = "\n\n".join(parts)
+
+        self.report = {
+            "label": self.label,
+            "budget": self.budget,
+            "prompt_tokens": self.count(prompt),
+            "original_tokens": sum(s["original_tokens"] for s in report.values()),
+            "sections": report,
+        }
+        _record(self.report)
+        return prompt
+
+
+def log_prompt_tokens(report: dict):
+    sections = []
+    for name, s in report.get("sections", {}).items():
+        if s.get("dropped"):
+            sections.append(f"{name} dropped")
+        elif s["tokens"] < s["original_tokens"]:
+            sections.append(f"{name} {s['tokens']} (of {s['original_tokens']})")
+        else:
+            sections.append(f"{name} {s['tokens']}")
+    detail = f" | {', '.join(sections)}" if sections else ""
+    print(f"📏 {report['label']} prompt: {report['prompt_tokens']}/{report['budget']} tokens{detail}")
+
+
+def fit_prompt(prompt: str, budget: int, label: str = "prompt", count=estimate_tokens) -> str:
+    """Trims an already assembled prompt to the budget (middle first) and records its token count."""
+    original = count(prompt)
+    fitted = trim_middle(prompt, budget, count) if original > budget else prompt
+    _record({"label": label, "budget": budget, "prompt_tokens": count(fitted) if original > budget else original,
+             "original_tokens": original, "sections": {}})
+    return fitted
+
+
+# --- Per-label token counters ---
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+def _record(report: dict):
+    log_prompt_tokens(report)
+    with _stats_lock:
+        entry = _stats.setdefault(report["label"], {"calls": 0, "trimmed": 0, "tokens": deque(maxlen=STATS_WINDOW)})
+        entry["calls"] += 1
+        entry["trimmed"] += report["prompt_tokens"] < report["original_tokens"]
+        entry["tokens"].append(report["prompt_tokens"])
+
+
+def prompt_stats() -> dict:
+    with _stats_lock:
+        return {
+            "token_counters": {
+                "local": PROMPT_TOKENIZER if not _tokenizer_failed else f"~{CHARS_PER_TOKEN} chars/token estimate",
+                "cloud": f"~{CHARS_PER_TOKEN} chars/token estimate",
+            },
+            "budgets": {"local": PROMPT_TOKEN_BUDGET_LOCAL, "cloud": PROMPT_TOKEN_BUDGET_CLOUD},
+            "labels": {
+                label: {
+                    "calls": e["calls"],
+                    "trimmed": e["trimmed"],
+                    "avg_prompt_tokens": round(sum(e["tokens"]) / len(e["tokens"]), 1) if e["tokens"] else 0.0,
+                    "max_prompt_tokens": max(e["tokens"], default=0),
+                }
+                for label, e in _stats.items()
+            },
+        }
@@ -0,0 +1,148 @@
+# agents/qa_explanations.py
+
+"""
+Explanation + chain-of-thought follow-ups for Q&A answers.
+
+Both prompts only depend on the answer, not on each other, so they are sent
+concurrently; in local mode they reach the batch scheduler together and
+share one batch. Callers choose how much of that work happens up front:
+
+    explain="eager"  generate both now (in parallel) and return them with the answer
+    explain="lazy"   return an explain_id; get_deferred_explanations(id) generates on demand
+    explain="skip"   answer only
+
+Deferred prompts and their results are kept in SQLite (EXPLAIN_STORE_PATH),
+so an explain_id can be fetched from any worker process.
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from agents.local_runtime import get_local_runtime
+
+EXPLAIN_MODES = ("eager", "lazy", "skip")
+EXPLAIN_WORKERS = int(os.getenv("EXPLAIN_WORKERS", "8"))
+EXPLAIN_STORE_PATH = os.getenv("EXPLAIN_STORE_PATH", os.path.join("llm_cache", "explanations.sqlite"))
+DEFERRED_EXPLANATIONS_MAX = int(os.getenv("DEFERRED_EXPLANATIONS_MAX", "1000"))
+
+_executor = ThreadPoolExecutor(max_workers=EXPLAIN_WORKERS, thread_name_prefix="explain")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS deferred (
+    id TEXT PRIMARY KEY,
+    prompts TEXT NOT NULL,
+    result TEXT,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS deferred_created ON deferred (created);
+"""
+
+
+def generate_explanations(explanation_prompt: str, cot_prompt: str, model_mode: str = "cloud", max_new_tokens: int = 300):
+    """Returns (explanation, cot_reasoning), with the two LLM calls in flight at the same time."""
+    from agents.qa_agent import call_llm
+
+    if model_mode == "local" and not get_local_runtime().batching:
+        # Without the batch scheduler, two local generations at once only split the CPU cores
+        return (
+            call_llm(explanation_prompt, model_mode, max_new_tokens=max_new_tokens),
+            call_llm(cot_prompt, model_mode, max_new_tokens=max_new_tokens),
+        )
+    explanation_future = _executor.submit(call_llm, explanation_prompt, model_mode, max_new_tokens)
+    cot_reasoning = call_llm(cot_prompt, model_mode, max_new_tokens=max_new_tokens)
+    return explanation_future.result(), cot_reasoning
+
+
+class DeferredExplanationStore:
+    """The newest DEFERRED_EXPLANATIONS_MAX deferred prompt sets, with their results once generated."""
+
+    def __init__(self, path: str = EXPLAIN_STORE_PATH, max_entries: int = DEFERRED_EXPLANATIONS_MAX):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    def add(self, explain_id: str, prompts: list):
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO deferred (id, prompts, result, created) VALUES (?, ?, NULL, ?)",
+                (explain_id, json.dumps(prompts), time.time()),
+            )
+            self._db.execute(
+                "DELETE FROM deferred WHERE id IN ("
+                "SELECT id FROM deferred ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._db.commit()
+
+    def get(self, explain_id: str):
+        """Returns (prompts, result or None); raises KeyError for unknown or expired ids."""
+        with self._lock:
+            row = self._db.execute("SELECT prompts, result FROM deferred WHERE id = ?", (explain_id,)).fetchone()
+        if row is None:
+            raise KeyError(explain_id)
+        return json.loads(row[0]), json.loads(row[1]) if row[1] is not None else None
+
+    def set_result(self, explain_id: str, result: dict):
+        with self._lock:
+            self._db.execute("UPDATE deferred SET result = ? WHERE id = ?", (json.dumps(result), explain_id))
+            self._db.commit()
+
+
+_store = None
+_store_lock = threading.Lock()
+# Concurrent fetches of the same id in this process share one generation
+_generation_locks = [threading.Lock() for _ in range(64)]
+
+
+def get_explanation_store() -> DeferredExplanationStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = DeferredExplanationStore()
+        return _store
+
+
+def defer_explanations(explanation_prompt: str, cot_prompt: str, model_mode: str = "cloud", max_new_tokens: int = 300) -> str:
+    """Stores the prompts for later and returns the explain_id to fetch them with."""
+    explain_id = uuid.uuid4().hex
+    get_explanation_store().add(explain_id, [explanation_prompt, cot_prompt, model_mode, max_new_tokens])
+    return explain_id
+
+
+def get_deferred_explanations(explain_id: str) -> dict:
+    """Generates (once) and returns {"explanation", "cot_reasoning"}; raises KeyError for unknown or expired ids."""
+    store = get_explanation_store()
+    _, result = store.get(explain_id)
+    if result is not None:
+        return result
+    with _generation_locks[hash(explain_id) % len(_generation_locks)]:
+        prompts, result = store.get(explain_id)  # another thread may have generated it meanwhile
+        if result is None:
+            explanation, cot_reasoning = generate_explanations(*prompts)
+            result = {"explanation": explanation, "cot_reasoning": cot_reasoning}
+            store.set_result(explain_id, result)
+    return result
+
+
+def attach_explanations(result: dict, explanation_prompt: str, cot_prompt: str,
+                        model_mode: str = "cloud", explain: str = "eager", max_new_tokens: int = 300) -> dict:
+    """Fills result["explanation"] / result["cot_reasoning"] according to the explain mode."""
+    if explain not in EXPLAIN_MODES:
+        raise ValueError(f"Unknown explain mode '{explain}'. Choose from: {', '.join(EXPLAIN_MODES)}")
+    if explain == "eager":
+        result["explanation"], result["cot_reasoning"] = generate_explanations(
+            explanation_prompt, cot_prompt, model_mode, max_new_tokens
+        )
+    elif explain == "lazy":
+        result["explanation"] = result["cot_reasoning"] = None
+        result["explain_id"] = defer_explanations(explanation_prompt, cot_prompt, model_mode, max_new_tokens)
+    else:
+        result["explanation"] = result["cot_reasoning"] = "N/A"
+    return result
@@ -0,0 +1,224 @@
+# agents/query_filters.py
+
+"""
+Extracts simple column predicates from a natural-language question so the
+vector search can be restricted to matching rows, e.g.
+
+    "complaints from West region in March"  ->  region == "West", date month == 3
+    "orders with amount over 500"           ->  amount > 500
+
+Only three kinds are recognized: equality on low-cardinality text columns,
+month/year on a date column, and numeric ranges on a named column.
+Anything else is left to the vector search. The column metadata this needs
+(distinct text values, the parsed date column) is computed once per dataset
+version and memoized, not per question.
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from agents.dataset_profile import version_key
+
+FILTER_CACHE_SIZE = int(os.getenv("FILTER_CACHE_SIZE", "8"))
+MAX_FILTER_CARDINALITY = 1000   # text columns with more distinct values are not matched on
+MIN_VALUE_LENGTH = 3   # shorter values ("US", "No") only match next to their column name
+COLUMN_NEAR_WORDS = 2  # words allowed between a column name and such a value ("churned is No")
+# Values that are also everyday words only match next to their column name as well
+COMMON_WORD_VALUES = frozenset({
+    "yes", "no", "true", "false", "none", "null", "all", "any", "other", "others", "new", "old",
+    "not", "and", "the", "high", "low", "top", "one", "two",
+})
+DATE_NAME_HINTS = ("date", "time", "month", "day", "period", "created", "updated")
+
+MONTHS = {
+    "january": 1, "february": 2, "march": 3, "april": 4, "may": 5, "june": 6, "july": 7,
+    "august": 8, "september": 9, "october": 10, "november": 11, "december": 12,
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "jun": 6, "jul": 7, "aug": 8,
+    "sep": 9, "sept": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+# "may" is usually the verb, so it only counts after a preposition
+_MONTH_PATTERN = re.compile(
+    r"\b(?:(?:in|during|for|of|since)\s+(may)|(" + "|".join(m for m in MONTHS if m != "may") + r"))\b"
+)
+# A bare number is only a year after a preposition or a month name ("in 2023", "March 2024"),
+# so "amount over 2000" stays a range
+_YEAR_PATTERN = re.compile(
+    r"\b(?:(?:in|during|for|since|year)\s+|(?:" + "|".join(MONTHS) + r")\s+)((?:19|20)\d{2})\b"
+)
+_NUMBER = r"\$?(-?\d[\d,]*(?:\.\d+)?)"
+_RANGE_OPS = (
+    ("gt", r"(?:over|above|greater than|more than|higher than|exceeding|>)"),
+    ("ge", r"(?:at least|>=)"),
+    ("lt", r"(?:under|below|less than|lower than|<)"),
+    ("le", r"(?:at most|<=)"),
+)
+
+
+def _column_pattern(col) -> str:
+    # "unit_price" also matches "unit price"
+    words = re.split(r"[\s_]+", str(col).strip().lower())
+    return r"[\s_]+".join(re.escape(w) for w in words if w)
+
+
+def _to_number(text: str) -> float:
+    return float(text.replace(",", ""))
+
+
+def _value_mentioned(q: str, value: str, name: str = None) -> bool:
+    """Whether the value appears as a word; with a column name, only within a few words of it."""
+    if name is None:
+        return re.search(rf"\b{value}\b", q) is not None
+    if not name:
+        return False
+    gap = rf"\W+(?:\w+\W+){{0,{COLUMN_NEAR_WORDS}}}"
+    return re.search(rf"\b{name}{gap}{value}\b|\b{value}{gap}{name}\b", q) is not None
+
+
+def _date_column(df: pd.DataFrame):
+    """Returns (column, datetime series) for the first date-like column, or (None, None)."""
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            return col, df[col]
+    for col in df.columns:
+        if pd.api.types.is_string_dtype(df[col]) and any(h in str(col).lower() for h in DATE_NAME_HINTS):
+            parsed = pd.to_datetime(df[col], errors="coerce")
+            if parsed.notna().mean() > 0.5:
+                return col, parsed
+    return None, None
+
+
+class FilterColumns:
+    """Column metadata extract_filters and filter_mask need, computed once per dataset version."""
+
+    def __init__(self, df: pd.DataFrame):
+        # Low-cardinality text columns: (value, lowercased value, needs column name nearby)
+        self.text_values = {}
+        for col in df.columns:
+            series = df[col]
+            if not (pd.api.types.is_string_dtype(series) or isinstance(series.dtype, pd.CategoricalDtype)):
+                continue
+            values = series.dropna().unique()
+            if len(values) > MAX_FILTER_CARDINALITY:
+                continue
+            kept = []
+            for v in values:
+                lowered = str(v).strip().lower()
+                if lowered and not lowered.isdigit():
+                    kept.append((v, lowered, len(lowered) < MIN_VALUE_LENGTH or lowered in COMMON_WORD_VALUES))
+            if kept:
+                self.text_values[col] = (_column_pattern(col), kept)
+        self.numeric_columns = [(col, _column_pattern(col)) for col in df.select_dtypes(include="number").columns]
+        self.date_column, self.dates = _date_column(df)
+
+
+_filter_columns = OrderedDict()
+_filter_columns_lock = threading.Lock()
+
+
+def get_filter_columns(df: pd.DataFrame) -> FilterColumns:
+    """Returns the memoized FilterColumns of this dataset version, computing them on first use."""
+    key = version_key(df)
+    if key is not None:
+        with _filter_columns_lock:
+            columns = _filter_columns.get(key)
+            if columns is not None:
+                _filter_columns.move_to_end(key)
+                return columns
+
+    columns = FilterColumns(df)
+    if key is not None:
+        with _filter_columns_lock:
+            _filter_columns[key] = columns
+            while len(_filter_columns) > FILTER_CACHE_SIZE:
+                _filter_columns.popitem(last=False)
+    return columns
+
+
+def extract_filters(df: pd.DataFrame, question: str) -> list:
+    """
+    Returns a list of {"column", "op", "value"} predicates found in the question.
+    op is one of: in, month, year, gt, ge, lt, le, between.
+    """
+    q = question.lower()
+    columns = get_filter_columns(df)
+    filters = []
+
+    # Equality on categorical / low-cardinality text columns
+    for col, (name, values) in columns.text_values.items():
+        matched = [v for v, lowered, needs_name in values
+                   if lowered in q and _value_mentioned(q, re.escape(lowered), name if needs_name else None)]
+        if matched:
+            filters.append({"column": col, "op": "in", "value": matched})
+
+    # Numeric ranges on a named column; their numbers can't be years as well
+    consumed = []
+    for col, name in columns.numeric_columns:
+        if not name or not re.search(name, q):
+            continue
+        between = re.search(rf"{name}\s+(?:is\s+)?between\s+{_NUMBER}\s+(?:and|to)\s+{_NUMBER}", q)
+        if between:
+            low, high = sorted((_to_number(between.group(1)), _to_number(between.group(2))))
+            filters.append({"column": col, "op": "between", "value": [low, high]})
+            consumed.append(between.span())
+            continue
+        for op, words in _RANGE_OPS:
+            match = re.search(rf"{name}\s+(?:is\s+|of\s+)?{words}\s*{_NUMBER}", q)
+            if match:
+                filters.append({"column": col, "op": op, "value": _to_number(match.group(1))})
+                consumed.append(match.span())
+                break
+
+    # Month / year on the first date column
+    month_match = _MONTH_PATTERN.search(q)
+    year_match = next((m for m in _YEAR_PATTERN.finditer(q)
+                       if not any(start < m.end(1) and m.start(1) < end for start, end in consumed)), None)
+    if month_match or year_match:
+        date_col = columns.date_column
+        if date_col is not None:
+            if month_match:
+                filters.append({"column": date_col, "op": "month", "value": MONTHS[month_match.group(1) or month_match.group(2)]})
+            if year_match:
+                filters.append({"column": date_col, "op": "year", "value": int(year_match.group(1))})
+
+    return filters
+
+
+def filter_mask(df: pd.DataFrame, filters: list) -> np.ndarray:
+    """Boolean mask of rows matching every filter."""
+    mask = np.ones(len(df), dtype=bool)
+    if any(f["op"] in ("month", "year") for f in filters):
+        columns = get_filter_columns(df)
+        date_col, dates = columns.date_column, columns.dates
+    else:
+        date_col, dates = None, None
+    for f in filters:
+        col, op, value = f["column"], f["op"], f["value"]
+        if op == "in":
+            mask &= df[col].isin(value).to_numpy()
+        elif op in ("month", "year"):
+            series = dates if col == date_col else pd.to_datetime(df[col], errors="coerce")
+            part = series.dt.month if op == "month" else series.dt.year
+            mask &= (part == value).to_numpy()
+        elif op == "between":
+            mask &= df[col].between(value[0], value[1]).to_numpy()
+        else:
+            mask &= getattr(df[col], op)(value).to_numpy()
+    return mask
+
+
+def describe_filters(filters: list) -> str:
+    symbols = {"gt": ">", "ge": ">=", "lt": "<", "le": "<="}
+    parts = []
+    for f in filters:
+        if f["op"] == "in":
+            parts.append(f"{f['column']} in {list(map(str, f['value']))}")
+        elif f["op"] == "between":
+            parts.append(f"{f['value'][0]} <= {f['column']} <= {f['value'][1]}")
+        elif f["op"] in ("month", "year"):
+            parts.append(f"{f['op']}({f['column']}) == {f['value']}")
+        else:
+            parts.append(f"{f['column']} {symbols[f['op']]} {f['value']}")
+    return " AND ".join(parts)
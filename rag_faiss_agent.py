@@ -1,25 +1,29 @@
 # rag_faiss_agent.py
 
-import os
-import faiss
-import json
-import numpy as np
-from sentence_transformers import SentenceTransformer
 from agents.qa_agent import call_llm  # Reuse cloud/local toggle logic
+from agents.index_registry import index_registry
+from agents.faiss_retriever import get_retriever
+from agents.embedding_service import encode_query
+from agents.query_filters import extract_filters, filter_mask, describe_filters
+from agents.qa_explanations import attach_explanations
+from agents.llm_stream import stream_llm
 
-EMBED_MODEL = "all-MiniLM-L6-v2"
-embedder = SentenceTransformer(EMBED_MODEL)
 
+def retrieve_similar_rows(question, index_path="faiss_index", top_k=5, file_id=None, df=None):
+    # Retrievers stay resident between questions and reload only when the index changes
+    retriever = index_registry.retriever(file_id) if file_id else get_retriever(index_path)
+    query_vector = encode_query(question)
 
-def retrieve_similar_rows(question, index_path="faiss_index", top_k=5):
-    index = faiss.read_index(os.path.join(index_path, "index.faiss"))
-    with open(os.path.join(index_path, "metadata.json"), "r", encoding="utf-8") as f:
-        metadata = json.load(f)
+    # Column predicates in the question ("West region", "in March") narrow the search first
+    row_mask = None
+    if df is not None:
+        filters = extract_filters(df, question)
+        if filters:
+            row_mask = filter_mask(df, filters)
+            print(f"🔎 Pre-filter: {describe_filters(filters)} -> {int(row_mask.sum())} rows")
 
-    query_vector = embedder.encode([question], convert_to_numpy=True)
-    D, I = index.search(query_vector, top_k)
-    results = [metadata[i]["text"] for i in I[0] if i < len(metadata)]
-    return results
+    # Passing the question text enables hybrid (vector + BM25) retrieval
+    return retriever.search(query_vector, top_k, query_text=question, row_mask=row_mask)
 
 
 def generate_rag_prompt(question, retrieved_rows):
@@ -70,8 +74,8 @@ Chain-of-Thought:
 """
 
 
-def run_faiss_rag_agent(question, model_mode="cloud", index_path="faiss_index", top_k=5):
-    retrieved_rows = retrieve_similar_rows(question, index_path, top_k)
+def run_faiss_rag_agent(question, model_mode="cloud", index_path="faiss_index", top_k=5, file_id=None, df=None, explain="eager"):
+    retrieved_rows = retrieve_similar_rows(question, index_path, top_k, file_id=file_id, df=df)
     if not retrieved_rows:
         return {
             "answer": "⚠️ No relevant data rows found.",
@@ -81,18 +85,34 @@ def run_faiss_rag_agent(question, model_mode="cloud", index_path="faiss_index",
         }
 
     prompt = generate_rag_prompt(question, retrieved_rows)
-    answer = call_llm(prompt, model_mode=model_mode, max_new_tokens=300)
+    answer = call_llm(prompt, model_mode=model_mode, max_new_tokens=300, semantic_text=question)
 
+    # Explanation and CoT don't depend on each other: concurrent, deferred or skipped per `explain`
     explanation_prompt = generate_explanation_prompt(question, retrieved_rows, answer)
-    explanation = call_llm(explanation_prompt, model_mode=model_mode, max_new_tokens=300)
-
     cot_prompt = generate_cot_prompt(question, retrieved_rows, answer)
-    cot = call_llm(cot_prompt, model_mode=model_mode, max_new_tokens=300)
-
-    return {
-        "answer": answer,
-        "explanation": explanation,
-        "cot_reasoning": cot,
-        "context_rows": retrieved_rows
-    }
-##  stil lcan t see charts on the display it only downlaods ,erro with summary , no q?a is displayed 
\ No newline at end of file
+    output = {"answer": answer, "context_rows": retrieved_rows}
+    return attach_explanations(output, explanation_prompt, cot_prompt, model_mode, explain)
+
+
+def stream_faiss_rag_agent(question, model_mode="cloud", index_path="faiss_index", top_k=5, file_id=None, df=None, explain="lazy"):
+    """Streaming variant of run_faiss_rag_agent: ("context"), ("token", {"text"})..., then ("done", output)."""
+    retrieved_rows = retrieve_similar_rows(question, index_path, top_k, file_id=file_id, df=df)
+    yield "context", {"context_rows": retrieved_rows}
+    if not retrieved_rows:
+        yield "done", {"answer": "⚠️ No relevant data rows found.", "explanation": "N/A", "cot_reasoning": "N/A", "context_rows": []}
+        return
+
+    pieces = []
+    prompt = generate_rag_prompt(question, retrieved_rows)
+    for piece in stream_llm(prompt, model_mode, max_new_tokens=300):
+        pieces.append(piece)
+        yield "token", {"text": piece}
+    answer = "".join(pieces).strip()
+
+    output = {"answer": answer, "context_rows": retrieved_rows}
+    yield "done", attach_explanations(
+        output,
+        generate_explanation_prompt(question, retrieved_rows, answer),
+        generate_cot_prompt(question, retrieved_rows, answer),
+        model_mode, explain,
+    )
@@ -0,0 +1,49 @@
+# agents/row_serializer.py
+
+"""
+Column-wise serialization of DataFrame rows into "col: val; col: val" texts
+for embedding. Each column is stringified and prefixed once as a whole
+array and null masks are computed once per column, instead of formatting
+every cell inside a row-wise df.apply(..., axis=1).
+"""
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_SEP = "; "
+DEFAULT_BATCH_SIZE = 1024
+
+
+def serialize_rows(df: pd.DataFrame, sep: str = DEFAULT_SEP, skip_na: bool = False) -> list:
+    """
+    Returns one text per row, e.g. "region: West; units: 17".
+
+    skip_na=False renders nulls as "nan" (same as df.astype(str));
+    skip_na=True drops null cells from the text entirely.
+    """
+    if len(df) == 0:
+        return []
+    if len(df.columns) == 0:
+        return [""] * len(df)
+
+    joined = None
+    for col in df.columns:
+        series = df[col]
+        pieces = (f"{col}: " + series.astype(str)).to_numpy(dtype=object)
+        if skip_na:
+            # Every kept piece carries its own separator; the leading one is stripped below
+            pieces = np.where(series.notna().to_numpy(), sep + pieces, "")
+        elif joined is not None:
+            pieces = sep + pieces
+        joined = pieces if joined is None else joined + pieces
+
+    if skip_na:
+        return [text[len(sep):] for text in joined]
+    return joined.tolist()
+
+
+def iter_row_text_batches(df: pd.DataFrame, batch_size: int = DEFAULT_BATCH_SIZE,
+                          sep: str = DEFAULT_SEP, skip_na: bool = False):
+    """Yields (start_row, texts) batches so texts can be fed to the encoder without materializing them all."""
+    for start in range(0, len(df), batch_size):
+        yield start, serialize_rows(df.iloc[start:start + batch_size], sep=sep, skip_na=skip_na)
@@ -0,0 +1,141 @@
+# agents/row_store.py
+
+"""
+Compact random-access store for the row texts behind a FAISS index.
+
+    rows.bin  -> UTF-8 row texts concatenated back to back
+    rows.idx  -> .npy array of n + 1 uint64 byte offsets into rows.bin
+
+Both files are memory-mapped, so fetching the top-k rows of a search costs
+k slices instead of parsing a pretty-printed metadata.json of every row.
+"""
+
+import os
+import json
+import mmap
+import shutil
+import numpy as np
+
+DATA_FILE = "rows.bin"
+OFFSETS_FILE = "rows.idx"
+LEGACY_METADATA_FILE = "metadata.json"
+
+
+class RowStoreWriter:
+    """
+    Streams row texts into index_dir batch by batch; the offsets file is
+    written on close. append=True continues an existing store, so new rows
+    get ids len(store), len(store) + 1, ... Use as a context manager.
+
+    Both files are written to temporary names and swapped in with os.replace
+    on close, so readers that have the old files memory-mapped never see
+    them truncated or rewritten under them.
+    """
+
+    def __init__(self, index_dir: str, append: bool = False):
+        self.index_dir = index_dir
+        self._data_path = os.path.join(index_dir, DATA_FILE)
+        self._offsets_path = os.path.join(index_dir, OFFSETS_FILE)
+        self._data_tmp = f"{self._data_path}.{os.getpid()}.tmp"
+        self._offsets_tmp = f"{self._offsets_path}.{os.getpid()}.tmp"
+        if append and os.path.exists(self._offsets_path):
+            existing = np.load(self._offsets_path)
+            self._offsets = [existing]
+            self._position = int(existing[-1])
+            shutil.copyfile(self._data_path, self._data_tmp)
+            self._data = open(self._data_tmp, "ab")
+        else:
+            self._offsets = [np.zeros(1, dtype=np.uint64)]
+            self._position = 0
+            self._data = open(self._data_tmp, "wb")
+
+    def append(self, texts):
+        encoded = [text.encode("utf-8") for text in texts]
+        self._data.write(b"".join(encoded))
+        lengths = np.fromiter((len(e) for e in encoded), dtype=np.uint64, count=len(encoded))
+        self._offsets.append(self._position + np.cumsum(lengths, dtype=np.uint64))
+        self._position += int(lengths.sum())
+
+    def close(self):
+        self._data.close()
+        # np.save appends .npy to bare names, so write through a file handle
+        with open(self._offsets_tmp, "wb") as f:
+            np.save(f, np.concatenate(self._offsets))
+        # Data first: readers open the store when rows.idx changes
+        os.replace(self._data_tmp, self._data_path)
+        os.replace(self._offsets_tmp, self._offsets_path)
+
+    def abort(self):
+        """Drops everything written since the writer was opened; the existing store is untouched."""
+        self._data.close()
+        for path in (self._data_tmp, self._offsets_tmp):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_row_store(index_dir: str, texts: list):
+    """Writes row texts to index_dir in the offset-indexed binary format."""
+    with RowStoreWriter(index_dir) as writer:
+        writer.append(texts)
+
+
+class RowStore:
+    """Read-only view over rows.bin / rows.idx."""
+
+    def __init__(self, index_dir: str):
+        self.index_dir = index_dir
+        self._offsets = np.load(os.path.join(index_dir, OFFSETS_FILE), mmap_mode="r")
+        with open(os.path.join(index_dir, DATA_FILE), "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            # mmap refuses zero-length files
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, row_id: int) -> str:
+        start, end = int(self._offsets[row_id]), int(self._offsets[row_id + 1])
+        return self._data[start:end].decode("utf-8")
+
+    def get_many(self, row_ids) -> list:
+        """Returns the texts for valid ids, silently skipping out-of-range ones (e.g. FAISS -1)."""
+        return [self[int(i)] for i in row_ids if 0 <= i < len(self)]
+
+
+class LegacyJsonRows:
+    """Adapter for indexes built before rows.bin existed (metadata.json list of {"text": ...})."""
+
+    def __init__(self, index_dir: str):
+        with open(os.path.join(index_dir, LEGACY_METADATA_FILE), "r", encoding="utf-8") as f:
+            self._rows = json.load(f)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __getitem__(self, row_id: int) -> str:
+        return self._rows[row_id]["text"]
+
+    def get_many(self, row_ids) -> list:
+        return [self[int(i)] for i in row_ids if 0 <= i < len(self)]
+
+
+def row_store_file(index_dir: str) -> str:
+    """Returns the file that versions the row texts of an index dir."""
+    if os.path.exists(os.path.join(index_dir, OFFSETS_FILE)):
+        return OFFSETS_FILE
+    return LEGACY_METADATA_FILE
+
+
+def open_row_store(index_dir: str):
+    if row_store_file(index_dir) == OFFSETS_FILE:
+        return RowStore(index_dir)
+    return LegacyJsonRows(index_dir)
@@ -5,50 +5,63 @@ from colorama import Fore, Style, init
 from agents.memory_logger import load_recent_sessions
 from agents.proactive_agent import detect_proactive_signals
 from agents.llm_utils import call_llm_model
+from agents.llm_stream import stream_llm
+from agents.prompt_budget import PromptBuilder, budget_for, counter_for
+from agents.dataset_profile import get_profile
 
 init(autoreset=True)
 
 # ---------------------- Helper: Stats Formatter ----------------------
 
-def format_stats_for_llm(df: pd.DataFrame) -> str:
-    lines = [f"Total Rows: {len(df)}", "\nColumn Types:"]
-    for col in df.columns:
-        lines.append(f" - {col}: {df[col].dtype}")
-    missing = df.isnull().sum()
-    missing = missing[missing > 0]
+def _stats_sections(df: pd.DataFrame) -> dict:
+    """Dataset facts for the prompt, split so each part can get its own token budget."""
+    profile = get_profile(df)
+    lines = [f"Total Rows: {profile.n_rows}", "\nColumn Types:"]
+    for col, dtype in profile.dtypes.items():
+        lines.append(f" - {col}: {dtype}")
+    missing = profile.null_counts[profile.null_counts > 0]
     if not missing.empty:
         lines.append("\nMissing Values:")
         for col, count in missing.items():
-            lines.append(f"  - {col}: {count} ({count/len(df)*100:.1f}%)")
+            lines.append(f"  - {col}: {count} ({count/profile.n_rows*100:.1f}%)")
     else:
         lines.append("\nNo Missing Values")
+    overview = "\n".join(lines)
 
-    numeric_df = df.select_dtypes(include='number')
-    if not numeric_df.empty:
-        summary_df = numeric_df.describe().loc[["mean", "std", "min", "max"]].round(2)
-        lines.append("\nKey Stats:\n")
+    if profile.numeric_columns:
+        summary_df = profile.describe.loc[["mean", "std", "min", "max"]].round(2)
+        lines = ["Key Stats:\n"]
         for col in summary_df.columns:
             lines.append(f"• {col}: Mean={summary_df[col]['mean']}, Std={summary_df[col]['std']}, "
                          f"Min={summary_df[col]['min']}, Max={summary_df[col]['max']}")
     else:
-        lines.append("\n⚠️ No numeric columns found.")
-
-    categorical_cols = df.select_dtypes(include=['object', 'category'])
-    if not categorical_cols.empty:
-        lines.append("\nTop Categories:")
-        for col in categorical_cols.columns[:3]:
-            top_vals = df[col].value_counts().head(5)
+        lines = ["⚠️ No numeric columns found."]
+    key_stats = "\n".join(lines)
+
+    lines = []
+    if profile.categorical_columns:
+        lines.append("Top Categories:")
+        for col in profile.categorical_columns[:3]:
+            top_vals = profile.top_values(col, 5)
             lines.append(f"  {col}")
             for val, cnt in top_vals.items():
                 lines.append(f"   {val}: {cnt}")
-    return "\n".join(lines)
+    return {"overview": overview, "key_stats": key_stats, "top_categories": "\n".join(lines)}
 
-# ---------------------- Main Summary Generator ----------------------
-
-def generate_summary_from_df(df: pd.DataFrame, domain: str = "auto", output_dir="outputs", model_mode="local") -> str:
-    if df.empty:
-        return "⚠️ DataFrame is empty."
 
+def format_stats_for_llm(df: pd.DataFrame) -> str:
+    return "\n\n".join(text for text in _stats_sections(df).values() if text)
+
+# ---------------------- Prompt Builder ----------------------
+
+def build_summary_prompt(df: pd.DataFrame, domain: str = "auto", model_mode: str = "cloud",
+                         custom_prompt: str = None, goal: str = None) -> str:
+    """
+    Builds the summary prompt within the token budget of model_mode. The
+    instructions are always kept; key stats, alerts, the column overview,
+    top categories and past-session memory are trimmed (in that priority) to fit.
+    custom_prompt replaces the default 4-section brief (SWOT, financial, ...).
+    """
     def infer_domain(df):
         domain_keywords = {
             "finance": ["revenue", "profit", "cost", "margin"],
@@ -87,8 +100,11 @@ def generate_summary_from_df(df: pd.DataFrame, domain: str = "auto", output_dir=
     else:
         memory_snippet = "No prior sessions found."
 
-    prompt = f"""
-{role_map.get(domain, role_map['general'])}
+    role = role_map.get(domain, role_map['general'])
+    if custom_prompt:
+        instructions = f"{role}\n\n{custom_prompt}"
+    else:
+        instructions = f"""{role}
 
 You are preparing a business intelligence summary for executives.  
 Write the output in exactly **4 sections** with the following structure and rules:
@@ -110,42 +126,76 @@ Write the output in exactly **4 sections** with the following structure and rule
 **4. Recommended Actions**  
 - 3–5 specific, actionable steps directly tied to KPIs/trends.  
 - Include measurable targets where possible (e.g., "Increase electronics SKUs by 15%" instead of "expand electronics offerings").  
-- Keep them in parallel, action-oriented format.
-
----
-
-📁 Context from past sessions:
-{memory_snippet}
-
-📊 Dataset Summary:
-{format_stats_for_llm(df)}
-
-🚨 Proactive Alerts:
-{detect_proactive_signals(df)}
+- Keep them in parallel, action-oriented format."""
+    if goal and goal != "auto":
+        instructions += f"\n\n🎯 Analysis goal: {goal}"
+
+    budget = budget_for(model_mode)
+    stats = _stats_sections(df)
+    builder = PromptBuilder(budget, label="summary", count=counter_for(model_mode))
+    builder.add("instructions", instructions + "\n\n---", required=True)
+    builder.add("memory", f"📁 Context from past sessions:\n{memory_snippet}", priority=5, max_tokens=budget // 10)
+    builder.add("overview", f"📊 Dataset Summary:\n{stats['overview']}", priority=3, max_tokens=budget // 4)
+    builder.add("key_stats", stats["key_stats"], priority=1, max_tokens=budget * 3 // 10)
+    builder.add("top_categories", stats["top_categories"], priority=4, max_tokens=budget // 10)
+    builder.add("alerts", f"🚨 Proactive Alerts:\n{detect_proactive_signals(df)}", priority=2, max_tokens=budget // 5)
+    closing = "Now, generate the output." if custom_prompt else "Now, generate the output strictly following the above structure."
+    builder.add("closing", closing, required=True)
+    return builder.build()
+
+
+def save_summary(final_output: str, output_dir="outputs") -> str:
+    os.makedirs(output_dir, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H%M")
+    out_path = os.path.join(output_dir, f"insight_summary_{timestamp}.txt")
+    with open(out_path, "w", encoding="utf-8") as f:
+        f.write(final_output)
+    print(Fore.GREEN + f"✅ Summary saved to: {out_path}\n" + Style.RESET_ALL)
+    return out_path
 
-Now, generate the output strictly following the above structure.
-"""
+# ---------------------- Main Summary Generator ----------------------
 
+def generate_summary_from_df(df: pd.DataFrame, domain: str = "auto", output_dir="outputs", model_mode="local",
+                             custom_prompt: str = None, goal: str = None) -> str:
+    if df.empty:
+        return "⚠️ DataFrame is empty."
 
+    prompt = build_summary_prompt(df, domain, model_mode, custom_prompt, goal)
     print(Fore.BLUE + "\nPrompt Sent to LLM:\n" + prompt[:600] + "..." + Style.RESET_ALL)
 
-    output = call_llm_model(prompt, model_name=model_mode)
+    output = call_llm_model(prompt, model_name=model_mode, cache_endpoint="summary")
 
     final_output = output.split("summary:")[-1].strip() if "summary:" in output.lower() else output.strip()
 
     if len(final_output) < 100:
         print(Fore.YELLOW + "⚠️ Short output — retrying..." + Style.RESET_ALL)
         prompt += "\nPlease expand with more detailed KPIs, trends, and actions."
-        output = call_llm_model(prompt, model_name=model_mode)
+        output = call_llm_model(prompt, model_name=model_mode, cache_endpoint="summary")
         final_output = output.split("summary:")[-1].strip()
 
-    os.makedirs(output_dir, exist_ok=True)
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H%M")
-    out_path = os.path.join(output_dir, f"insight_summary_{timestamp}.txt")
-    with open(out_path, "w", encoding="utf-8") as f:
-        f.write(final_output)
-
-    print(Fore.GREEN + f"✅ Summary saved to: {out_path}\n" + Style.RESET_ALL)
+    save_summary(final_output, output_dir)
     print(final_output)
 
     return final_output
+
+
+def stream_summary_from_df(df: pd.DataFrame, domain: str = "auto", output_dir="outputs", model_mode="local",
+                           custom_prompt: str = None, goal: str = None):
+    """
+    Streaming variant of generate_summary_from_df. Yields ("token", {"text"})
+    events as the model generates, then ("done", {"summary"}) once saved.
+    """
+    if df.empty:
+        yield "done", {"summary": "⚠️ DataFrame is empty."}
+        return
+
+    prompt = build_summary_prompt(df, domain, model_mode, custom_prompt, goal)
+    pieces = []
+    for piece in stream_llm(prompt, model_mode, do_sample=False):
+        pieces.append(piece)
+        yield "token", {"text": piece}
+
+    output = "".join(pieces)
+    final_output = output.split("summary:")[-1].strip() if "summary:" in output.lower() else output.strip()
+    save_summary(final_output, output_dir)
+    yield "done", {"summary": final_output}
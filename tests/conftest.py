@@ -0,0 +1,90 @@
+import os
+import sys
+import types
+import importlib
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    """
+    TestClient for fastapp backed by a dataset store in tmp_path. The
+    background FAISS build is replaced by a no-op so uploads do not load an
+    embedding model.
+    """
+    from fastapi.testclient import TestClient
+    from agents.dataset_store import DatasetStore
+
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("outputs", exist_ok=True)
+    fastapp = importlib.import_module("fastapp")
+    store = DatasetStore(data_dir=str(tmp_path / "data_store"))
+    monkeypatch.setattr(fastapp, "dataset_store", store)
+    monkeypatch.setattr(fastapp, "start_index_build", lambda file_id, *args, **kwargs: {"status": "skipped"})
+    with TestClient(fastapp.app) as client:
+        client.store = store
+        yield client
+
+
+@pytest.fixture
+def upload(api):
+    """Uploads CSV text through /api/upload and returns the file_id."""
+    def _upload(csv_text: str, filename: str = "data.csv") -> str:
+        response = api.post("/api/upload", files={"file": (filename, csv_text.encode("utf-8"), "text/csv")})
+        assert response.status_code == 200, response.text
+        return response.json()["file_id"]
+    return _upload
+
+
+class FakeSentenceTransformer:
+    """Stands in for the embedding model: 2-dim vectors from the text length."""
+    loads = 0
+
+    def __init__(self, name):
+        FakeSentenceTransformer.loads += 1
+        self.encoded = []
+
+    def encode(self, texts, batch_size=None, convert_to_numpy=True, show_progress_bar=False):
+        self.encoded.extend(texts)
+        return np.array([[len(text), 1.0] for text in texts], dtype="float32")
+
+
+class FakeLocalBackend:
+    """Local LLM backend that upper-cases prompts and records the batches it ran."""
+    name = "fake"
+
+    def __init__(self, model_path=None):
+        self.model_path = model_path
+        self.loads = 0
+        self.batches = []
+
+    def load(self):
+        self.loads += 1
+
+    def generate(self, prompt, max_new_tokens=200, **kwargs):
+        return prompt.upper()
+
+    def generate_batch(self, prompts, max_new_tokens, **kwargs):
+        self.batches.append(list(prompts))
+        return [(prompt.upper(), len(prompt)) for prompt in prompts]
+
+    def stream(self, prompt, max_new_tokens=200, **kwargs):
+        yield from prompt.upper()
+
+
+@pytest.fixture
+def fake_embedder(monkeypatch):
+    """
+    Replaces sentence_transformers with FakeSentenceTransformer and disables
+    the embedding cache. Returns a callable giving the loaded fake model.
+    """
+    import agents.embedding_service as embedding_service
+
+    FakeSentenceTransformer.loads = 0
+    monkeypatch.setitem(sys.modules, "sentence_transformers",
+                        types.SimpleNamespace(SentenceTransformer=FakeSentenceTransformer))
+    monkeypatch.setattr(embedding_service, "_model", None)
+    monkeypatch.setattr(embedding_service, "get_embedding_cache", lambda model_name: None)
+    return embedding_service.get_embedder
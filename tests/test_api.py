@@ -0,0 +1,29 @@
+import os
+
+SALES_CSV = (
+    "order_date,region,units,revenue\n"
+    "2024-01-05,north,3,120.5\n"
+    "2024-01-06,south,5,200.0\n"
+    "2024-02-10,north,2,80.0\n"
+    "2024-02-11,east,7,310.25\n"
+)
+
+
+def test_eda_on_csv_with_date_column(api, upload):
+    file_id = upload(SALES_CSV)
+
+    response = api.post("/api/eda", params={"file_id": file_id})
+    assert response.status_code == 200, response.text
+    counts = response.json()["eda_result"]["categorical_value_counts"]
+    assert counts["order_date"]["2024-01-05"] == 1
+    assert counts["region"]["north"] == 2
+
+
+def test_upload_returns_before_indexing_and_cleans_spool_files(api, upload):
+    response = api.post("/api/upload", files={"file": ("data.txt", b"not a dataset", "text/plain")})
+    assert response.status_code == 400
+
+    file_id = upload(SALES_CSV)
+    assert api.store.stats()["datasets_in_memory"] == 0  # nothing decoded yet
+    assert not [name for name in os.listdir(api.store.data_dir) if ".upload" in name]
+    assert api.post("/api/kpis", params={"file_id": file_id}).status_code == 200
@@ -0,0 +1,82 @@
+import time
+
+import pandas as pd
+
+from agents.index_manifest import load_manifest
+from agents.lexical_index import LexicalIndex
+from agents.row_store import open_row_store
+
+import agents.build_faiss_index as build_module
+from agents.dataset_store import DatasetStore
+
+
+def _wait_for_status(file_id, expected, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while build_module.get_index_status(file_id)["status"] != expected:
+        assert time.monotonic() < deadline, build_module.get_index_status(file_id)
+        time.sleep(0.01)
+
+
+def test_background_build_loads_dataset_and_reports_progress(tmp_path, monkeypatch):
+    store = DatasetStore(data_dir=str(tmp_path))
+    store.put("sales", pd.DataFrame({"region": ["north", "south"], "units": [3, 5]}), "sales.csv")
+    monkeypatch.setattr(build_module, "dataset_store", store)
+
+    calls = []
+
+    def fake_build(file_id, df, content_hash=None, progress_callback=None):
+        calls.append((file_id, len(df), content_hash))
+        progress_callback(0.5)
+
+    monkeypatch.setattr(build_module, "build_registered_index", fake_build)
+
+    status = build_module.start_index_build("sales", content_hash="abc123")
+    assert status["status"] in ("queued", "building", "ready")
+    _wait_for_status("sales", "ready")
+    assert calls == [("sales", 2, "abc123")]
+    assert build_module.get_index_status("sales")["progress"] == 1.0
+
+
+def test_background_build_failure_is_reported(tmp_path, monkeypatch):
+    monkeypatch.setattr(build_module, "dataset_store", DatasetStore(data_dir=str(tmp_path)))
+
+    build_module.start_index_build("unknown-file")
+    _wait_for_status("unknown-file", "failed")
+
+
+def _sales(n):
+    return pd.DataFrame({"order": [f"ORD-{i:04d}" for i in range(n)], "units": range(n)})
+
+
+def test_update_embeds_and_tokenizes_only_new_rows(tmp_path, fake_embedder):
+    index_dir = str(tmp_path)
+    build_module.build_faiss_index(_sales(10), index_dir)
+    model = fake_embedder()
+    model.encoded.clear()
+
+    changed = pd.concat([_sales(10).drop(index=[3]), _sales(11).tail(1)], ignore_index=True)
+    build_module.update_faiss_index(changed, index_dir)
+
+    assert model.encoded == ["order: ORD-0010; units: 10"]
+    _, ids, next_id = load_manifest(index_dir)
+    assert next_id == 11
+    assert 3 not in ids.tolist() and ids.tolist()[-1] == 10
+    lexical = LexicalIndex(index_dir)
+    assert lexical.n_docs == 10
+    assert lexical.search("ord-0010", top_k=1) == [10]
+    assert 3 not in lexical.search("ord-0003", top_k=11)
+
+
+def test_update_compacts_once_removed_rows_pile_up(tmp_path, fake_embedder, monkeypatch):
+    monkeypatch.setattr(build_module, "COMPACT_FRACTION", 0.3)
+    index_dir = str(tmp_path)
+    build_module.build_faiss_index(_sales(10), index_dir)
+
+    build_module.update_faiss_index(_sales(8), index_dir)  # 2 of 10 ids dead: kept as tombstones
+    assert load_manifest(index_dir)[2] == 10
+    assert len(open_row_store(index_dir)) == 10
+
+    build_module.update_faiss_index(_sales(6), index_dir)  # 4 of 10 dead: rebuilt
+    _, ids, next_id = load_manifest(index_dir)
+    assert next_id == 6 and ids.tolist() == list(range(6))
+    assert open_row_store(index_dir).get_many(range(6)) == [f"order: ORD-{i:04d}; units: {i}" for i in range(6)]
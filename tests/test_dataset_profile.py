@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import agents.dataset_profile as dataset_profile
+from agents.dataset_profile import get_profile, set_content_hash, version_key
+from agents.dataset_store import DatasetStore
+
+
+@pytest.fixture
+def sales():
+    return pd.DataFrame({
+        "region": ["north", "south", None, "north"],
+        "units": [3.0, np.nan, 5.0, 7.0],
+        "price": [1.5, 2.5, 3.5, 4.5],
+    })
+
+
+@pytest.mark.parametrize("derive", [
+    lambda df: df.copy(),
+    lambda df: df.fillna({"units": 0.0, "region": "unknown"}),
+    lambda df: df.astype({"units": "float32"}),
+    lambda df: df.assign(price=df["price"] * 2),
+])
+def test_derived_frames_do_not_inherit_the_stored_content_hash(sales, derive):
+    set_content_hash(sales, "upload-hash")
+    derived = derive(sales)
+
+    assert version_key(sales)[0] == "upload-hash"
+    assert version_key(derived)[0] != "upload-hash"
+    assert version_key(derived) == version_key(derive(sales.copy()))
+
+
+def test_store_views_share_a_profile_until_values_change(tmp_path, sales, monkeypatch):
+    monkeypatch.setattr(dataset_profile, "_profiles", type(dataset_profile._profiles)())
+    store = DatasetStore(data_dir=str(tmp_path), budget_bytes=10**9)
+    store.put("sales", sales, "sales.csv", content_hash="upload-hash")
+
+    view = store.get("sales")
+    assert version_key(view)[0] == "upload-hash"
+    profile = get_profile(view)
+    assert get_profile(store.get("sales")) is profile
+
+    filled = store.get("sales").fillna({"units": 0.0})
+    assert get_profile(filled) is not profile
+    assert get_profile(filled).null_counts["units"] == 0
+    assert profile.null_counts["units"] == 1
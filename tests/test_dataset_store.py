@@ -0,0 +1,118 @@
+import json
+from io import StringIO
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from agents.dataset_store import DatasetStore, optimize_dtypes
+
+
+@pytest.fixture
+def store(tmp_path):
+    return DatasetStore(data_dir=str(tmp_path), budget_bytes=10**9)
+
+
+def test_optimize_dtypes_keeps_int32_floor_and_strings():
+    df = pd.DataFrame({
+        "units": np.array([1, 2, 3], dtype=np.int64),
+        "big": np.array([1, 2, 2**40], dtype=np.int64),
+        "region": ["north", "north", "south"],
+        "price": [1.5, 2.5, 3.5],
+    })
+    out = optimize_dtypes(df)
+    assert out["units"].dtype == np.int32
+    assert out["big"].dtype == np.int64
+    assert out["region"].dtype == object
+    assert out["price"].dtype == np.float64
+
+
+def test_optimize_dtypes_leaves_the_input_frame_alone():
+    df = pd.DataFrame({"units": np.arange(5, dtype=np.int64), "price": np.linspace(1, 2, 5)})
+    out = optimize_dtypes(df)
+
+    assert out["units"].dtype == np.int32 and df["units"].dtype == np.int64
+    assert np.shares_memory(out["price"].to_numpy(), df["price"].to_numpy())  # untouched columns are not copied
+
+
+def test_reloaded_dataset_keeps_its_values_and_dtypes(store):
+    df = pd.DataFrame({
+        "units": np.arange(4, dtype=np.int64),
+        "price": [1.5, None, 3.5, 4.5],
+        "region": ["north", None, "south", "north"],
+    })
+    store.put("sales", df, "sales.csv")
+    store._entries.clear()
+
+    reloaded = store.get("sales")
+    assert reloaded["units"].dtype == np.int32
+    pd.testing.assert_frame_equal(reloaded, optimize_dtypes(df))
+
+
+def test_evicted_dataset_reloads_from_disk(tmp_path):
+    df = pd.DataFrame({"a": range(1000), "b": ["x"] * 1000})
+    store = DatasetStore(data_dir=str(tmp_path), budget_bytes=1)
+    store.put("first", df, "first.csv")
+    store.put("second", df, "second.csv")
+
+    assert "first" in store  # evicted from memory, still on disk
+    reloaded = store.get("first")
+    pd.testing.assert_frame_equal(reloaded, store.get("second"))
+    assert reloaded["a"].tolist() == list(range(1000))
+
+
+def test_put_accepts_mixed_type_object_columns(store):
+    df = pd.DataFrame({"score": [1, "N/A", 3, None], "name": ["a", "b", "c", "d"]})
+    store.put("mixed", df, "mixed.xlsx")
+
+    store._entries.clear()  # force the reload from the Feather file
+    reloaded = store.get("mixed")
+    assert reloaded["score"].tolist()[:3] == ["1", "N/A", "3"]
+    assert pd.isna(reloaded["score"].iloc[3])
+    assert reloaded["name"].tolist() == ["a", "b", "c", "d"]
+
+
+def _ingest_csv(store, tmp_path, file_id, text):
+    raw_path = tmp_path / f"{file_id}.upload.csv"
+    raw_path.write_text(text)
+    info = store.ingest_file(file_id, str(raw_path), "data.csv")
+    assert not raw_path.exists()
+    return info
+
+
+def test_streamed_csv_keeps_dates_as_text_and_matches_pandas_dtypes(store, tmp_path):
+    text = "day,units,region\n2024-01-05,3,north\n2024-01-06,5,south\n"
+    info = _ingest_csv(store, tmp_path, "streamed", text)
+    assert info["shape"] == [2, 3]
+    assert info["preview"][0]["day"] == "2024-01-05"
+
+    streamed = store.get("streamed")
+    store.put("parsed", pd.read_csv(StringIO(text)), "data.csv")
+    parsed = store.get("parsed")
+    assert streamed["day"].tolist() == ["2024-01-05", "2024-01-06"]
+    assert streamed.dtypes.to_dict() == parsed.dtypes.to_dict()
+
+
+def test_get_unknown_file_id_raises_key_error(store):
+    with pytest.raises(KeyError):
+        store.get("missing")
+    with pytest.raises(KeyError):
+        store.get("../etc/passwd")
+
+
+def test_reference_is_small_and_resolves_while_the_schema_matches(store):
+    df = pd.DataFrame({"region": ["north", "south"] * 50, "units": range(100)})
+    store.put("sales", df, "sales.csv")
+
+    reference = store.reference("sales", sample_rows=3)
+    assert json.loads(json.dumps(reference)) == reference
+    assert reference["filename"] == "sales.csv"
+    assert reference["shape"] == [100, 2]
+    assert reference["sample"][2] == {"region": "north", "units": 2}
+    assert store.resolve_reference(reference, n_rows=5)["units"].tolist() == [0, 1, 2, 3, 4]
+
+    # Replaced with another schema, then deleted: the embedded sample is used
+    store.put("sales", df.assign(units=df["units"].astype(float)), "sales.csv")
+    assert len(store.resolve_reference(reference, n_rows=5)) == 3
+    store.delete("sales")
+    assert store.resolve_reference(reference)["region"].tolist() == ["north", "south", "north"]
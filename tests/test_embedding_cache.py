@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from agents.embedding_cache import EmbeddingCache
+
+
+def _vectors(keys):
+    return np.stack([np.full(4, float(key), dtype=np.float32) for key in keys])
+
+
+def _reopen(cache):
+    # Dropping the lock without flush() stands in for a crashed process
+    cache._lock_file.close()
+    return EmbeddingCache(cache.cache_dir, max_entries=cache.capacity, dtype="float32")
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return EmbeddingCache(str(tmp_path), max_entries=10, dtype="float32")
+
+
+def test_flushed_cache_survives_reopen(cache):
+    keys = np.arange(1, 6, dtype=np.uint64)
+    cache.put_many(keys, _vectors(keys))
+    cache.flush()
+
+    vectors, missing = _reopen(cache).get_many(keys)
+    assert len(missing) == 0
+    np.testing.assert_array_equal(vectors, _vectors(keys))
+
+
+def test_reused_slots_never_return_another_texts_vector_after_a_crash(cache):
+    old_keys = np.arange(1, 11, dtype=np.uint64)
+    cache.put_many(old_keys, _vectors(old_keys))
+    cache.flush()
+    cache.get_many(old_keys[5:])  # keys 1-5 become least recently used
+
+    new_keys = np.arange(101, 106, dtype=np.uint64)
+    cache.put_many(new_keys, _vectors(new_keys))  # evicts and overwrites the slots of keys 1-5
+
+    all_keys = np.concatenate([old_keys, new_keys])
+    vectors, missing = _reopen(cache).get_many(all_keys)
+    hit = np.setdiff1d(np.arange(len(all_keys)), missing)
+    np.testing.assert_array_equal(vectors[hit], _vectors(all_keys[hit]))
+    assert set(all_keys[hit].tolist()) >= set(old_keys[5:].tolist())
@@ -0,0 +1,37 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import agents.embedding_service as embedding_service
+from agents.embedding_cache import EmbeddingCache
+from conftest import FakeSentenceTransformer
+
+
+def test_model_is_loaded_once_and_shared(fake_embedder):
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        models = list(pool.map(lambda _: fake_embedder(), range(16)))
+
+    assert FakeSentenceTransformer.loads == 1
+    assert all(model is models[0] for model in models)
+    np.testing.assert_array_equal(embedding_service.encode(["abc"]), [[3.0, 1.0]])
+
+
+def test_concurrent_queries_each_get_their_own_vector(fake_embedder):
+    texts = ["a" * n for n in range(1, 9)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        vectors = list(pool.map(embedding_service.encode_query, texts))
+
+    assert [v.shape for v in vectors] == [(1, 2)] * len(texts)
+    assert [float(v[0, 0]) for v in vectors] == [float(len(t)) for t in texts]
+
+
+def test_encode_cached_only_embeds_unseen_texts(fake_embedder, tmp_path, monkeypatch):
+    cache = EmbeddingCache(str(tmp_path), max_entries=100, dtype="float32")
+    monkeypatch.setattr(embedding_service, "get_embedding_cache", lambda model_name: cache)
+
+    first = embedding_service.encode_cached(["a: 1", "a: 22"])
+    second = embedding_service.encode_cached(["a: 22", "a: 333"])
+
+    assert fake_embedder().encoded == ["a: 1", "a: 22", "a: 333"]
+    np.testing.assert_array_equal(second[0], first[1])
+    np.testing.assert_array_equal(second[1], [6.0, 1.0])
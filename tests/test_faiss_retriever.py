@@ -0,0 +1,51 @@
+import os
+
+import faiss
+import numpy as np
+
+from agents.faiss_retriever import FaissRetriever, INDEX_FILE
+from agents.row_store import write_row_store, OFFSETS_FILE
+
+
+def _write_index(index_dir, vectors, texts):
+    index = faiss.IndexFlatL2(vectors.shape[1])
+    index.add(vectors)
+    faiss.write_index(index, os.path.join(index_dir, INDEX_FILE))
+    write_row_store(index_dir, texts)
+
+
+def _touch_later(index_dir, *names):
+    # Some filesystems keep coarse mtimes; make the rewrite visible to refresh()
+    for name in names:
+        path = os.path.join(index_dir, name)
+        later = os.stat(path).st_mtime_ns + 10**9
+        os.utime(path, ns=(later, later))
+
+
+def test_retriever_keeps_index_resident_until_files_change(tmp_path):
+    index_dir = str(tmp_path)
+    points = np.array([[0, 0], [1, 0], [3, 0]], dtype="float32")
+    _write_index(index_dir, points, ["a", "b", "c"])
+
+    retriever = FaissRetriever(index_dir, mmap=False)
+    assert retriever.search(np.array([[1.1, 0]], dtype="float32"), top_k=1) == ["b"]
+    loaded = retriever.index
+    retriever.refresh(force=True)
+    assert retriever.index is loaded
+
+    _write_index(index_dir, np.vstack([points, [[10, 0]]]).astype("float32"), ["a", "b", "c", "d"])
+    _touch_later(index_dir, INDEX_FILE, OFFSETS_FILE)
+    retriever.refresh(force=True)
+    assert retriever.index.ntotal == 4
+    assert retriever.search(np.array([[9, 0]], dtype="float32"), top_k=1) == ["d"]
+
+
+def test_row_mask_limits_search_to_matching_rows(tmp_path):
+    index_dir = str(tmp_path)
+    _write_index(index_dir, np.array([[0, 0], [1, 0], [3, 0]], dtype="float32"), ["a", "b", "c"])
+    retriever = FaissRetriever(index_dir, mmap=False)
+
+    query = np.array([[1.2, 0]], dtype="float32")
+    assert retriever.search(query, top_k=1, row_mask=[True, False, True]) == ["a"]
+    # A mask that doesn't line up with the index falls back to the full search
+    assert retriever.search(query, top_k=1, row_mask=[True, False]) == ["b"]
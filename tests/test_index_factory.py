@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from agents.index_factory import (
+    FLAT_MAX_ROWS, HNSW_MAX_ROWS, IVF_FLAT_MAX_ROWS, apply_search_params, choose_index_type, create_index,
+    factory_string, selector_search_params, supports_removal, train_index,
+)
+
+
+@pytest.mark.parametrize("n_rows, expected", [
+    (1_000, "flat"),
+    (FLAT_MAX_ROWS + 1, "hnsw"),
+    (HNSW_MAX_ROWS + 1, "ivf_flat"),
+    (IVF_FLAT_MAX_ROWS + 1, "ivf_pq"),
+])
+def test_auto_picks_index_type_by_row_count(n_rows, expected):
+    assert choose_index_type(n_rows, "auto") == expected
+
+
+def test_unknown_index_type_is_rejected():
+    with pytest.raises(ValueError):
+        choose_index_type(10, "annoy")
+
+
+def test_pq_codes_split_minilm_vectors_into_8_dim_subvectors():
+    assert factory_string(384, 10_000_000, "ivf_pq").endswith(",PQ48x8")
+    assert factory_string(384, 10, "hnsw") == "HNSW32"
+
+
+def test_ivf_index_filters_by_id_and_supports_removal():
+    rng = np.random.default_rng(0)
+    vectors = rng.random((2_000, 8), dtype=np.float32)
+    index = create_index(8, len(vectors), "ivf_flat", with_ids=True)
+    train_index(index, vectors)
+    ids = np.arange(len(vectors), dtype=np.int64) * 10
+    index.add_with_ids(vectors, ids)
+    apply_search_params(index)
+
+    params = selector_search_params(index, np.array([50, 70], dtype=np.int64))
+    _, found = index.search(vectors[5:6], 1, params=params)
+    assert found[0].tolist() == [50]
+    assert supports_removal(index)
+    assert not supports_removal(create_index(8, 10, "hnsw", with_ids=True))
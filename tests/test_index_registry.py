@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+from agents.index_registry import IndexRegistry, KEEP_VERSIONS
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return IndexRegistry(root=str(tmp_path / "faiss_index"))
+
+
+def _publish(registry, content_hash, marker):
+    staging_dir = registry.staging_dir(content_hash)
+    with open(os.path.join(staging_dir, "marker.txt"), "w", encoding="utf-8") as f:
+        f.write(marker)
+    return registry.publish(content_hash, staging_dir)
+
+
+def test_uploads_with_the_same_content_share_one_index(registry):
+    assert registry.index_dir("upload-a") is None
+
+    path = _publish(registry, "hash1", "v1")
+    registry.register("upload-a", "hash1")
+    registry.register("upload-b", "hash1")
+
+    assert registry.content_hash_for("upload-a") == "hash1"
+    assert registry.index_dir("upload-a") == registry.index_dir("upload-b") == path
+
+
+def test_publish_swaps_current_version_and_prunes_old_ones(registry):
+    paths = [_publish(registry, "hash1", f"v{i}") for i in range(KEEP_VERSIONS + 2)]
+
+    assert registry.current_dir("hash1") == paths[-1]
+    with open(os.path.join(paths[-1], "marker.txt"), encoding="utf-8") as f:
+        assert f.read() == f"v{KEEP_VERSIONS + 1}"
+    hash_dir = os.path.dirname(paths[-1])
+    versions = [name for name in os.listdir(hash_dir) if name.startswith("v")]
+    assert len(versions) == KEEP_VERSIONS
+    assert not [name for name in os.listdir(hash_dir) if name.startswith(".staging-")]
+
+
+def test_unsafe_keys_are_rejected(registry):
+    assert registry.content_hash_for("../etc/passwd") is None
+    with pytest.raises(KeyError):
+        registry.register("upload-a", "../escape")
+    with pytest.raises(KeyError):
+        registry.staging_dir("a/b")
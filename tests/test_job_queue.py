@@ -0,0 +1,44 @@
+import threading
+import time
+
+import pytest
+
+from agents.job_queue import JobManager, QueueFullError
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached in time")
+        time.sleep(0.01)
+
+
+def test_job_result_and_failure():
+    manager = JobManager(thread_workers=2, process_workers=1, max_pending=4)
+    ok = manager.submit("sum", sum, [1, 2, 3])
+    bad = manager.submit("fail", int, "not a number")
+
+    _wait_for(lambda: manager.status(ok)["status"] == "succeeded")
+    _wait_for(lambda: manager.status(bad)["status"] == "failed")
+    assert manager.result(ok) == ("succeeded", 6)
+    assert "ValueError" in manager.status(bad)["error"]
+
+
+def test_cancelled_running_job_counts_until_it_finishes():
+    manager = JobManager(thread_workers=1, process_workers=1, max_pending=1)
+    release = threading.Event()
+    job_id = manager.submit("slow", release.wait)
+    _wait_for(lambda: manager.status(job_id)["status"] == "running")
+
+    assert manager.cancel(job_id)
+    assert manager.status(job_id)["status"] == "cancelled"
+    # The worker is still busy, so the queue is still full
+    with pytest.raises(QueueFullError):
+        manager.submit("next", sum, [1])
+    assert manager.metrics()["in_flight"] == 1
+
+    release.set()
+    _wait_for(lambda: manager.metrics()["in_flight"] == 0)
+    next_id = manager.submit("next", sum, [1])
+    _wait_for(lambda: manager.status(next_id)["status"] == "succeeded")
@@ -0,0 +1,56 @@
+import os
+import shutil
+
+import numpy as np
+
+from agents.index_manifest import save_manifest
+from agents.lexical_index import (
+    LEXICAL_FILE, LexicalIndex, build_lexical_index, reciprocal_rank_fusion, tokenize, update_lexical_index,
+)
+from agents.row_store import RowStoreWriter, write_row_store
+
+ROWS = ["sku: SKU-1042; region: north", "sku: SKU-2001; region: south", "sku: SKU-3003; region: north"]
+QUERIES = ["sku-1042", "north", "south", "sku-4004 west", "region"]
+
+
+def _index_dir(tmp_path, name="index"):
+    index_dir = tmp_path / name
+    index_dir.mkdir()
+    write_row_store(str(index_dir), ROWS)
+    save_manifest(str(index_dir), np.arange(3), np.arange(3), 3)
+    build_lexical_index(str(index_dir))
+    return str(index_dir)
+
+
+def test_tokenize_keeps_compound_tokens_and_parts():
+    assert tokenize("SKU-1042 on 2024-03-01") == ["sku-1042", "sku", "1042", "on", "2024-03-01", "2024", "03", "01"]
+
+
+def test_incremental_update_matches_a_full_rebuild(tmp_path):
+    index_dir = _index_dir(tmp_path)
+    with RowStoreWriter(index_dir, append=True) as writer:
+        writer.append(["sku: SKU-4004; region: west", "sku: SKU-5005; region: north"])
+    save_manifest(index_dir, np.arange(4), np.array([0, 2, 3, 4]), 5)
+
+    update_lexical_index(index_dir, added_ids=[3, 4], removed_ids=[1])
+    rebuilt_dir = str(tmp_path / "rebuilt")
+    shutil.copytree(index_dir, rebuilt_dir)
+    build_lexical_index(rebuilt_dir)
+
+    updated, rebuilt = LexicalIndex(index_dir), LexicalIndex(rebuilt_dir)
+    assert updated.n_docs == rebuilt.n_docs == 4
+    np.testing.assert_array_equal(updated.doc_len, rebuilt.doc_len)
+    for query in QUERIES:
+        assert updated.search(query, top_k=5) == rebuilt.search(query, top_k=5)
+    assert 1 not in updated.search("south", top_k=5)
+    assert updated.search("sku-4004", top_k=1) == [3]
+
+
+def test_vocabulary_is_stored_in_the_postings_file(tmp_path):
+    index_dir = _index_dir(tmp_path)
+    assert sorted(name for name in os.listdir(index_dir) if name.startswith("lexical")) == [LEXICAL_FILE]
+    assert LexicalIndex(index_dir).search("sku-2001", top_k=1) == [1]
+
+
+def test_reciprocal_rank_fusion_prefers_ids_found_by_both():
+    assert reciprocal_rank_fusion([1, 2, 3], [3, 4], top_k=2) == [3, 1]
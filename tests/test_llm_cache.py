@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+import agents.llm_cache as llm_cache
+from agents.llm_cache import LLMResponseCache, question_entities
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_SEMANTIC", True)
+    # Every question embeds to the same vector: only the scope keeps answers apart
+    monkeypatch.setattr(llm_cache, "_embed", lambda text: np.array([1.0, 0.0], dtype=np.float32))
+    return LLMResponseCache(str(tmp_path / "responses.sqlite"))
+
+
+def _ask(cache, question, answer, calls):
+    prompt = f"Data: 3 rows\nQuestion: {question}\nAnswer:"
+    return cache.get_or_generate(lambda: calls.append(question) or answer, prompt, "model", endpoint="qa",
+                                 semantic_text=question)
+
+
+def test_exact_prompt_hits(cache):
+    calls = []
+    assert _ask(cache, "total units", "42", calls) == "42"
+    assert _ask(cache, "total  units", "other", calls) == "42"
+    assert calls == ["total units"]
+    assert cache.stats()["endpoints"]["qa"]["hits"] == 1
+
+
+def test_rephrased_question_reuses_the_answer(cache):
+    calls = []
+    _ask(cache, "Who are the top customers by revenue", "Acme", calls)
+    assert _ask(cache, "top customers by revenue?", "other", calls) == "Acme"
+    assert cache.stats()["endpoints"]["qa"]["semantic_hits"] == 1
+
+
+@pytest.mark.parametrize("first, second", [
+    ("sales in March", "sales in May"),
+    ("top 5 products", "top 10 products"),
+    ("complaints from the West region", "complaints from the East region"),
+])
+def test_questions_about_other_entities_never_share_answers(cache, first, second):
+    calls = []
+    _ask(cache, first, "first answer", calls)
+    assert _ask(cache, second, "second answer", calls) == "second answer"
+    assert calls == [first, second]
+
+
+def test_question_entities():
+    assert question_entities("Show sales in March 2024 for the West region.") == ["2024", "march", "west"]
+    assert question_entities("What were total sales? Which month was best") == []
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+import requests
+
+import agents.llm_client as llm_client
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, body=None, lines=()):
+        self.status_code = status_code
+        self._body = body
+        self._lines = lines
+        self.encoding = None
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} error", response=self)
+
+    def json(self):
+        return self._body
+
+    def iter_lines(self, decode_unicode=False):
+        return iter(self._lines)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    def __init__(self, response):
+        self.response = response
+        self.calls = []
+
+    def post(self, url, json=None, stream=False, timeout=None):
+        self.calls.append({"payload": json, "stream": stream, "timeout": timeout})
+        return self.response
+
+
+def _use(monkeypatch, response):
+    session = FakeSession(response)
+    monkeypatch.setattr(llm_client, "HF_TOKEN", "hf_test")
+    monkeypatch.setattr(llm_client, "get_session", lambda: session)
+    return session
+
+
+def test_chat_completion_sends_params_with_timeouts(monkeypatch):
+    session = _use(monkeypatch, FakeResponse(body={"choices": [{"message": {"content": "  42 units \n"}}]}))
+
+    assert llm_client.chat_completion("How many?", max_tokens=5, temperature=None) == "42 units"
+    call = session.calls[0]
+    assert call["payload"]["messages"] == [{"role": "user", "content": "How many?"}]
+    assert call["payload"]["max_tokens"] == 5 and "temperature" not in call["payload"]
+    assert call["timeout"] == (llm_client.LLM_CONNECT_TIMEOUT, llm_client.LLM_READ_TIMEOUT)
+
+
+def test_stream_chat_completion_yields_content_deltas(monkeypatch):
+    chunks = [{"choices": [{"delta": {"content": piece}}]} for piece in ("Sales ", "rose")]
+    lines = ["", ": keep-alive"] + [f"data: {json.dumps(c)}" for c in chunks] + ["data: [DONE]", "data: {}"]
+    session = _use(monkeypatch, FakeResponse(lines=lines))
+
+    assert "".join(llm_client.stream_chat_completion("Summarize")) == "Sales rose"
+    assert session.calls[0]["stream"] and session.calls[0]["payload"]["stream"] is True
+
+
+def test_final_error_status_raises(monkeypatch):
+    _use(monkeypatch, FakeResponse(status_code=503))
+    with pytest.raises(requests.HTTPError):
+        llm_client.chat_completion("hi")
+
+
+def test_missing_token_fails_before_any_request(monkeypatch):
+    session = _use(monkeypatch, FakeResponse(body={"choices": [{"message": {"content": "hi"}}]}))
+    monkeypatch.setattr(llm_client, "HF_TOKEN", None)
+
+    with pytest.raises(RuntimeError, match="HF_TOKEN"):
+        llm_client.chat_completion("hi")
+    with pytest.raises(RuntimeError, match="HF_TOKEN"):
+        list(llm_client.stream_chat_completion("hi"))
+    assert session.calls == []
@@ -0,0 +1,53 @@
+from types import SimpleNamespace
+
+import pytest
+
+from agents.local_backends import CTranslate2Backend, GGUFBackend, _sampling, create_backend
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError, match="Unknown LOCAL_BACKEND"):
+        create_backend("tensorrt")
+
+
+def test_create_backend_passes_the_model_path():
+    backend = create_backend("gguf", "models/phi-2.Q4_K_M.gguf")
+    assert isinstance(backend, GGUFBackend)
+    assert backend.model_path == "models/phi-2.Q4_K_M.gguf"
+
+
+def test_sampling_is_greedy_unless_requested():
+    assert _sampling({}) == (0.0, 1.0)
+    assert _sampling({"do_sample": True, "temperature": 0.7, "top_p": 0.9}) == (0.7, 0.9)
+
+
+def test_gguf_batch_runs_each_prompt_with_its_own_limit():
+    calls = []
+
+    def fake_llm(prompt, max_tokens, temperature, top_p, stream):
+        calls.append((prompt, max_tokens, temperature))
+        return {"choices": [{"text": prompt[::-1]}], "usage": {"completion_tokens": max_tokens - 1}}
+
+    backend = GGUFBackend("model.gguf")
+    backend.llm = fake_llm
+
+    assert backend.generate_batch(["ab", "cd"], [5, 9]) == [("ba", 4), ("dc", 8)]
+    assert calls == [("ab", 5, 0.0), ("cd", 9, 0.0)]
+
+
+def test_ctranslate2_batch_cuts_each_output_at_its_limit():
+    class FakeGenerator:
+        def generate_batch(self, tokens, max_length, include_prompt_in_result, **kwargs):
+            self.kwargs = dict(kwargs, max_length=max_length)
+            return [SimpleNamespace(sequences_ids=[[1, 2, 3, 4, 5]]) for _ in tokens]
+
+    tokenizer = SimpleNamespace(
+        encode=lambda prompt: [0],
+        convert_ids_to_tokens=lambda ids: ["<s>"],
+        decode=lambda ids, skip_special_tokens=True: "-".join(map(str, ids)),
+    )
+    backend = CTranslate2Backend("ct2-model")
+    backend.generator, backend.tokenizer = FakeGenerator(), tokenizer
+
+    assert backend.generate_batch(["a", "b"], [2, 5]) == [("1-2", 2), ("1-2-3-4-5", 5)]
+    assert backend.generator.kwargs == {"max_length": 5, "sampling_topk": 1}
@@ -0,0 +1,50 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import agents.local_runtime as local_runtime
+from agents.local_runtime import LocalModelUnavailable, LocalRuntime, get_local_runtime
+from conftest import FakeLocalBackend
+
+
+def test_model_loads_once_for_all_callers(monkeypatch):
+    created = []
+
+    def create_backend(name, model_path=None):
+        created.append(FakeLocalBackend(model_path))
+        return created[-1]
+
+    monkeypatch.setattr(local_runtime, "create_backend", create_backend)
+    runtime = LocalRuntime(backend="fake", batching=False)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        outputs = list(pool.map(lambda p: runtime(p, max_new_tokens=5)[0]["generated_text"], ["a", "b"] * 4))
+
+    assert len(created) == 1 and created[0].loads == 1
+    assert outputs == ["aA", "bB"] * 4
+    assert runtime("x", return_full_text=False) == [{"generated_text": "X"}]
+    assert "".join(runtime.stream("hi")) == "HI"
+    assert runtime.stats()["loaded"] and not runtime.batching
+
+
+def test_failed_load_is_not_retried_on_every_call(monkeypatch):
+    attempts = []
+
+    def create_backend(name, model_path=None):
+        attempts.append(name)
+        raise OSError("no weights")
+
+    monkeypatch.setattr(local_runtime, "create_backend", create_backend)
+    runtime = LocalRuntime(backend="fake", batching=False)
+
+    assert not runtime.is_available()
+    with pytest.raises(LocalModelUnavailable):
+        runtime.generate("x")
+    assert attempts == ["fake"]
+
+
+def test_shared_runtime_is_created_once(monkeypatch):
+    monkeypatch.setattr(local_runtime, "_runtime", None)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        runtimes = list(pool.map(lambda _: get_local_runtime(), range(8)))
+    assert all(runtime is runtimes[0] for runtime in runtimes)
@@ -0,0 +1,46 @@
+import threading
+
+import pytest
+
+from agents.local_scheduler import LocalBatchScheduler
+from conftest import FakeLocalBackend
+
+
+def _scheduler(backend, max_batch_size=4, window_ms=200):
+    return LocalBatchScheduler(lambda: backend, threading.BoundedSemaphore(1),
+                               max_batch_size=max_batch_size, window_ms=window_ms)
+
+
+def test_concurrent_prompts_share_one_batch():
+    backend = FakeLocalBackend()
+    scheduler = _scheduler(backend)
+
+    futures = [scheduler.submit(prompt, 10) for prompt in ("a", "b", "c", "d")]
+
+    assert [f.result(timeout=5) for f in futures] == ["A", "B", "C", "D"]
+    assert backend.batches == [["a", "b", "c", "d"]]
+    stats = scheduler.stats()
+    assert stats["requests"] == 4 and stats["batches"] == 1 and stats["tokens_generated"] == 4
+
+
+def test_only_requests_with_the_same_sampling_settings_are_batched():
+    backend = FakeLocalBackend()
+    scheduler = _scheduler(backend)
+
+    futures = [scheduler.submit("a", 10), scheduler.submit("b", 10, do_sample=True), scheduler.submit("c", 10)]
+
+    assert [f.result(timeout=5) for f in futures] == ["A", "B", "C"]
+    assert backend.batches == [["a", "c"], ["b"]]
+
+
+def test_backend_errors_reach_every_caller_in_the_batch():
+    class BrokenBackend(FakeLocalBackend):
+        def generate_batch(self, prompts, max_new_tokens, **kwargs):
+            raise RuntimeError("out of memory")
+
+    scheduler = _scheduler(BrokenBackend(), window_ms=50)
+    futures = [scheduler.submit("a"), scheduler.submit("b")]
+
+    for future in futures:
+        with pytest.raises(RuntimeError, match="out of memory"):
+            future.result(timeout=5)
@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+
+import pytest
+
+import agents.prompt_budget as prompt_budget
+from agents.prompt_budget import TRIM_MARKER, PromptBuilder, counter_for, estimate_tokens, trim_middle
+
+
+def _words(text):
+    return len(text.split())
+
+
+@pytest.fixture
+def tokenizer_loads(monkeypatch):
+    loads = []
+
+    def get_tokenizer():
+        loads.append(True)
+        return SimpleNamespace(encode=lambda text, add_special_tokens=False: text.split())
+
+    monkeypatch.setattr(prompt_budget, "_get_tokenizer", get_tokenizer)
+    return loads
+
+
+def test_cloud_prompts_never_load_the_tokenizer(tokenizer_loads):
+    builder = PromptBuilder(prompt_budget.budget_for("cloud"), label="test", count=counter_for("cloud"))
+    builder.add("instructions", "Summarize the data.", required=True)
+    builder.add("stats", "units: 42\n" * 10, priority=1)
+    builder.build()
+
+    assert tokenizer_loads == []
+    assert counter_for("cloud")("12345678") == estimate_tokens("12345678") == 2
+
+
+def test_local_prompts_use_the_tokenizer(tokenizer_loads):
+    assert counter_for("local")("three short words") == 3
+    assert tokenizer_loads
+
+
+def test_low_priority_sections_are_trimmed_or_dropped_first():
+    builder = PromptBuilder(60, label="test", count=_words)
+    builder.add("instructions", "Write a summary of the dataset below.", required=True)
+    builder.add("memory", "\n".join(["old note here"] * 20), priority=5)
+    builder.add("stats", "\n".join(f"col{i}: mean {i}" for i in range(10)), priority=1)
+    builder.add("closing", "Now write it.", required=True)
+
+    prompt = builder.build()
+    report = builder.report["sections"]
+    assert prompt.startswith("Write a summary") and prompt.endswith("Now write it.")
+    assert report["stats"]["tokens"] == report["stats"]["original_tokens"] == 30
+    assert report["memory"]["tokens"] < report["memory"]["original_tokens"]
+    assert builder.report["prompt_tokens"] <= 60
+
+
+def test_trim_middle_keeps_the_instructions_and_the_ask():
+    text = "\n".join(["Instructions first."] + [f"row {i} value" for i in range(50)] + ["Answer the question."])
+    fitted = trim_middle(text, 30, count=_words)
+
+    assert fitted.startswith("Instructions first.") and fitted.endswith("Answer the question.")
+    assert TRIM_MARKER in fitted and _words(fitted) <= 30
@@ -0,0 +1,61 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import agents.qa_agent as qa_agent
+import agents.qa_explanations as qa_explanations
+from agents.qa_explanations import DeferredExplanationStore
+
+
+@pytest.fixture
+def store_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "explanations.sqlite")
+    monkeypatch.setattr(qa_explanations, "_store", DeferredExplanationStore(path))
+    return path
+
+
+def test_deferred_explanations_are_served_by_another_worker(store_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(qa_explanations, "generate_explanations",
+                        lambda *prompts: calls.append(prompts) or ("because", "step by step"))
+
+    explain_id = qa_explanations.defer_explanations("explain it", "think it through", "cloud", 120)
+    # A second process opens the same store file
+    monkeypatch.setattr(qa_explanations, "_store", DeferredExplanationStore(store_path))
+
+    expected = {"explanation": "because", "cot_reasoning": "step by step"}
+    assert qa_explanations.get_deferred_explanations(explain_id) == expected
+    assert qa_explanations.get_deferred_explanations(explain_id) == expected
+    assert calls == [("explain it", "think it through", "cloud", 120)]
+    with pytest.raises(KeyError):
+        qa_explanations.get_deferred_explanations("unknown")
+
+
+def test_oldest_deferred_explanations_are_dropped(store_path):
+    store = DeferredExplanationStore(store_path, max_entries=2)
+    for explain_id in ("a", "b", "c"):
+        store.add(explain_id, ["e", "c", "cloud", 10])
+    with pytest.raises(KeyError):
+        store.get("a")
+    assert store.get("c") == (["e", "c", "cloud", 10], None)
+
+
+@pytest.mark.parametrize("batching", [True, False])
+def test_local_prompts_reach_the_batch_scheduler_together(monkeypatch, batching):
+    both_in_flight = threading.Barrier(2, timeout=1)
+    overlapped = []
+
+    def fake_call_llm(prompt, model_mode="cloud", max_new_tokens=200):
+        try:
+            both_in_flight.wait()
+            overlapped.append(True)
+        except threading.BrokenBarrierError:
+            overlapped.append(False)
+        return prompt.upper()
+
+    monkeypatch.setattr(qa_agent, "call_llm", fake_call_llm)
+    monkeypatch.setattr(qa_explanations, "get_local_runtime", lambda: SimpleNamespace(batching=batching))
+
+    assert qa_explanations.generate_explanations("why", "how", "local") == ("WHY", "HOW")
+    assert all(overlapped) == batching
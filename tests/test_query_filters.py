@@ -0,0 +1,86 @@
+from collections import OrderedDict
+
+import pandas as pd
+import pytest
+
+import agents.query_filters as query_filters
+from agents.query_filters import describe_filters, extract_filters, filter_mask, get_filter_columns
+
+
+@pytest.fixture
+def orders():
+    return pd.DataFrame({
+        "region": ["West", "East", "West", "North"],
+        "order_date": ["2024-03-02", "2024-05-10", "2023-03-15", "2024-03-20"],
+        "amount": [1500.0, 2500.0, 300.0, 2200.0],
+        "unit_price": [10, 20, 30, 40],
+    })
+
+
+def _ops(filters):
+    return {(f["column"], f["op"]): f["value"] for f in filters}
+
+
+def test_region_month_and_year(orders):
+    filters = extract_filters(orders, "Complaints from West region in March 2024")
+
+    assert _ops(filters) == {("region", "in"): ["West"], ("order_date", "month"): 3, ("order_date", "year"): 2024}
+    assert filter_mask(orders, filters).tolist() == [True, False, False, False]
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("orders with amount over 2000", {("amount", "gt"): 2000.0}),
+    ("amount at least 2,200 in 2024", {("amount", "ge"): 2200.0, ("order_date", "year"): 2024}),
+    ("unit price between 35 and 15", {("unit_price", "between"): [15.0, 35.0]}),
+    ("sales for 2023", {("order_date", "year"): 2023}),
+])
+def test_plain_numbers_are_not_years(orders, question, expected):
+    assert _ops(extract_filters(orders, question)) == expected
+
+
+def test_may_needs_a_preposition_to_be_a_month(orders):
+    assert extract_filters(orders, "May I see the West orders?") == [
+        {"column": "region", "op": "in", "value": ["West"]}
+    ]
+    assert _ops(extract_filters(orders, "orders in May"))[("order_date", "month")] == 5
+
+
+@pytest.fixture
+def customers():
+    return pd.DataFrame({
+        "country": ["US", "DE", "UK", "US"],
+        "churned": ["Yes", "No", "No", "Yes"],
+        "plan": ["Basic", "Premium", "Basic", "Premium"],
+    })
+
+
+def test_short_and_common_word_values_need_their_column_name(customers):
+    assert extract_filters(customers, "Can you show us which customers have no complaints?") == []
+    assert _ops(extract_filters(customers, "customers in country US on the premium plan")) == {
+        ("country", "in"): ["US"], ("plan", "in"): ["Premium"],
+    }
+    assert _ops(extract_filters(customers, "customers where churned is No")) == {("churned", "in"): ["No"]}
+
+
+def test_column_metadata_is_computed_once_per_dataset_version(orders, monkeypatch):
+    built = []
+    original = query_filters.FilterColumns
+
+    class CountingFilterColumns(original):
+        def __init__(self, df):
+            built.append(len(df))
+            super().__init__(df)
+
+    monkeypatch.setattr(query_filters, "FilterColumns", CountingFilterColumns)
+    monkeypatch.setattr(query_filters, "_filter_columns", OrderedDict())
+    for question in ("West in March", "East in 2024", "amount over 100"):
+        filter_mask(orders, extract_filters(orders, question))
+    assert built == [4]
+
+    changed = orders.assign(amount=orders["amount"] + 1)
+    assert get_filter_columns(changed) is not get_filter_columns(orders)
+
+
+def test_describe_filters(orders):
+    filters = extract_filters(orders, "West orders with amount over 1000 in March")
+    assert describe_filters(filters) == "region in ['West'] AND amount > 1000.0 AND month(order_date) == 3"
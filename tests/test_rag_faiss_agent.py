@@ -0,0 +1,43 @@
+import json
+
+import agents.rag_faiss_agent as rag_faiss_agent
+from agents.llm_stream import sse_stream
+
+
+def _parse_sse(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        event_line, data_line = block.split("\n")
+        events.append((event_line[len("event: "):], json.loads(data_line[len("data: "):])))
+    return events
+
+
+def test_stream_sends_context_then_tokens_then_the_answer(monkeypatch):
+    monkeypatch.setattr(rag_faiss_agent, "retrieve_similar_rows", lambda *args, **kwargs: ["region: West; units: 3"])
+    monkeypatch.setattr(rag_faiss_agent, "stream_llm", lambda prompt, model_mode, max_new_tokens: iter(["West ", "sold 3"]))
+
+    events = list(rag_faiss_agent.stream_faiss_rag_agent("How many in West?", explain="skip"))
+
+    assert [event for event, _ in events] == ["context", "token", "token", "done"]
+    assert events[0][1] == {"context_rows": ["region: West; units: 3"]}
+    assert events[-1][1]["answer"] == "West sold 3"
+    assert events[-1][1]["explanation"] == "N/A"
+
+
+def test_stream_without_rows_finishes_immediately(monkeypatch):
+    monkeypatch.setattr(rag_faiss_agent, "retrieve_similar_rows", lambda *args, **kwargs: [])
+
+    events = list(rag_faiss_agent.stream_faiss_rag_agent("Anything?"))
+    assert [event for event, _ in events] == ["context", "done"]
+    assert events[-1][1]["context_rows"] == []
+
+
+def test_sse_stream_turns_failures_into_an_error_event():
+    def events():
+        yield "token", {"text": "partial"}
+        raise RuntimeError("router went away")
+
+    assert _parse_sse("".join(sse_stream(events()))) == [
+        ("token", {"text": "partial"}),
+        ("error", {"error": "router went away"}),
+    ]
@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+from agents.build_faiss_index import preprocess_row
+from agents.embedding_index import embed_row
+from agents.row_serializer import serialize_rows, iter_row_text_batches
+
+
+def _sample_frame():
+    return pd.DataFrame({
+        "region": ["north", None, "south"],
+        "units": [3, 5, 8],
+        "price": [1.5, np.nan, 2.0],
+        "day": ["2024-01-05", "2024-01-06", None],
+    })
+
+
+def test_serialize_rows_matches_row_wise_helpers():
+    df = _sample_frame()
+
+    assert serialize_rows(df) == df.apply(preprocess_row, axis=1).tolist()
+    assert serialize_rows(df, sep=" | ", skip_na=True) == df.apply(embed_row, axis=1).tolist()
+
+
+def test_batches_cover_every_row_in_order():
+    df = pd.DataFrame({"n": range(10)})
+    batches = list(iter_row_text_batches(df, batch_size=4))
+
+    assert [start for start, _ in batches] == [0, 4, 8]
+    assert [text for _, texts in batches for text in texts] == [f"n: {i}" for i in range(10)]
+
+
+def test_empty_frames():
+    assert serialize_rows(pd.DataFrame({"a": []})) == []
+    assert serialize_rows(pd.DataFrame(index=range(2))) == ["", ""]
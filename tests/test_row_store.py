@@ -0,0 +1,66 @@
+import json
+import os
+
+import pytest
+
+from agents.row_store import (
+    RowStore, RowStoreWriter, LegacyJsonRows, LEGACY_METADATA_FILE, open_row_store, row_store_file,
+    write_row_store,
+)
+
+
+def test_row_store_round_trip_and_append(tmp_path):
+    index_dir = str(tmp_path)
+    write_row_store(index_dir, ["region: north", "city: Zürich", ""])
+    with RowStoreWriter(index_dir, append=True) as writer:
+        writer.append(["region: south"])
+
+    rows = open_row_store(index_dir)
+    assert isinstance(rows, RowStore)
+    assert len(rows) == 4
+    assert rows[1] == "city: Zürich"
+    assert rows[2] == ""
+    assert rows.get_many([3, 0, -1, 9]) == ["region: south", "region: north"]
+
+
+def test_rewrites_leave_open_readers_on_the_old_files(tmp_path):
+    index_dir = str(tmp_path)
+    write_row_store(index_dir, ["region: north", "region: south"])
+    reader = RowStore(index_dir)
+
+    write_row_store(index_dir, ["x"])
+    with RowStoreWriter(index_dir, append=True) as writer:
+        writer.append(["y"])
+
+    assert reader.get_many([0, 1]) == ["region: north", "region: south"]
+    assert open_row_store(index_dir).get_many([0, 1]) == ["x", "y"]
+    assert not [name for name in os.listdir(index_dir) if name.endswith(".tmp")]
+
+
+def test_failed_append_keeps_the_existing_store(tmp_path):
+    index_dir = str(tmp_path)
+    write_row_store(index_dir, ["region: north"])
+
+    with pytest.raises(RuntimeError):
+        with RowStoreWriter(index_dir, append=True) as writer:
+            writer.append(["region: south"])
+            raise RuntimeError("embedding failed")
+
+    assert open_row_store(index_dir).get_many([0, 1]) == ["region: north"]
+    assert sorted(os.listdir(index_dir)) == ["rows.bin", "rows.idx"]
+
+
+def test_empty_row_store_opens(tmp_path):
+    write_row_store(str(tmp_path), [])
+    rows = open_row_store(str(tmp_path))
+    assert len(rows) == 0
+    assert rows.get_many([0]) == []
+
+
+def test_legacy_metadata_json_is_still_readable(tmp_path):
+    (tmp_path / LEGACY_METADATA_FILE).write_text(json.dumps([{"text": "a: 1"}, {"text": "a: 2"}]))
+
+    assert row_store_file(str(tmp_path)) == LEGACY_METADATA_FILE
+    rows = open_row_store(str(tmp_path))
+    assert isinstance(rows, LegacyJsonRows)
+    assert rows.get_many([1, 5]) == ["a: 2"]
@@ -1,10 +1,12 @@
 # agents/url_monitor_agent.py
+import io
 import pandas as pd
 import requests
 import hashlib
 import threading
 import time
 from logic.auto_pipeline import run_auto_pipeline
+from agents.build_faiss_index import build_registered_index
 
 _monitored_urls = {}
 
@@ -14,6 +16,10 @@ def _download_and_hash(url):
     content = response.content
     return content, hashlib.md5(content).hexdigest()
 
+def url_index_key(url):
+    """Registry key of the FAISS index kept for a monitored URL."""
+    return "url-" + hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+
 def _monitor_url_loop(url, interval_seconds, model_mode):
     print(f"🌐 Monitoring URL: {url}")
     last_hash = None
@@ -22,7 +28,9 @@ def _monitor_url_loop(url, interval_seconds, model_mode):
             content, new_hash = _download_and_hash(url)
             if new_hash != last_hash:
                 print(f"📥 Change detected at {url}")
-                df = pd.read_csv(pd.compat.StringIO(content.decode()))
+                df = pd.read_csv(io.BytesIO(content))
+                # Only new/changed rows are embedded, see update_faiss_index
+                build_registered_index(url_index_key(url), df, content_hash=new_hash)
                 run_auto_pipeline(df, model_mode=model_mode)
                 last_hash = new_hash
             else: